@@ -0,0 +1,298 @@
+"""Compare sequential and pipelined document ingestion.
+
+Ingests a generated PDF with ``DocumentService.ingest_document``, once with
+the stages run one after another and once with ``INGESTION_PIPELINE``
+enabled, and reports the end-to-end time and the peak RSS of each run.
+Every run happens in a fresh subprocess so that the peak RSS of one does
+not hide the other.
+
+Embedding requests and upserts are simulated with fixed latencies and
+copies of a random vector, so the numbers reflect the overlap between
+parsing and network waits rather than a particular provider.
+
+Usage (from the ``backend`` directory)::
+
+    python benchmarks/ingestion_pipeline.py
+    python benchmarks/ingestion_pipeline.py --pages 600 --pdf-workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import subprocess  # nosec B404
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app.core.config import Settings  # noqa: E402
+from app.models.query_core import Rule  # noqa: E402
+from app.schemas.query_api import VectorResponseSchema  # noqa: E402
+from app.services.document_service import DocumentService  # noqa: E402
+from app.services.embedding.base import EmbeddingService  # noqa: E402
+from app.services.llm.base import CompletionService  # noqa: E402
+from app.services.vector_db.base import VectorDBService  # noqa: E402
+
+DIMENSIONS = 1536
+WORDS = ["contract", "party", "term", "payment", "notice", "liability"]
+VECTOR = [random.random() for _ in range(DIMENSIONS)]  # nosec B311
+
+
+class RandomEmbeddingService(EmbeddingService):
+    """Embedding service returning vectors after a fixed latency.
+
+    Like ``OpenAIEmbeddingService``, texts are sent in requests of
+    ``embedding_batch_size`` texts with at most
+    ``embedding_max_concurrency`` requests in flight.
+    """
+
+    def __init__(self, settings: Settings, latency: float) -> None:
+        self.batch_size = settings.embedding_batch_size
+        self.semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+        self.latency = latency
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get random embeddings for the given texts."""
+        batches = await asyncio.gather(
+            *(
+                self._embed_batch(texts[start : start + self.batch_size])
+                for start in range(0, len(texts), self.batch_size)
+            )
+        )
+        return [embedding for batch in batches for embedding in batch]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with self.semaphore:
+            await asyncio.sleep(self.latency)
+        return [list(VECTOR) for _ in texts]
+
+
+class DiscardingVectorDBService(VectorDBService):
+    """Vector database dropping the vectors after a fixed latency."""
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        settings: Settings,
+        latency: float,
+    ) -> None:
+        self.embedding_service = embedding_service
+        self.settings = settings
+        self.latency = latency
+
+    async def upsert_vectors(
+        self, vectors: List[Dict[str, Any]]
+    ) -> Dict[str, str]:
+        """Pretend to upsert the vectors."""
+        await asyncio.sleep(self.latency)
+        return {"message": f"Successfully upserted {len(vectors)} chunks."}
+
+    async def vector_search(
+        self, queries: List[str], document_id: str
+    ) -> VectorResponseSchema:
+        """Not benchmarked."""
+        raise NotImplementedError
+
+    async def keyword_search(
+        self, query: str, document_id: str, keywords: List[str]
+    ) -> VectorResponseSchema:
+        """Not benchmarked."""
+        raise NotImplementedError
+
+    async def get_chunks(
+        self, document_id: str, chunk_numbers: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Not benchmarked."""
+        raise NotImplementedError
+
+    async def hybrid_search(
+        self, query: str, document_id: str, rules: List[Rule]
+    ) -> VectorResponseSchema:
+        """Not benchmarked."""
+        raise NotImplementedError
+
+    async def decomposed_search(
+        self, query: str, document_id: str, rules: List[Rule]
+    ) -> Dict[str, Any]:
+        """Not benchmarked."""
+        raise NotImplementedError
+
+    async def delete_document(self, document_id: str) -> Dict[str, str]:
+        """Not benchmarked."""
+        raise NotImplementedError
+
+    async def ensure_collection_exists(self) -> None:
+        """Nothing to create, the collection has the configured vectors."""
+        self._sparse_search = self.settings.sparse_vectors
+
+
+class UnusedCompletionService(CompletionService):
+    """Completion service that must not be called by the benchmark."""
+
+    async def generate_completion(
+        self, prompt: str, response_model: Any
+    ) -> Any:
+        """Fail, ingestion does not call the LLM."""
+        raise AssertionError("The benchmark should not call the LLM")
+
+    async def decompose_query(self, query: str) -> Dict[str, Any]:
+        """Fail, ingestion does not call the LLM."""
+        raise AssertionError("The benchmark should not call the LLM")
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40) -> None:
+    """Write a PDF with lines of random words on every page."""
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # The page tree, written once the pages are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for _ in range(pages):
+        lines = [
+            " ".join(random.choices(WORDS, k=12))  # nosec B311
+            for _ in range(lines_per_page)
+        ]
+        stream = (
+            "BT /F1 10 Tf 12 TL 40 760 Td "
+            + " ".join(f"({line}) Tj T*" for line in lines)
+            + " ET"
+        ).encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects),)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(kids),
+        len(kids),
+    )
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(pdf)
+
+
+async def ingest(args: argparse.Namespace) -> Dict[str, float]:
+    """Ingest the PDF once and measure the run."""
+    settings = Settings(
+        loader="pypdf",
+        chunk_size=512,
+        chunk_overlap=64,
+        pdf_parse_workers=args.pdf_workers,
+        ingestion_pipeline=args.mode == "pipelined",
+        keyword_index_path=None,
+    )
+    vector_db_service = DiscardingVectorDBService(
+        RandomEmbeddingService(settings, args.embedding_latency),
+        settings,
+        args.upsert_latency,
+    )
+    service = DocumentService(
+        vector_db_service, UnusedCompletionService(), settings
+    )
+
+    start = time.perf_counter()
+    await service.ingest_document(args.pdf)
+    elapsed = time.perf_counter() - start
+    await service.aclose()
+
+    return {
+        "elapsed": elapsed,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+        ),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=0,
+        help="Processes parsing the PDF (PDF_PARSE_WORKERS).",
+    )
+    parser.add_argument(
+        "--embedding-latency",
+        type=float,
+        default=0.2,
+        help="Simulated embedding request latency in seconds.",
+    )
+    parser.add_argument(
+        "--upsert-latency",
+        type=float,
+        default=0.05,
+        help="Simulated upsert latency in seconds.",
+    )
+    parser.add_argument("--mode", choices=["sequential", "pipelined"])
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Run the benchmark for both ingestion modes."""
+    args = parse_args()
+    logging.disable(logging.INFO)
+
+    if args.mode:
+        # Single measured run, started by the loop below
+        print(json.dumps(asyncio.run(ingest(args))))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdf = os.path.join(directory, "benchmark.pdf")
+        write_pdf(pdf, args.pages)
+        print(
+            f"Ingesting a {args.pages} page PDF "
+            f"({os.path.getsize(pdf) / 2**20:.1f} MB, "
+            f"{args.pdf_workers or 'no'} parser processes)"
+        )
+        for mode in ("sequential", "pipelined"):
+            output = subprocess.run(  # nosec B603
+                [
+                    sys.executable,
+                    __file__,
+                    *sys.argv[1:],
+                    "--mode",
+                    mode,
+                    "--pdf",
+                    pdf,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{mode:>10}: {result['elapsed']:7.2f} s, "
+                f"{result['peak_rss_mb']:7.1f} MB peak RSS"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Compare the previous and the shared keyword ranking of hybrid searches.
+
+Ranks random candidate chunks by the occurrences of a few keywords, as
+the keyword filter path of ``MilvusService.hybrid_search`` does, once with
+the previous inline code and once with ``KeywordScorer``. The previous
+code also copied the Milvus response through ``json.dumps`` and
+``json.loads`` before ranking it; the "with copy" row includes that step.
+
+A single compiled alternation of the keywords was measured too and is
+about twice as slow as ``str.count``, which scans a text for one keyword
+in C, so the scorer counts each keyword with ``str.count`` on a text
+lowercased once.
+
+Usage (from the ``backend`` directory)::
+
+    python benchmarks/keyword_scoring.py
+    python benchmarks/keyword_scoring.py --keywords 10 --repeat 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app.services.vector_db.keyword_scoring import (  # noqa: E402
+    KeywordScorer,
+)
+
+WORDS = [
+    "contract",
+    "Party",
+    "term",
+    "payment",
+    "Notice",
+    "liability",
+    "the",
+    "of",
+    "and",
+    "agreement",
+]
+CANDIDATES = (40, 400, 4000)
+
+
+def make_chunks(n_chunks: int) -> List[Dict[str, Any]]:
+    """Create chunks of about 500 characters of random words."""
+    return [
+        {
+            "text": " ".join(random.choices(WORDS, k=70)),  # nosec B311
+            "page_number": i // 5 + 1,
+            "document_id": "doc",
+            "chunk_number": i,
+        }
+        for i in range(n_chunks)
+    ]
+
+
+def previous_rank(
+    chunks: List[Dict[str, Any]], keywords: List[str]
+) -> List[Dict[str, Any]]:
+    """Rank the chunks as hybrid_search did before KeywordScorer."""
+
+    def count_keywords(text: str, keywords: List[str]) -> int:
+        return sum(text.lower().count(keyword.lower()) for keyword in keywords)
+
+    return sorted(
+        chunks,
+        key=lambda chunk: count_keywords(chunk["text"], keywords),
+        reverse=True,
+    )[:20]
+
+
+def previous_rank_with_copy(
+    chunks: List[Dict[str, Any]], keywords: List[str]
+) -> List[Dict[str, Any]]:
+    """Copy the chunks through JSON, then rank them as before."""
+    copied = json.loads(json.dumps(chunks, indent=2))
+    return previous_rank(copied, keywords)
+
+
+def scorer_rank(
+    chunks: List[Dict[str, Any]], keywords: List[str]
+) -> List[Dict[str, Any]]:
+    """Rank the chunks with KeywordScorer."""
+    return KeywordScorer(keywords).rank(chunks, limit=20)
+
+
+def time_ms(function: Callable[[], Any], repeat: int) -> float:
+    """Get the best time of a call, in milliseconds."""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--keywords", type=int, default=5, help="Keywords per search."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Runs per measurement."
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """Run the benchmark for each number of candidate chunks."""
+    args = parse_args()
+    keywords = random.sample(WORDS, k=min(args.keywords, len(WORDS)))
+    print(f"Ranking candidate chunks by {len(keywords)} keywords")
+    print(
+        f"{'chunks':>8} {'previous':>12} {'with copy':>12} "
+        f"{'scorer':>12} {'speedup':>8} {'with copy':>10}"
+    )
+    for n_chunks in CANDIDATES:
+        chunks = make_chunks(n_chunks)
+        assert scorer_rank(chunks, keywords) == previous_rank(  # nosec B101
+            chunks, keywords
+        )
+
+        previous = time_ms(
+            lambda: previous_rank(chunks, keywords), args.repeat
+        )
+        copy = time_ms(
+            lambda: previous_rank_with_copy(chunks, keywords), args.repeat
+        )
+        scorer = time_ms(lambda: scorer_rank(chunks, keywords), args.repeat)
+        print(
+            f"{n_chunks:>8} {previous:>9.2f} ms {copy:>9.2f} ms "
+            f"{scorer:>9.2f} ms {previous / scorer:>7.1f}x "
+            f"{copy / scorer:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Compare the blocking and async Qdrant services under concurrent load.
+
+Runs a batch of parallel hybrid searches against ``QdrantService`` and
+``AsyncQdrantService`` and reports the wall time together with the worst
+event loop stall observed while the searches were running.
+
+Usage (from the ``backend`` directory)::
+
+    python benchmarks/qdrant_concurrency.py
+    python benchmarks/qdrant_concurrency.py --searches 50 --chunks 5000
+    python benchmarks/qdrant_concurrency.py --url http://localhost:6333
+
+By default both services run against a local in-memory Qdrant
+(``location=":memory:"``). Local mode executes the searches inside this
+process, so both variants hold the event loop for the search itself; pass
+``--url`` to benchmark a Qdrant server, where the async client releases the
+loop while waiting on the network.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Type
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app.core.config import Qdrant, Settings  # noqa: E402
+from app.models.query_core import Rule  # noqa: E402
+from app.services.embedding.base import EmbeddingService  # noqa: E402
+from app.services.llm.base import CompletionService  # noqa: E402
+from app.services.vector_db.qdrant_service import (  # noqa: E402
+    AsyncQdrantService,
+    QdrantService,
+)
+
+DIMENSIONS = 256
+WORDS = ["contract", "party", "term", "payment", "notice", "liability"]
+
+
+class RandomEmbeddingService(EmbeddingService):
+    """Embedding service returning random vectors after a fixed latency."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get random embeddings for the given texts."""
+        await asyncio.sleep(self.latency)
+        return [
+            [random.random() for _ in range(DIMENSIONS)]  # nosec B311
+            for _ in texts
+        ]
+
+
+class UnusedCompletionService(CompletionService):
+    """Completion service that must not be called by the benchmark."""
+
+    async def generate_completion(
+        self, prompt: str, response_model: Any
+    ) -> Any:
+        """Fail, keywords come from the rules."""
+        raise AssertionError("The benchmark should not call the LLM")
+
+    async def decompose_query(self, query: str) -> Dict[str, Any]:
+        """Fail, decomposition is not benchmarked."""
+        raise AssertionError("The benchmark should not call the LLM")
+
+
+def make_chunks(n_chunks: int, n_documents: int) -> List[Dict[str, Any]]:
+    """Create random chunks spread across documents."""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "vector": [
+                random.random() for _ in range(DIMENSIONS)  # nosec B311
+            ],
+            "text": " ".join(random.choices(WORDS, k=40)),  # nosec B311
+            "page_number": i // 5 + 1,
+            "chunk_number": i,
+            "document_id": f"doc-{i % n_documents}",
+        }
+        for i in range(n_chunks)
+    ]
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    """Record how late a 1 ms ticker wakes up while the loop is busy."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run(
+    service_class: Type[QdrantService],
+    chunks: List[Dict[str, Any]],
+    args: argparse.Namespace,
+) -> Dict[str, float]:
+    """Populate a collection and time the parallel hybrid searches."""
+    qdrant = Qdrant(url=args.url) if args.url else Qdrant(location=":memory:")
+    settings = Settings(
+        dimensions=DIMENSIONS,
+        index_name=f"benchmark_{service_class.__name__.lower()}",
+        qdrant=qdrant,
+    )
+    service = service_class(
+        RandomEmbeddingService(args.embedding_latency),
+        UnusedCompletionService(),
+        settings,
+    )
+    await service.ensure_collection_exists()
+    await service.upsert_vectors([dict(chunk) for chunk in chunks])
+
+    rules = [Rule(type="must_return", options=["payment", "notice"])]
+    stop = asyncio.Event()
+    lags: List[float] = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(
+            *(
+                service.hybrid_search(
+                    "When is payment due?",
+                    f"doc-{i % args.documents}",
+                    rules,
+                )
+                for i in range(args.searches)
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    await service._call("delete_collection", settings.index_name)
+    await service.aclose()
+
+    return {"elapsed": elapsed, "max_lag": max(lags, default=0.0)}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument(
+        "--embedding-latency",
+        type=float,
+        default=0.02,
+        help="Simulated embedding request latency in seconds.",
+    )
+    parser.add_argument("--url", help="Qdrant server URL.")
+    return parser.parse_args(argv)
+
+
+async def main() -> None:
+    """Run the benchmark for both service variants."""
+    args = parse_args()
+    logging.disable(logging.INFO)
+    chunks = make_chunks(args.chunks, args.documents)
+
+    print(
+        f"{args.searches} parallel hybrid searches over {args.chunks} chunks "
+        f"({'server ' + args.url if args.url else 'in-memory Qdrant'})"
+    )
+    for service_class in (QdrantService, AsyncQdrantService):
+        result = await run(service_class, chunks, args)
+        print(
+            f"{service_class.__name__:>20}: "
+            f"{result['elapsed'] * 1000:8.1f} ms total, "
+            f"{result['max_lag'] * 1000:8.1f} ms max event loop stall"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,40 +1,258 @@
 """Document router."""
 
+import asyncio
 import logging
+import os
+import tempfile
+from typing import IO, Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
 
-from app.core.dependencies import get_document_service
+from app.core.config import Settings, get_settings
+from app.core.dependencies import (
+    get_document_service,
+    get_ingestion_job_service,
+)
 from app.models.document import Document
 from app.schemas.document_api import (
     DeleteDocumentResponseSchema,
     DocumentResponseSchema,
+    IngestionJobResponseSchema,
 )
 from app.services.document_service import DocumentService
+from app.services.ingestion_job_service import IngestionJobService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Document"])
 
 
+# Allowance for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# The upload endpoints parse their multipart body themselves
+UPLOAD_REQUEST_BODY: Dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"}
+                    },
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the maximum upload size of {max_size} bytes",
+    )
+
+
+class _UploadParser:
+    """Collect the ``file`` field of a multipart body as it is parsed.
+
+    The bytes of the file are kept until ``take`` is called, so that they
+    can be written to disk between two reads of the request body.
+    """
+
+    def __init__(self, boundary: bytes, max_size: int) -> None:
+        self.max_size = max_size
+        self.filename: Optional[str] = None
+        self.size = 0
+        self.buffered = 0
+        self._pending: List[bytes] = []
+        self._in_file = False
+        # Whether the file part and the whole body were closed
+        self.file_complete = False
+        self.complete = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self.parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self.on_part_begin,
+                "on_header_field": self.on_header_field,
+                "on_header_value": self.on_header_value,
+                "on_header_end": self.on_header_end,
+                "on_headers_finished": self.on_headers_finished,
+                "on_part_data": self.on_part_data,
+                "on_part_end": self.on_part_end,
+                "on_end": self.on_end,
+            },
+        )
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        # Only the first file is kept, other fields are ignored
+        if (
+            self.filename is None
+            and options.get(b"name") == b"file"
+            and b"filename" in options
+        ):
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+            self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise _too_large(self.max_size)
+        self._pending.append(data[start:end])
+        self.buffered += end - start
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self.file_complete = True
+        self._in_file = False
+
+    def on_end(self) -> None:
+        self.complete = True
+
+    def write(self, data: bytes) -> None:
+        """Parse the next bytes of the body."""
+        try:
+            self.parser.write(data)
+        except MultipartParseError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Malformed multipart body: {e}",
+            )
+
+    def finalize(self) -> None:
+        """Check that the body was complete, once it is all parsed."""
+        self.parser.finalize()
+        if self.filename is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File name is missing",
+            )
+        if not (self.file_complete and self.complete):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The upload ended before the file was complete",
+            )
+
+    def take(self) -> bytes:
+        """Get the bytes of the file parsed since the last call."""
+        data = b"".join(self._pending)
+        self._pending, self.buffered = [], 0
+        return data
+
+
+async def _receive_upload(
+    request: Request, max_size: int, chunk_size: int
+) -> Tuple[str, str]:
+    """Stream the file of a multipart upload to a temporary file.
+
+    The body is parsed as it is received and the file is written to disk
+    once, in pieces of about ``chunk_size`` bytes, so it is never held in
+    memory whole. A body whose ``Content-Length`` exceeds ``max_size`` and
+    the multipart framing is rejected with a 413 before it is read, any
+    other as soon as the file exceeds ``max_size`` bytes.
+    Malformed bodies and bodies ending before the file does are rejected
+    with a 400, and the partial file is removed.
+
+    Returns the name of the file and the path of the temporary file, which
+    the caller must remove.
+    """
+    content_length = request.headers.get("content-length", "")
+    if (
+        content_length.isdigit()
+        and int(content_length) > max_size + MULTIPART_OVERHEAD
+    ):
+        raise _too_large(max_size)
+
+    content_type, options = parse_options_header(
+        request.headers.get("content-type", "")
+    )
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a multipart/form-data upload",
+        )
+
+    parser = _UploadParser(boundary, max_size)
+    temp_file: Optional[IO[bytes]] = None
+    try:
+        async for data in request.stream():
+            parser.write(data)
+            if parser.filename and temp_file is None:
+                suffix = os.path.splitext(parser.filename)[1]
+                temp_file = tempfile.NamedTemporaryFile(
+                    delete=False, suffix=suffix
+                )
+            if temp_file is not None and parser.buffered >= chunk_size:
+                await run_in_threadpool(temp_file.write, parser.take())
+
+        parser.finalize()
+        if parser.filename is None or temp_file is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File name is missing",
+            )
+        await run_in_threadpool(temp_file.write, parser.take())
+        temp_file.close()
+    except BaseException:
+        if temp_file is not None:
+            temp_file.close()
+            os.remove(temp_file.name)
+        raise
+    return parser.filename, temp_file.name
+
+
 @router.post(
     "",
     response_model=DocumentResponseSchema,
     status_code=status.HTTP_201_CREATED,
+    openapi_extra=UPLOAD_REQUEST_BODY,
 )
 async def upload_document_endpoint(
-    file: UploadFile = File(...),
+    request: Request,
     document_service: DocumentService = Depends(get_document_service),
+    settings: Settings = Depends(get_settings),
 ) -> DocumentResponseSchema:
     """
     Upload a document and process it.
 
+    The ``file`` field of the multipart body is streamed to a temporary
+    file (see ``_receive_upload``) and handed to the loader by path.
+
     Parameters
     ----------
-    file : UploadFile
-        The file to be uploaded and processed.
+    request : Request
+        The request, whose multipart body holds the file to process.
     document_service : DocumentService
         The document service for processing the file.
+    settings : Settings
+        The application settings.
 
     Returns
     -------
@@ -44,21 +262,17 @@ async def upload_document_endpoint(
     Raises
     ------
     HTTPException
-        If the file name is missing or if an error occurs during processing.
+        If the file name is missing, if the file is larger than
+        ``max_upload_size`` or if an error occurs during processing.
     """
-    if not file.filename:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File name is missing",
-        )
-
-    logger.info(
-        f"Endpoint received file: {file.filename}, content type: {file.content_type}"
+    filename, temp_file_path = await _receive_upload(
+        request, settings.max_upload_size, settings.upload_chunk_size
     )
+    logger.info(f"Endpoint received file: {filename}")
 
     try:
-        document_id = await document_service.upload_document(
-            file.filename, await file.read()
+        document_id = await document_service.upload_document_from_path(
+            filename, temp_file_path
         )
 
         if document_id is None:
@@ -70,7 +284,7 @@ async def upload_document_endpoint(
         # TODO: Fetch actual document details from a database
         document = Document(
             id=document_id,
-            name=file.filename,
+            name=filename,
             author="author_name",  # TODO: Determine this dynamically
             tag="document_tag",  # TODO: Determine this dynamically
             page_count=10,  # TODO: Determine this dynamically
@@ -87,6 +301,101 @@ async def upload_document_endpoint(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
+    finally:
+        os.remove(temp_file_path)
+
+
+@router.post(
+    "/jobs",
+    response_model=IngestionJobResponseSchema,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=UPLOAD_REQUEST_BODY,
+)
+async def create_ingestion_job_endpoint(
+    request: Request,
+    document_service: DocumentService = Depends(get_document_service),
+    ingestion_job_service: IngestionJobService = Depends(
+        get_ingestion_job_service
+    ),
+    settings: Settings = Depends(get_settings),
+) -> IngestionJobResponseSchema:
+    """
+    Upload a document and process it in the background.
+
+    Parameters
+    ----------
+    request : Request
+        The request, whose multipart body holds the file to process.
+    document_service : DocumentService
+        The document service for processing the file.
+    ingestion_job_service : IngestionJobService
+        The service running the ingestion jobs.
+    settings : Settings
+        The application settings.
+
+    Returns
+    -------
+    IngestionJobResponseSchema
+        The queued job, poll ``GET /document/jobs/{job_id}`` for progress.
+
+    Raises
+    ------
+    HTTPException
+        If the file name is missing, if the file is larger than
+        ``max_upload_size`` or if too many jobs are already waiting.
+    """
+    filename, temp_file_path = await _receive_upload(
+        request, settings.max_upload_size, settings.upload_chunk_size
+    )
+
+    try:
+        job = ingestion_job_service.submit(
+            filename, temp_file_path, document_service
+        )
+    except asyncio.QueueFull:
+        os.remove(temp_file_path)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many documents are waiting to be processed",
+        )
+
+    return IngestionJobResponseSchema(**job.model_dump())
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponseSchema)
+async def get_ingestion_job_endpoint(
+    job_id: str,
+    ingestion_job_service: IngestionJobService = Depends(
+        get_ingestion_job_service
+    ),
+) -> IngestionJobResponseSchema:
+    """
+    Get the progress of an ingestion job.
+
+    Parameters
+    ----------
+    job_id : str
+        The ID of the job.
+    ingestion_job_service : IngestionJobService
+        The service running the ingestion jobs.
+
+    Returns
+    -------
+    IngestionJobResponseSchema
+        The stage of the job and the number of chunks processed so far.
+
+    Raises
+    ------
+    HTTPException
+        If the job does not exist.
+    """
+    job = ingestion_job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ingestion job {job_id} not found",
+        )
+    return IngestionJobResponseSchema(**job.model_dump())
 
 
 @router.delete("/{document_id}", response_model=DeleteDocumentResponseSchema)
@@ -1,18 +1,31 @@
 """Query router."""
 
+import asyncio
 import logging
 import uuid
+from typing import AsyncIterator, Dict, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from app.core.dependencies import get_llm_service, get_vector_db_service
+from app.core.dependencies import (
+    get_llm_service,
+    get_query_semaphore,
+    get_vector_db_service,
+)
 from app.schemas.query_api import (
     QueryAnswer,
     QueryAnswerResponse,
+    QueryBatchEventSchema,
+    QueryBatchRequestSchema,
+    QueryBatchResponseSchema,
+    QueryBatchResultSchema,
     QueryRequestSchema,
     QueryResult,
 )
+from app.services.batch_memo import batch_memo
 from app.services.llm.base import CompletionService
+from app.services.llm.cached_completion_service import bypass_answer_cache
 from app.services.query_service import (
     decomposition_query,
     hybrid_query,
@@ -28,6 +41,98 @@ router = APIRouter(tags=["query"])
 logger.info("Query router initialized")
 
 
+# Queries on this document are answered without retrieval
+INFERENCE_DOCUMENT_ID = "00000000000000000000000000000000"
+
+
+def _query_type(request: QueryRequestSchema) -> str:
+    """Determine the query type of a request."""
+    return (
+        "hybrid"
+        if request.prompt.rules or request.prompt.type == "bool"
+        else "vector"
+    )
+
+
+async def _answer_query(
+    request: QueryRequestSchema,
+    llm_service: CompletionService,
+    vector_db_service: VectorDBService,
+) -> QueryAnswerResponse:
+    """Answer a single query, skipping cached answers if asked to."""
+    with bypass_answer_cache(request.bypass_cache):
+        return await _generate_answer(request, llm_service, vector_db_service)
+
+
+async def _generate_answer(
+    request: QueryRequestSchema,
+    llm_service: CompletionService,
+    vector_db_service: VectorDBService,
+) -> QueryAnswerResponse:
+    """Answer a single query."""
+    if request.document_id == INFERENCE_DOCUMENT_ID:
+        query_response = await inference_query(
+            request.prompt.query,
+            request.prompt.rules,
+            request.prompt.type,
+            llm_service,
+        )
+
+        if not isinstance(query_response, QueryResult):
+            query_response = QueryResult(**query_response)
+
+        answer = QueryAnswer(
+            id=uuid.uuid4().hex,
+            document_id=request.document_id,
+            prompt_id=request.prompt.id,
+            answer=query_response.answer,
+            type=request.prompt.type,
+        )
+        response_data = QueryAnswerResponse(
+            answer=answer, chunks=query_response.chunks
+        )
+
+        return response_data
+
+    logger.info(f"Received query request: {request.model_dump()}")
+
+    query_type = _query_type(request)
+
+    query_functions = {
+        "decomposed": decomposition_query,
+        "hybrid": hybrid_query,
+        "vector": simple_vector_query,
+    }
+
+    query_response = await query_functions[query_type](
+        request.prompt.query,
+        request.document_id,
+        request.prompt.rules,
+        request.prompt.type,
+        llm_service,
+        vector_db_service,
+    )
+
+    if not isinstance(query_response, QueryResult):
+        query_response = QueryResult(**query_response)
+
+    answer = QueryAnswer(
+        id=uuid.uuid4().hex,
+        document_id=request.document_id,
+        prompt_id=request.prompt.id,
+        answer=query_response.answer,
+        type=request.prompt.type,
+    )
+    # Include resolved_entities in the response
+    response_data = QueryAnswerResponse(
+        answer=answer,
+        chunks=query_response.chunks,
+        resolved_entities=query_response.resolved_entities,
+    )
+
+    return response_data
+
+
 @router.post("", response_model=QueryAnswerResponse)
 async def run_query(
     request: QueryRequestSchema,
@@ -60,83 +165,234 @@ async def run_query(
     HTTPException
         If there's an error processing the query.
     """
-    if request.document_id == "00000000000000000000000000000000":
-        query_response = await inference_query(
-            request.prompt.query,
-            request.prompt.rules,
-            request.prompt.type,
-            llm_service,
-        )
+    if request.document_id == INFERENCE_DOCUMENT_ID:
+        return await _answer_query(request, llm_service, vector_db_service)
 
-        if not isinstance(query_response, QueryResult):
-            query_response = QueryResult(**query_response)
+    try:
+        return await _answer_query(request, llm_service, vector_db_service)
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        answer = QueryAnswer(
-            id=uuid.uuid4().hex,
-            document_id=request.document_id,
-            prompt_id=request.prompt.id,
-            answer=query_response.answer,
-            type=request.prompt.type,
-        )
-        response_data = QueryAnswerResponse(
-            answer=answer, chunks=query_response.chunks
+
+def _cell_key(request: QueryRequestSchema) -> str:
+    """Identify the queries that share the same answer."""
+    return (
+        f"{request.document_id}:{request.bypass_cache}:"
+        + request.prompt.model_dump_json(exclude={"id"})
+    )
+
+
+def _start_batch(
+    queries: List[QueryRequestSchema],
+    llm_service: CompletionService,
+    vector_db_service: VectorDBService,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, "asyncio.Task[QueryAnswerResponse]"]:
+    """Start answering every distinct query of a batch."""
+
+    async def answer(query: QueryRequestSchema) -> QueryAnswerResponse:
+        async with semaphore:
+            return await _answer_query(query, llm_service, vector_db_service)
+
+    # Vector queries asked of several documents are searched at once
+    columns: Dict[str, List[str]] = {}
+    for query in queries:
+        if (
+            query.document_id != INFERENCE_DOCUMENT_ID
+            and _query_type(query) == "vector"
+        ):
+            document_ids = columns.setdefault(query.prompt.query, [])
+            if query.document_id not in document_ids:
+                document_ids.append(query.document_id)
+
+    tasks: Dict[str, "asyncio.Task[QueryAnswerResponse]"] = {}
+    with batch_memo():
+        for query_text, document_ids in columns.items():
+            if len(document_ids) > 1:
+                vector_db_service.prefetch_vector_search(
+                    query_text, document_ids
+                )
+        for query in queries:
+            key = _cell_key(query)
+            if key not in tasks:
+                tasks[key] = asyncio.create_task(answer(query))
+    logger.info(
+        f"Running {len(tasks)} unique queries for {len(queries)} cells"
+    )
+    return tasks
+
+
+def _batch_result(
+    query: QueryRequestSchema, task: "asyncio.Task[QueryAnswerResponse]"
+) -> QueryBatchResultSchema:
+    """Build the result of a cell from its finished task."""
+    error = task.exception()
+    if error is not None:
+        logger.error(f"Error processing batch query: {error}")
+        return QueryBatchResultSchema(
+            answer=QueryAnswer(
+                id=uuid.uuid4().hex,
+                document_id=query.document_id,
+                prompt_id=query.prompt.id,
+                answer=None,
+                type=query.prompt.type,
+            ),
+            chunks=[],
+            error="Internal server error",
         )
 
-        return response_data
+    response = task.result()
+    return QueryBatchResultSchema(
+        answer=response.answer.model_copy(
+            update={"id": uuid.uuid4().hex, "prompt_id": query.prompt.id}
+        ),
+        chunks=response.chunks,
+        resolved_entities=response.resolved_entities,
+    )
+
+
+@router.post("/batch", response_model=QueryBatchResponseSchema)
+async def run_query_batch(
+    request: QueryBatchRequestSchema,
+    llm_service: CompletionService = Depends(get_llm_service),
+    vector_db_service: VectorDBService = Depends(get_vector_db_service),
+    semaphore: asyncio.Semaphore = Depends(get_query_semaphore),
+) -> QueryBatchResponseSchema:
+    """
+    Run many queries, e.g. every cell of a table region, in one request.
+
+    Identical queries are answered once, and the query embeddings and
+    keywords are computed once for the whole batch, so a column query
+    asked of many documents is embedded only once. The queries are
+    answered concurrently, with at most ``query_max_concurrency`` queries
+    in flight across all batches.
+
+    Parameters
+    ----------
+    request : QueryBatchRequestSchema
+        The queries to run.
+    llm_service : CompletionService
+        The language model service.
+    vector_db_service : VectorDBService
+        The vector database service.
+    semaphore : asyncio.Semaphore
+        The semaphore bounding the queries answered at once.
 
+    Returns
+    -------
+    QueryBatchResponseSchema
+        One result per query, in the order of the queries. A query that
+        failed has no answer and its ``error`` set. The queries still
+        running are cancelled when the request is cancelled.
+    """
+    tasks = _start_batch(
+        request.queries, llm_service, vector_db_service, semaphore
+    )
     try:
-        logger.info(f"Received query request: {request.model_dump()}")
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+    finally:
+        # The request was cancelled, drop the queries that are still
+        # running
+        for task in tasks.values():
+            task.cancel()
 
-        # Determine query type
-        query_type = (
-            "hybrid"
-            if request.prompt.rules or request.prompt.type == "bool"
-            else "vector"
-        )
+    return QueryBatchResponseSchema(
+        results=[
+            _batch_result(query, tasks[_cell_key(query)])
+            for query in request.queries
+        ]
+    )
 
-        query_functions = {
-            "decomposed": decomposition_query,
-            "hybrid": hybrid_query,
-            "vector": simple_vector_query,
-        }
 
-        query_response = await query_functions[query_type](
-            request.prompt.query,
-            request.document_id,
-            request.prompt.rules,
-            request.prompt.type,
-            llm_service,
-            vector_db_service,
-        )
+async def _stream_batch(
+    queries: List[QueryRequestSchema],
+    llm_service: CompletionService,
+    vector_db_service: VectorDBService,
+    semaphore: asyncio.Semaphore,
+    event_stream: bool,
+) -> AsyncIterator[str]:
+    """Yield the result of every cell as soon as it is answered."""
+    tasks = _start_batch(queries, llm_service, vector_db_service, semaphore)
+    cells: Dict[str, List[int]] = {}
+    for index, query in enumerate(queries):
+        cells.setdefault(_cell_key(query), []).append(index)
+    keys = {task: key for key, task in tasks.items()}
 
-        if not isinstance(query_response, QueryResult):
-            query_response = QueryResult(**query_response)
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                for index in cells[keys[task]]:
+                    query = queries[index]
+                    event = QueryBatchEventSchema(
+                        index=index,
+                        document_id=query.document_id,
+                        prompt_id=query.prompt.id,
+                        **dict(_batch_result(query, task)),
+                    ).model_dump_json()
+                    yield (
+                        f"data: {event}\n\n" if event_stream else event + "\n"
+                    )
+    finally:
+        # The client went away or the stream failed, drop the queries
+        # that are still running
+        for task in tasks.values():
+            task.cancel()
 
-        # response_data = QueryResponseSchema(
-        #     id=str(uuid.uuid4()),
-        #     document_id=request.document_id,
-        #     prompt_id=request.prompt.id,
-        #     type=request.prompt.type,
-        #     answer=query_response.answer,
-        #     chunks=query_response.chunks,
-        # )
 
-        answer = QueryAnswer(
-            id=uuid.uuid4().hex,
-            document_id=request.document_id,
-            prompt_id=request.prompt.id,
-            answer=query_response.answer,
-            type=request.prompt.type,
-        )
-        # Include resolved_entities in the response
-        response_data = QueryAnswerResponse(
-            answer=answer,
-            chunks=query_response.chunks,
-            resolved_entities=query_response.resolved_entities,  # Add this line
-        )
+@router.post("/batch/stream")
+async def run_query_batch_stream(
+    request: QueryBatchRequestSchema,
+    http_request: Request,
+    llm_service: CompletionService = Depends(get_llm_service),
+    vector_db_service: VectorDBService = Depends(get_vector_db_service),
+    semaphore: asyncio.Semaphore = Depends(get_query_semaphore),
+) -> StreamingResponse:
+    """
+    Run many queries and stream the answers as they complete.
 
-        return response_data
+    Works like ``POST /query/batch`` but sends every cell as soon as it is
+    answered instead of waiting for the whole batch. Each cell is sent as
+    a ``QueryBatchEventSchema``, tagged with its index in the request and
+    its document (row) and prompt (column) ids, as one line of
+    newline-delimited JSON, or as a server-sent event when the request
+    accepts ``text/event-stream``. The queries still running are
+    cancelled when the client disconnects.
 
-    except Exception as e:
-        logger.error(f"Error processing query: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    Parameters
+    ----------
+    request : QueryBatchRequestSchema
+        The queries to run.
+    http_request : Request
+        The HTTP request, used to pick the stream format.
+    llm_service : CompletionService
+        The language model service.
+    vector_db_service : VectorDBService
+        The vector database service.
+    semaphore : asyncio.Semaphore
+        The semaphore bounding the queries answered at once.
+
+    Returns
+    -------
+    StreamingResponse
+        The stream of answered cells, in the order they complete.
+    """
+    event_stream = "text/event-stream" in http_request.headers.get(
+        "accept", ""
+    )
+    return StreamingResponse(
+        _stream_batch(
+            request.queries,
+            llm_service,
+            vector_db_service,
+            semaphore,
+            event_stream,
+        ),
+        media_type=(
+            "text/event-stream" if event_stream else "application/x-ndjson"
+        ),
+    )
@@ -6,7 +6,7 @@ SettingsConfigDict to load environment variables from a .env file.
 
 import logging
 from functools import lru_cache
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -31,6 +31,22 @@ class Qdrant(BaseSettings):
     host: Optional[str] = None
     path: Optional[str] = None
 
+    # Use AsyncQdrantClient instead of the blocking QdrantClient
+    asynchronous: bool = False
+    # Tokenizer of the full-text index on chunk texts: "word", "whitespace",
+    # "prefix" or "multilingual"
+    tokenizer: str = "word"
+    # Mark document_id as the tenant key, storing each document's points
+    # together
+    tenant: bool = True
+
+    def client_config(self) -> Dict[str, Any]:
+        """Get the keyword arguments for the Qdrant client."""
+        return self.model_dump(
+            exclude_none=True,
+            exclude={"asynchronous", "tokenizer", "tenant"},
+        )
+
 
 class Settings(BaseSettings):
     """Settings class for the application."""
@@ -50,9 +66,22 @@ class Settings(BaseSettings):
     dimensions: int = 1536
     embedding_provider: str = "openai"
     embedding_model: str = "text-embedding-3-small"
+    embedding_batch_size: int = 256
+    embedding_batch_max_tokens: int = 100000
+    embedding_max_concurrency: int = 8
+    embedding_cache: bool = True
+    embedding_cache_path: Optional[str] = "./embedding_cache.db"
+    embedding_cache_memory_size: int = 10000  # vectors kept in memory
     llm_provider: str = "openai"
     llm_model: str = "gpt-4o"
+    llm_max_concurrency: int = 16
+    answer_cache: str = "memory"  # "memory", "sqlite" or "none"
+    answer_cache_path: str = "./answer_cache.db"
+    answer_cache_size: int = 10000  # answers kept
+    answer_cache_ttl: float = 86400  # seconds, 0 never expires
     openai_api_key: Optional[str] = None
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
 
     # VECTOR DATABASE CONFIG
     vector_db_provider: str = "milvus"
@@ -61,17 +90,43 @@ class Settings(BaseSettings):
     # MILVUS CONFIG
     milvus_db_uri: str = "./milvus_demo.db"
     milvus_db_token: str = "root:Milvus"
+    milvus_max_workers: int = 4
+    milvus_client_pool_size: int = 4
+    milvus_num_partitions: int = 64  # partitions holding the documents
+    milvus_chunk_counts_path: Optional[str] = "./chunk_counts.db"
 
     # QDRANT CONFIG
     qdrant: Qdrant = Field(default_factory=lambda: Qdrant())
 
     # QUERY CONFIG
     query_type: str = "hybrid"
+    query_max_concurrency: int = 32  # batch queries answered at once
+    sparse_vectors: bool = True  # BM25 sparse vectors in new collections
+    hybrid_search_limit: int = 40  # chunks kept by a fused hybrid search
+    rrf_k: int = 60  # reciprocal rank fusion constant
+    query_embedding_cache_size: int = 1024  # query embeddings kept
+    query_embedding_cache_ttl: float = 3600  # seconds, 0 never expires
+    keyword_cache_size: int = 4096  # queries whose keywords are kept
+    keyword_cache_path: Optional[str] = "./keyword_cache.db"
+    keyword_index_path: Optional[str] = "./keyword_index.db"
+    keyword_index_cache_size: int = 64  # documents whose index is in memory
+    keyword_candidate_limit: int = 1000  # chunks fetched by keyword filters
+    keyword_page_size: int = 256  # chunks fetched per request
 
     # DOCUMENT PROCESSING CONFIG
     loader: str = "pypdf"
     chunk_size: int = 512
     chunk_overlap: int = 64
+    pdf_parse_workers: int = 0  # processes, 0 parses PDFs in a thread
+    pdf_pages_per_task: int = 20
+    max_upload_size: int = 512 * 1024 * 1024  # bytes
+    upload_chunk_size: int = 1024 * 1024  # bytes written at a time
+    ingestion_max_workers: int = 2
+    ingestion_max_pending_jobs: int = 100
+    ingestion_pipeline: bool = False
+    ingestion_batch_size: int = 256  # chunks embedded and upserted at once
+    ingestion_queue_size: int = 4  # batches buffered between two stages
+    ingestion_embedding_workers: int = 4
 
     # UNSTRUCTURED CONFIG
     unstructured_api_key: Optional[str] = None
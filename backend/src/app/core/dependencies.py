@@ -1,22 +1,114 @@
-"""Dependencies for the application."""
+"""Dependencies for the application.
 
-from fastapi import Depends
+The services are created once per application in the lifespan hook (see
+``startup_services``) and held on ``app.state``. Each dependency returns the
+shared instance and only falls back to building a new one when the
+application was not started through its lifespan. Tests can still swap any
+of them through ``app.dependency_overrides``.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import Depends, FastAPI, Request
 
 from app.core.config import Settings, get_settings
 from app.services.document_service import DocumentService
 from app.services.embedding.base import EmbeddingService
 from app.services.embedding.factory import EmbeddingServiceFactory
+from app.services.ingestion_job_service import IngestionJobService
 from app.services.llm.base import CompletionService
 from app.services.llm.factory import CompletionServiceFactory
 from app.services.vector_db.base import VectorDBService
 from app.services.vector_db.factory import VectorDBFactory
 
+logger = logging.getLogger(__name__)
+
+# Closed in this order on shutdown, dependents first
+SERVICE_NAMES = (
+    "ingestion_job_service",
+    "document_service",
+    "vector_db_service",
+    "embedding_service",
+    "llm_service",
+)
+
+
+def _try_create(name: str, create: Callable[[], Any]) -> Optional[Any]:
+    """Create a service at startup, logging instead of failing the app."""
+    try:
+        return create()
+    except Exception as e:
+        logger.error(f"Failed to create {name} at startup: {e}")
+        return None
+
+
+async def startup_services(app: FastAPI, settings: Settings) -> None:
+    """Create the application-scoped services and store them on the app."""
+    state = app.state
+
+    state.llm_service = _try_create(
+        "llm_service",
+        lambda: CompletionServiceFactory.create_service(settings),
+    )
+    state.embedding_service = _try_create(
+        "embedding_service",
+        lambda: EmbeddingServiceFactory.create_service(settings),
+    )
+
+    state.vector_db_service = None
+    if state.embedding_service is not None and state.llm_service is not None:
+        state.vector_db_service = _try_create(
+            "vector_db_service",
+            lambda: VectorDBFactory.create_vector_db_service(
+                state.embedding_service, state.llm_service, settings
+            ),
+        )
+
+    state.document_service = None
+    if state.vector_db_service is not None:
+        try:
+            await state.vector_db_service.ensure_collection_ready()
+        except Exception as e:
+            # Retried on the first upload
+            logger.error(f"Failed to prepare the vector collection: {e}")
+        state.document_service = DocumentService(
+            state.vector_db_service, state.llm_service, settings
+        )
+
+    state.query_semaphore = asyncio.Semaphore(settings.query_max_concurrency)
+
+    state.ingestion_job_service = IngestionJobService(settings)
+    state.ingestion_job_service.start()
+
+
+async def shutdown_services(app: FastAPI) -> None:
+    """Close the application-scoped services."""
+    for name in SERVICE_NAMES:
+        service = getattr(app.state, name, None)
+        setattr(app.state, name, None)
+        if service is None:
+            continue
+        try:
+            await service.aclose()
+        except Exception as e:
+            logger.error(f"Error closing {name}: {e}")
+
+
+def _get_shared_service(request: Request, name: str) -> Optional[Any]:
+    """Get a service created at startup, if there is one."""
+    return getattr(request.app.state, name, None)
+
 
 def get_llm_service(
+    request: Request,
     settings: Settings = Depends(get_settings),
 ) -> CompletionService:
     """Get the LLM service for the application."""
-    llm_service = CompletionServiceFactory.create_service(settings)
+    llm_service = _get_shared_service(request, "llm_service")
+    if llm_service is None:
+        llm_service = CompletionServiceFactory.create_service(settings)
     if llm_service is None:
         raise ValueError(
             f"Failed to create LLM service for provider: {settings.llm_provider}"
@@ -25,10 +117,13 @@ def get_llm_service(
 
 
 def get_embedding_service(
+    request: Request,
     settings: Settings = Depends(get_settings),
 ) -> EmbeddingService:
     """Get the embedding service for the application."""
-    embedding_service = EmbeddingServiceFactory.create_service(settings)
+    embedding_service = _get_shared_service(request, "embedding_service")
+    if embedding_service is None:
+        embedding_service = EmbeddingServiceFactory.create_service(settings)
     if embedding_service is None:
         raise ValueError(
             f"Failed to create embedding service for provider: {settings.embedding_provider}"
@@ -37,14 +132,17 @@ def get_embedding_service(
 
 
 def get_vector_db_service(
+    request: Request,
     settings: Settings = Depends(get_settings),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
     llm_service: CompletionService = Depends(get_llm_service),
 ) -> VectorDBService:
     """Get the vector database service for the application."""
-    vector_db_service = VectorDBFactory.create_vector_db_service(
-        embedding_service, llm_service, settings
-    )
+    vector_db_service = _get_shared_service(request, "vector_db_service")
+    if vector_db_service is None:
+        vector_db_service = VectorDBFactory.create_vector_db_service(
+            embedding_service, llm_service, settings
+        )
     if vector_db_service is None:
         raise ValueError(
             f"Failed to create vector database service for provider: {settings.vector_db_provider}"
@@ -52,10 +150,59 @@ def get_vector_db_service(
     return vector_db_service
 
 
-def get_document_service(
+async def get_document_service(
+    request: Request,
     settings: Settings = Depends(get_settings),
     vector_db_service: VectorDBService = Depends(get_vector_db_service),
     llm_service: CompletionService = Depends(get_llm_service),
-) -> DocumentService:
-    """Get the document service for the application."""
-    return DocumentService(vector_db_service, llm_service, settings)
+) -> AsyncIterator[DocumentService]:
+    """Get the document service for the application.
+
+    The shared instance is only returned when it uses the injected services,
+    so that overriding either of them also applies to documents; otherwise
+    a service sharing its PDF process pool is. Without the lifespan, the
+    service only lives for the request.
+    """
+    document_service = _get_shared_service(request, "document_service")
+    if document_service is not None:
+        if (
+            document_service.vector_db_service is vector_db_service
+            and document_service.llm_service is llm_service
+        ):
+            yield document_service
+        else:
+            yield document_service.with_services(
+                vector_db_service, llm_service
+            )
+        return
+
+    document_service = DocumentService(
+        vector_db_service, llm_service, settings
+    )
+    try:
+        yield document_service
+    finally:
+        await document_service.aclose()
+
+
+def get_ingestion_job_service(request: Request) -> IngestionJobService:
+    """Get the ingestion job service for the application."""
+    ingestion_job_service = _get_shared_service(
+        request, "ingestion_job_service"
+    )
+    if ingestion_job_service is None:
+        raise ValueError(
+            "Ingestion jobs require the application lifespan to be running"
+        )
+    return ingestion_job_service
+
+
+def get_query_semaphore(
+    request: Request,
+    settings: Settings = Depends(get_settings),
+) -> asyncio.Semaphore:
+    """Get the semaphore bounding the batch queries answered at once."""
+    semaphore = _get_shared_service(request, "query_semaphore")
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.query_max_concurrency)
+    return semaphore
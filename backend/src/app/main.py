@@ -1,22 +1,43 @@
 """Main module for the Knowledge Table API service."""
 
 import logging
-from typing import Any, Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.api import api_router
 from app.core.config import Settings, get_settings
+from app.core.dependencies import shutdown_services, startup_services
+from app.services.embedding.cached_embedding_service import (
+    CachedEmbeddingService,
+)
+from app.services.llm.cached_completion_service import CachedCompletionService
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create the shared services on startup and close them on shutdown."""
+    # Honour settings overrides so tests can swap the configuration
+    app_settings = app.dependency_overrides.get(get_settings, get_settings)()
+
+    await startup_services(app, app_settings)
+    try:
+        yield
+    finally:
+        await shutdown_services(app)
+
+
 app = FastAPI(
     title=settings.project_name,
     openapi_url=f"{settings.api_v1_str}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Allow CORS for all origins
@@ -40,3 +61,21 @@ async def pong(settings: Settings = Depends(get_settings)) -> Dict[str, Any]:
         "environment": settings.environment,
         "testing": settings.testing,
     }
+
+
+@app.get("/stats")
+async def stats(request: Request) -> Dict[str, Any]:
+    """Get the hit rates and sizes of the embedding and answer caches.
+
+    A cache is left out when it is disabled or the services were not
+    started through the lifespan.
+    """
+    state = request.app.state
+    caches: Dict[str, Any] = {}
+    embedding_service = getattr(state, "embedding_service", None)
+    if isinstance(embedding_service, CachedEmbeddingService):
+        caches["embedding_cache"] = await embedding_service.stats()
+    llm_service = getattr(state, "llm_service", None)
+    if isinstance(llm_service, CachedCompletionService):
+        caches["answer_cache"] = await llm_service.stats()
+    return caches
@@ -0,0 +1,29 @@
+"""Ingestion job model."""
+
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+IngestionStage = Literal[
+    "queued", "loading", "embedding", "upserting", "completed", "failed"
+]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IngestionJob(BaseModel):
+    """Ingestion job model."""
+
+    id: str
+    filename: str
+    stage: IngestionStage = "queued"
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    document_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=_now)
+    updated_at: datetime = Field(default_factory=_now)
@@ -5,6 +5,7 @@ from typing import Annotated
 from pydantic import BaseModel, Field
 
 from app.models.document import Document
+from app.models.ingestion_job import IngestionJob
 
 
 class DocumentCreateSchema(BaseModel):
@@ -30,3 +31,9 @@ class DeleteDocumentResponseSchema(BaseModel):
     id: str
     status: str
     message: str
+
+
+class IngestionJobResponseSchema(IngestionJob):
+    """Schema for ingestion job response."""
+
+    pass
@@ -31,6 +31,8 @@ class QueryRequestSchema(BaseModel):
 
     document_id: str
     prompt: QueryPromptSchema
+    # Ask the LLM again instead of returning a cached answer
+    bypass_cache: bool = False
 
     model_config = ConfigDict(extra="allow")
 
@@ -81,5 +83,31 @@ class QueryAnswerResponse(BaseModel):
     resolved_entities: Optional[List[ResolvedEntitySchema]] = None
 
 
+class QueryBatchRequestSchema(BaseModel):
+    """Batch query request schema, one query per table cell."""
+
+    queries: List[QueryRequestSchema]
+
+
+class QueryBatchResultSchema(QueryAnswerResponse):
+    """Answer to one query of a batch, with the error if it failed."""
+
+    error: Optional[str] = None
+
+
+class QueryBatchEventSchema(QueryBatchResultSchema):
+    """Answer to one query of a streamed batch, tagged with its cell."""
+
+    index: int
+    document_id: str
+    prompt_id: str
+
+
+class QueryBatchResponseSchema(BaseModel):
+    """Batch query response schema, in the order of the queries."""
+
+    results: List[QueryBatchResultSchema]
+
+
 # Type for search responses (used in service layer)
 SearchResponse = Union[dict[str, List[Chunk]], VectorResponseSchema]
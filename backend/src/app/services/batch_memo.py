@@ -0,0 +1,73 @@
+"""Share work between the queries of a batch.
+
+Inside ``batch_memo()``, ``memoize`` runs each distinct piece of work once
+and hands the same result to every query asking for it, including queries
+that ask while the first computation is still running. Work is cancelled
+once every query waiting for it was cancelled, see ``SingleFlight``.
+Outside of a batch ``memoize`` simply runs the computation.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+from app.services.single_flight import SingleFlight
+
+T = TypeVar("T")
+
+_memo: ContextVar[Optional[Dict[Hashable, SingleFlight[Any]]]] = ContextVar(
+    "batch_memo", default=None
+)
+
+
+@contextmanager
+def batch_memo() -> Iterator[None]:
+    """Share the work of the tasks created in this block."""
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+async def memoize(key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+    """Compute a value once per batch."""
+    memo = _memo.get()
+    if memo is None:
+        return await compute()
+
+    flight = memo.get(key)
+    if flight is None:
+        flight = memo[key] = SingleFlight(compute)
+    result: T = await flight.wait()
+    return result
+
+
+def schedule(key: Hashable, compute: Callable[[], Awaitable[Any]]) -> None:
+    """Set how to compute a value the queries of the batch will ask for.
+
+    The value is computed by the first query asking for it, within that
+    query's own limits, e.g. its slot of the query semaphore. Does nothing
+    outside of a batch or if the value is already known.
+    """
+    memo = _memo.get()
+    if memo is not None and key not in memo:
+        memo[key] = SingleFlight(compute)
+
+
+async def recall(key: Hashable) -> Optional[Any]:
+    """Get a value computed for the batch, or None if there is none."""
+    memo = _memo.get()
+    flight = memo.get(key) if memo is not None else None
+    if flight is None:
+        return None
+    return await flight.wait()
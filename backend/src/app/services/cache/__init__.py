@@ -0,0 +1,17 @@
+"""Caches shared by the services."""
+
+from app.services.cache.backends import (
+    CacheBackend,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+)
+from app.services.cache.memory import TTLCache
+from app.services.cache.tiered import TieredCache
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "SQLiteCacheBackend",
+    "TieredCache",
+    "TTLCache",
+]
@@ -0,0 +1,151 @@
+"""Key-value cache backends for serialized values."""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from app.services.cache.memory import TTLCache
+
+
+class CacheBackend(ABC):
+    """A cache of string values by string key, with size and age limits."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Get the value of a key, if cached and not expired."""
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: str) -> None:
+        """Cache a value."""
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, float]:
+        """Get the hit rate and size of the cache."""
+        pass
+
+    async def aclose(self) -> None:
+        """Release any resources held by the backend."""
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local cache backend, see ``TTLCache``."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None) -> None:
+        self.cache: TTLCache[str, str] = TTLCache(max_size, ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get the value of a key, if cached and not expired."""
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        """Cache a value."""
+        self.cache.set(key, value)
+
+    async def stats(self) -> Dict[str, float]:
+        """Get the hit rate and size of the cache."""
+        return self.cache.stats()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache backend persisted in a SQLite database.
+
+    Survives restarts and can be shared by several processes. Once the
+    cache holds more than ``max_size`` values, the values written longest
+    ago are dropped.
+    """
+
+    def __init__(
+        self, path: str, max_size: int, ttl: Optional[float] = None
+    ) -> None:
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL)"
+            )
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get the value of a key, if cached and not expired."""
+        value = await asyncio.to_thread(self._get, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and time.time() >= expires_at:
+                self._connection.execute(
+                    "DELETE FROM cache WHERE key = ?", (key,)
+                )
+                return None
+            return str(value)
+
+    async def set(self, key: str, value: str) -> None:
+        """Cache a value."""
+        if self.max_size <= 0:
+            return
+        await asyncio.to_thread(self._set, key, value)
+
+    def _set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at)"
+                " VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            # Replaced rows get a new rowid, so the lowest rowids are the
+            # values written longest ago
+            self._connection.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache"
+                " ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    async def stats(self) -> Dict[str, float]:
+        """Get the hit rate and size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": await asyncio.to_thread(self._count),
+        }
+
+    def _count(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM cache"
+            ).fetchone()
+        return int(count)
+
+    async def aclose(self) -> None:
+        """Close the database."""
+        await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,127 @@
+"""In-memory cache with expiry and single-flight lookups."""
+
+import functools
+import time
+from collections import OrderedDict
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from app.services.single_flight import SingleFlight
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Size-bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    ``get_or_compute`` runs a single computation per missing key: callers
+    asking for a key while it is being computed wait for that computation
+    instead of starting their own, and the computation is cancelled once
+    every caller waiting for it was cancelled. None is never cached. A
+    ``ttl`` of None keeps entries until they are evicted.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        # Values with the time they expire at
+        self._entries: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        self._pending: Dict[K, SingleFlight[V]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        """Count the cached entries, including expired ones."""
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        """Get the value of a key, if cached and not expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if self.clock() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """Cache a value, evicting the least recently used ones."""
+        if self.max_size <= 0:
+            return
+        expires_at = (
+            self.clock() + self.ttl if self.ttl is not None else float("inf")
+        )
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: K) -> None:
+        """Forget a key."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget every key."""
+        self._entries.clear()
+
+    async def get_or_compute(
+        self, key: K, compute: Callable[[], Awaitable[V]]
+    ) -> V:
+        """Get the value of a key, computing it once if it is missing."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        flight = self._pending.get(key)
+        if flight is None:
+            flight = self._pending[key] = SingleFlight(
+                functools.partial(self._compute, key, compute)
+            )
+        try:
+            return await flight.wait()
+        finally:
+            if not flight.waiters and self._pending.get(key) is flight:
+                del self._pending[key]
+
+    async def _compute(self, key: K, compute: Callable[[], Awaitable[V]]) -> V:
+        value = await compute()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        """Get the hit rate, size and eviction counts of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
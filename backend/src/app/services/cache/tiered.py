@@ -0,0 +1,52 @@
+"""Memory cache in front of a persistent cache backend."""
+
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.services.cache.backends import CacheBackend
+from app.services.cache.memory import TTLCache
+
+
+class TieredCache:
+    """Cache of JSON values in memory, backed by an optional backend.
+
+    Lookups missing from memory are read from the backend, and only the
+    values missing from both are computed, once for all concurrent callers
+    (see ``TTLCache.get_or_compute``). Computed values are written to both
+    tiers; None is never cached.
+    """
+
+    def __init__(
+        self, memory: TTLCache[str, Any], backend: Optional[CacheBackend]
+    ) -> None:
+        self.memory = memory
+        self.backend = backend
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Get the value of a key, computing it once if it is missing."""
+
+        async def load() -> Any:
+            if self.backend is not None:
+                cached = await self.backend.get(key)
+                if cached is not None:
+                    return json.loads(cached)
+            value = await compute()
+            if value is not None and self.backend is not None:
+                await self.backend.set(key, json.dumps(value))
+            return value
+
+        return await self.memory.get_or_compute(key, load)
+
+    async def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get the stats of both tiers."""
+        stats = {"memory": self.memory.stats()}
+        if self.backend is not None:
+            stats["backend"] = await self.backend.stats()
+        return stats
+
+    async def aclose(self) -> None:
+        """Close the backend."""
+        if self.backend is not None:
+            await self.backend.aclose()
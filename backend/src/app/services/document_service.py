@@ -1,16 +1,22 @@
 """Document service."""
 
+import asyncio
 import logging
+import multiprocessing
 import os
 import tempfile
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Optional
 
 from langchain.schema import Document as LangchainDocument
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from app.core.config import Settings
+from app.models.ingestion_job import IngestionStage
+from app.services.ingestion_pipeline import IngestionPipeline, ProgressCallback
 from app.services.llm.base import CompletionService
+from app.services.loaders.base import LoaderService
 from app.services.loaders.factory import LoaderFactory
 from app.services.vector_db.base import VectorDBService
 
@@ -31,6 +37,9 @@ class DocumentService:
         self.llm_service = llm_service
         self.settings = settings
         self.loader_factory = LoaderFactory()
+        self._pdf_executor: Optional[ProcessPoolExecutor] = None
+        # The service whose PDF process pool this one uses, see with_services
+        self._pdf_executor_owner: Optional["DocumentService"] = None
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.settings.chunk_size,
             chunk_overlap=self.settings.chunk_overlap,
@@ -43,37 +52,108 @@ class DocumentService:
     ) -> Optional[str]:
         """Upload a document."""
         try:
-
-            # Generate a document ID
-            document_id = self._generate_document_id()
-            logger.info(f"Created document_id: {document_id}")
-
             # Save the file to a temporary location
             with tempfile.NamedTemporaryFile(
                 delete=False, suffix=os.path.splitext(filename)[1]
             ) as temp_file:
                 temp_file.write(file_content)
                 temp_file_path = temp_file.name
+        except Exception as e:
+            logger.error(f"Error uploading document: {e}", exc_info=True)
+            return None
 
-            # Process the document
-            try:
-
-                chunks = await self._process_document(temp_file_path)
-
-                prepared_chunks = await self.vector_db_service.prepare_chunks(
-                    document_id, chunks
-                )
-                await self.vector_db_service.upsert_vectors(prepared_chunks)
-            finally:
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
+        try:
+            return await self.upload_document_from_path(
+                filename, temp_file_path
+            )
+        finally:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
 
-            return document_id
+    async def upload_document_from_path(
+        self,
+        filename: str,
+        file_path: str,
+    ) -> Optional[str]:
+        """Upload a document already saved to disk.
 
+        The file is left in place, removing it is up to the caller.
+        """
+        try:
+            return await self.ingest_document(file_path)
         except Exception as e:
             logger.error(f"Error uploading document: {e}", exc_info=True)
             return None
 
+    async def ingest_document(
+        self,
+        file_path: str,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        """Load, split, embed and upsert a document saved to disk.
+
+        With ``ingestion_pipeline`` enabled the stages run concurrently on
+        batches of chunks, see ``IngestionPipeline``. Otherwise each stage
+        processes the whole document before the next one starts. The words
+        of the chunks are indexed for keyword searches, see
+        ``KeywordIndex``.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the document to ingest.
+        on_progress : ProgressCallback, optional
+            Called with the stage the document reached and the chunk counts
+            (``chunks_total``, ``chunks_embedded``, ``chunks_upserted``)
+            that changed.
+
+        Returns
+        -------
+        str
+            The ID of the ingested document.
+        """
+
+        def report(stage: IngestionStage, **counts: int) -> None:
+            if on_progress is not None:
+                on_progress(stage, counts)
+
+        # Generate a document ID
+        document_id = self._generate_document_id()
+        logger.info(f"Created document_id: {document_id}")
+
+        keyword_index = await self.vector_db_service.upload_keyword_index()
+
+        if self.settings.ingestion_pipeline:
+            pipeline = IngestionPipeline(
+                self._create_loader(),
+                self.splitter,
+                self.vector_db_service,
+                batch_size=self.settings.ingestion_batch_size,
+                queue_size=self.settings.ingestion_queue_size,
+                embedding_workers=self.settings.ingestion_embedding_workers,
+                on_progress=on_progress,
+                keyword_index=keyword_index,
+            )
+            await pipeline.run(document_id, file_path)
+            return document_id
+
+        # Process the document
+        report("loading")
+        chunks = await self._process_document(file_path)
+
+        report("embedding", chunks_total=len(chunks))
+        prepared_chunks = await self.vector_db_service.prepare_chunks(
+            document_id, chunks
+        )
+
+        report("upserting", chunks_embedded=len(prepared_chunks))
+        await self.vector_db_service.upsert_vectors(prepared_chunks)
+        if keyword_index is not None:
+            await keyword_index.add_chunks(prepared_chunks)
+
+        report("completed", chunks_upserted=len(prepared_chunks))
+        return document_id
+
     async def _process_document(
         self, file_path: str
     ) -> List[LangchainDocument]:
@@ -81,20 +161,26 @@ class DocumentService:
         # Load the document
         docs = await self._load_document(file_path)
 
-        # Split the document into chunks
-        chunks = self.splitter.split_documents(docs)
+        # Split the document into chunks, off the event loop
+        chunks = await asyncio.to_thread(self.splitter.split_documents, docs)
         logger.info(f"Document split into {len(chunks)} chunks")
         return chunks
 
-    async def _load_document(self, file_path: str) -> List[LangchainDocument]:
-
-        # Create a loader
-        loader = self.loader_factory.create_loader(self.settings)
+    def _create_loader(self) -> LoaderService:
+        loader = self.loader_factory.create_loader(
+            self.settings, self._get_pdf_executor()
+        )
 
         if loader is None:
             raise ValueError(
                 f"No loader available for configured loader type: {self.settings.loader}"
             )
+        return loader
+
+    async def _load_document(self, file_path: str) -> List[LangchainDocument]:
+
+        # Create a loader
+        loader = self._create_loader()
 
         # Load the document
         try:
@@ -103,6 +189,36 @@ class DocumentService:
             logger.error(f"Loader failed: {e}. Unable to load document.")
             raise
 
+    def with_services(
+        self,
+        vector_db_service: VectorDBService,
+        llm_service: CompletionService,
+    ) -> "DocumentService":
+        """Get a document service for other backends.
+
+        The new service parses PDFs on this one's process pool, so it needs
+        no closing.
+        """
+        service = DocumentService(
+            vector_db_service, llm_service, self.settings
+        )
+        service._pdf_executor_owner = self
+        return service
+
+    def _get_pdf_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Get the process pool used to parse PDFs, if one is configured."""
+        if self._pdf_executor_owner is not None:
+            return self._pdf_executor_owner._get_pdf_executor()
+        if self.settings.pdf_parse_workers <= 0:
+            return None
+        if self._pdf_executor is None:
+            # Spawn rather than fork, the parent process runs threads
+            self._pdf_executor = ProcessPoolExecutor(
+                max_workers=self.settings.pdf_parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pdf_executor
+
     @staticmethod
     def _generate_document_id() -> str:
         return uuid.uuid4().hex
@@ -111,7 +227,16 @@ class DocumentService:
         """Delete a document."""
         try:
             result = await self.vector_db_service.delete_document(document_id)
+            keyword_index = await self.vector_db_service.upload_keyword_index()
+            if keyword_index is not None:
+                await keyword_index.remove(document_id)
             return result
         except Exception as e:
             logger.error(f"Error deleting document: {e}")
             raise
+
+    async def aclose(self) -> None:
+        """Shut down the PDF process pool."""
+        executor, self._pdf_executor = self._pdf_executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
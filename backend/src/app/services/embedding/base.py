@@ -11,3 +11,7 @@ class EmbeddingService(ABC):
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Get the embeddings for the given text."""
         pass
+
+    async def aclose(self) -> None:
+        """Release any resources held by the service."""
+        pass
@@ -0,0 +1,57 @@
+"""Helpers for splitting embedding inputs into request-sized batches."""
+
+import math
+from typing import Callable, List, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a tokenizer.
+
+    English text averages about four characters per token, so three
+    characters per token errs on the side of smaller batches.
+    """
+    return max(1, math.ceil(len(text) / 3))
+
+
+def pack_batches(
+    texts: List[str],
+    max_tokens: int,
+    max_items: int,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> List[Tuple[int, int]]:
+    """
+    Pack consecutive texts into batches bounded by tokens and item count.
+
+    Parameters
+    ----------
+    texts : List[str]
+        The texts to embed, in input order.
+    max_tokens : int
+        The maximum number of tokens in a single batch. A text that exceeds
+        this limit on its own is placed in a batch by itself.
+    max_items : int
+        The maximum number of texts in a single batch.
+    count_tokens : Callable[[str], int]
+        The function used to count the tokens of a text.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        The ``(start, end)`` slice bounds of each batch, in input order.
+    """
+    batches: List[Tuple[int, int]] = []
+    start, batch_tokens = 0, 0
+
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if i > start and (
+            batch_tokens + tokens > max_tokens or i - start >= max_items
+        ):
+            batches.append((start, i))
+            start, batch_tokens = i, 0
+        batch_tokens += tokens
+
+    if start < len(texts):
+        batches.append((start, len(texts)))
+
+    return batches
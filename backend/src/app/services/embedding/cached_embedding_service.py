@@ -0,0 +1,207 @@
+"""Embedding service caching the embeddings of another one."""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import Settings
+from app.services.embedding.base import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+# Keeps the number of SQL variables of a lookup under SQLite's limit
+_LOOKUP_BATCH_SIZE = 500
+
+
+class EmbeddingStore:
+    """On-disk store of embeddings in a SQLite database.
+
+    Vectors are stored as float32 blobs, keyed by the embedding model, the
+    dimensions and the SHA-256 of the text. The connection is shared
+    between threads and guarded by a lock, call the methods from a worker
+    thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " dimensions INTEGER NOT NULL,"
+                " text_hash BLOB NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, dimensions, text_hash))"
+            )
+
+    def get_many(
+        self, model: str, dimensions: int, hashes: Sequence[bytes]
+    ) -> Dict[bytes, "array[float]"]:
+        """Get the stored vectors of the given text hashes."""
+        found: Dict[bytes, "array[float]"] = {}
+        with self._lock:
+            for start in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+                batch = hashes[start : start + _LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self._connection.execute(
+                    "SELECT text_hash, vector FROM embeddings"  # nosec B608
+                    " WHERE model = ? AND dimensions = ?"
+                    f" AND text_hash IN ({placeholders})",
+                    (model, dimensions, *batch),
+                )
+                for text_hash, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector
+        return found
+
+    def put_many(
+        self,
+        model: str,
+        dimensions: int,
+        vectors: Dict[bytes, "array[float]"],
+    ) -> None:
+        """Store vectors by text hash."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings"
+                " (model, dimensions, text_hash, vector)"
+                " VALUES (?, ?, ?, ?)",
+                [
+                    (model, dimensions, text_hash, vector.tobytes())
+                    for text_hash, vector in vectors.items()
+                ],
+            )
+
+    def count(self) -> int:
+        """Count the stored vectors."""
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+class CachedEmbeddingService(EmbeddingService):
+    """Embedding service answering repeated texts from a cache.
+
+    Embeddings are looked up in an in-memory LRU of ``memory_size``
+    vectors, then in the on-disk ``store``, and only the texts found in
+    neither are sent to the wrapped service. Since the cache is keyed by
+    content, re-ingesting a document or asking the same query again does
+    not call the embedding provider.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        settings: Settings,
+        store: Optional[EmbeddingStore] = None,
+        memory_size: int = 10000,
+    ) -> None:
+        self.embedding_service = embedding_service
+        self.settings = settings
+        self.model = settings.embedding_model
+        self.dimensions = settings.dimensions
+        self.store = store
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[bytes, array[float]]" = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings for text, embedding only the uncached texts."""
+        if not texts:
+            return []
+
+        hashes = [
+            hashlib.sha256(text.encode("utf-8")).digest() for text in texts
+        ]
+        found: Dict[bytes, "array[float]"] = {}
+        for text_hash in hashes:
+            vector = self._memory.get(text_hash)
+            if vector is not None:
+                self._memory.move_to_end(text_hash)
+                found[text_hash] = vector
+
+        missing = list(dict.fromkeys(h for h in hashes if h not in found))
+        if missing and self.store is not None:
+            stored = await asyncio.to_thread(
+                self.store.get_many, self.model, self.dimensions, missing
+            )
+            self.disk_hits += len(stored)
+            self._remember(stored)
+            found.update(stored)
+            missing = [h for h in missing if h not in stored]
+
+        if missing:
+            texts_by_hash = dict(zip(hashes, texts))
+            embeddings = await self.embedding_service.get_embeddings(
+                [texts_by_hash[text_hash] for text_hash in missing]
+            )
+            computed = {
+                text_hash: array("f", embedding)
+                for text_hash, embedding in zip(missing, embeddings)
+            }
+            if self.store is not None:
+                await asyncio.to_thread(
+                    self.store.put_many, self.model, self.dimensions, computed
+                )
+            self._remember(computed)
+            found.update(computed)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [found[text_hash].tolist() for text_hash in hashes]
+
+    def _remember(self, vectors: Dict[bytes, "array[float]"]) -> None:
+        """Add vectors to the in-memory LRU, evicting the oldest ones."""
+        for text_hash, vector in vectors.items():
+            self._memory[text_hash] = vector
+            self._memory.move_to_end(text_hash)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    async def stats(self) -> Dict[str, float]:
+        """Get the hit rate, size and eviction count of the cache."""
+        lookups = self.hits + self.misses
+        stored = (
+            await asyncio.to_thread(self.store.count)
+            if self.store is not None
+            else 0
+        )
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": stored,
+            "evictions": self.evictions,
+        }
+
+    async def aclose(self) -> None:
+        """Close the wrapped service and the store."""
+        logger.info(f"Embedding cache stats: {await self.stats()}")
+        try:
+            await self.embedding_service.aclose()
+        finally:
+            if self.store is not None:
+                await asyncio.to_thread(self.store.close)
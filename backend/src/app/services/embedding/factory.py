@@ -5,6 +5,10 @@ from typing import Optional
 
 from app.core.config import Settings
 from app.services.embedding.base import EmbeddingService
+from app.services.embedding.cached_embedding_service import (
+    CachedEmbeddingService,
+    EmbeddingStore,
+)
 from app.services.embedding.openai_embedding_service import (
     OpenAIEmbeddingService,
 )
@@ -21,7 +25,21 @@ class EmbeddingServiceFactory:
         logger.info(
             f"Creating embedding service for provider: {settings.embedding_provider}"
         )
+        service: Optional[EmbeddingService] = None
         if settings.embedding_provider == "openai":
-            return OpenAIEmbeddingService(settings)
+            service = OpenAIEmbeddingService(settings)
         # Add more providers here when needed
-        return None
+
+        if service is not None and settings.embedding_cache:
+            store = (
+                EmbeddingStore(settings.embedding_cache_path)
+                if settings.embedding_cache_path
+                else None
+            )
+            service = CachedEmbeddingService(
+                service,
+                settings,
+                store=store,
+                memory_size=settings.embedding_cache_memory_size,
+            )
+        return service
@@ -1,12 +1,16 @@
 """OpenAI embedding service implementation."""
 
+import asyncio
 import logging
-from typing import List
+from typing import Callable, List
 
-from openai import OpenAI
+import httpx
+import tiktoken
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from app.core.config import Settings
 from app.services.embedding.base import EmbeddingService
+from app.services.embedding.batching import estimate_tokens, pack_batches
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +20,26 @@ class OpenAIEmbeddingService(EmbeddingService):
 
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
-        self.client = OpenAI(api_key=settings.openai_api_key)
-        self.model = settings.embedding_model
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key is required but not set")
+        self.client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=(
+                        settings.openai_max_keepalive_connections
+                    ),
+                )
+            ),
+        )
+        self.model = settings.embedding_model
+        self.batch_size = settings.embedding_batch_size
+        self.batch_max_tokens = settings.embedding_batch_max_tokens
+        # Bounds the number of embedding requests in flight at any one time
+        self.semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+        # Loaded once here, at startup, rather than on the first upload
+        self._count_tokens = self._load_token_counter()
 
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Get embeddings for text."""
@@ -29,9 +49,50 @@ class OpenAIEmbeddingService(EmbeddingService):
             )
             return []
 
-        return [
-            embedding.embedding
-            for embedding in self.client.embeddings.create(
+        if not texts:
+            return []
+
+        # Tokenizing every chunk of a large document takes a while
+        batches = await asyncio.to_thread(
+            pack_batches,
+            texts,
+            max_tokens=self.batch_max_tokens,
+            max_items=self.batch_size,
+            count_tokens=self.count_tokens,
+        )
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches.")
+
+        results = await asyncio.gather(
+            *(self._embed_batch(texts[start:end]) for start, end in batches)
+        )
+        return [embedding for batch in results for embedding in batch]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a single batch, preserving the input order."""
+        async with self.semaphore:
+            response = await self.client.embeddings.create(
                 input=texts, model=self.model
-            ).data
+            )
+        return [
+            item.embedding
+            for item in sorted(response.data, key=lambda item: item.index)
         ]
+
+    def count_tokens(self, text: str) -> int:
+        """Count the tokens of a text with the model's tokenizer."""
+        return self._count_tokens(text)
+
+    def _load_token_counter(self) -> Callable[[str], int]:
+        try:
+            encoding = tiktoken.encoding_for_model(self.model)
+        except Exception as e:
+            logger.warning(
+                f"No tokenizer available for {self.model} ({e}). "
+                "Falling back to a character-based token estimate."
+            )
+            return estimate_tokens
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.close()
@@ -5,11 +5,11 @@ import logging
 import uuid
 from typing import Any, Dict, List, Optional
 
-from app.core.dependencies import get_llm_service
 from app.models.graph import GraphChunk, Node, Relation, Triple
 from app.models.llm_responses import SchemaRelationship, SchemaResponseModel
 from app.models.table import Table, TableRow
 from app.schemas.graph_api import ExportTriplesResponseSchema
+from app.services.llm.base import CompletionService
 from app.services.llm_service import generate_schema
 
 logging.basicConfig(level=logging.INFO)
@@ -378,29 +378,29 @@ def generate_chunks_for_triple(
 
 async def process_table_and_generate_triples(
     table_data: Table,
+    llm_service: Optional[CompletionService],
 ) -> ExportTriplesResponseSchema:
     """
     Process the table data, generate a schema, and create triples.
 
     This function orchestrates the entire process of generating triples from table data:
-    1. Obtains an LLM service.
-    2. Generates a schema using the LLM service.
-    3. Creates triples based on the generated schema and table data.
+    1. Generates a schema using the LLM service.
+    2. Creates triples based on the generated schema and table data.
 
     Parameters
     ----------
     table_data : Table
         The input table data to process.
+    llm_service : Optional[CompletionService]
+        The application's LLM service (see ``get_llm_service``).
 
     Returns
     -------
     ExportData
         An ExportData object containing the generated triples and chunks.
     """
-    # Get the LLM service
-    llm_service = get_llm_service()
     if llm_service is None:
-        logger.error("Failed to create LLM service")
+        logger.error("No LLM service to generate the schema with")
         return ExportTriplesResponseSchema(triples=[], chunks=[])
 
     try:
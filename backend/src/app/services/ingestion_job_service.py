@@ -0,0 +1,139 @@
+"""Ingestion job service."""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import Settings
+from app.models.ingestion_job import IngestionJob, IngestionStage
+from app.services.document_service import DocumentService
+
+logger = logging.getLogger(__name__)
+
+# Number of finished jobs kept around for status requests
+MAX_FINISHED_JOBS = 1000
+
+
+class IngestionJobService:
+    """Run document ingestion in the background.
+
+    Jobs are queued and picked up by a fixed number of worker tasks, so
+    only ``ingestion_max_workers`` documents are processed at a time no
+    matter how many are uploaded.
+    """
+
+    def __init__(self, settings: Settings):
+        """Ingestion job service."""
+        self.settings = settings
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: (
+            "asyncio.Queue[Tuple[IngestionJob, str, DocumentService]]"
+        ) = asyncio.Queue(maxsize=settings.ingestion_max_pending_jobs)
+        self._workers: List["asyncio.Task[None]"] = []
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.settings.ingestion_max_workers)
+        ]
+
+    def submit(
+        self,
+        filename: str,
+        file_path: str,
+        document_service: DocumentService,
+    ) -> IngestionJob:
+        """Queue a document saved to disk for ingestion.
+
+        The job takes ownership of ``file_path`` and removes it once the
+        document is processed.
+
+        Raises
+        ------
+        asyncio.QueueFull
+            If ``ingestion_max_pending_jobs`` jobs are already waiting.
+        """
+        self.start()
+        job = IngestionJob(id=uuid.uuid4().hex, filename=filename)
+        self._queue.put_nowait((job, file_path, document_service))
+        self.jobs[job.id] = job
+        self._evict_finished_jobs()
+        logger.info(f"Queued ingestion job {job.id} for {filename}")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        """Get a job by ID."""
+        return self.jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job, file_path, document_service = await self._queue.get()
+            try:
+                await self._run(job, file_path, document_service)
+            finally:
+                self._queue.task_done()
+
+    async def _run(
+        self,
+        job: IngestionJob,
+        file_path: str,
+        document_service: DocumentService,
+    ) -> None:
+        def on_progress(stage: IngestionStage, counts: Dict[str, int]) -> None:
+            for name, value in counts.items():
+                setattr(job, name, value)
+            self._update(job, stage)
+
+        try:
+            job.document_id = await document_service.ingest_document(
+                file_path, on_progress
+            )
+            self._update(job, "completed")
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            self._update(job, "failed")
+        finally:
+            self._remove(file_path)
+
+    @staticmethod
+    def _update(job: IngestionJob, stage: IngestionStage) -> None:
+        job.stage = stage
+        job.updated_at = datetime.now(timezone.utc)
+
+    @staticmethod
+    def _remove(file_path: str) -> None:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def _evict_finished_jobs(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.stage in ("completed", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def aclose(self) -> None:
+        """Cancel the workers and fail the jobs that did not finish."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        while not self._queue.empty():
+            _, file_path, _ = self._queue.get_nowait()
+            self._remove(file_path)
+
+        for job in self.jobs.values():
+            if job.stage not in ("completed", "failed"):
+                job.error = "The server shut down before the job finished"
+                self._update(job, "failed")
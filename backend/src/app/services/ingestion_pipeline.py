@@ -0,0 +1,191 @@
+"""Pipelined document ingestion."""
+
+import asyncio
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from langchain.schema import Document as LangchainDocument
+from langchain.text_splitter import TextSplitter
+
+from app.models.ingestion_job import IngestionStage
+from app.services.loaders.base import LoaderService
+from app.services.vector_db.base import VectorDBService
+from app.services.vector_db.keyword_index import KeywordIndex
+
+logger = logging.getLogger(__name__)
+
+# Called with the stage a document reached and the chunk counts that
+# changed, see DocumentService.ingest_document
+ProgressCallback = Callable[[IngestionStage, Dict[str, int]], None]
+
+T = TypeVar("T")
+
+# Marks the end of the items passed between two stages
+_DONE: Any = object()
+
+_STAGE_ORDER: List[IngestionStage] = [
+    "queued",
+    "loading",
+    "embedding",
+    "upserting",
+    "completed",
+]
+
+
+class IngestionPipeline:
+    """Ingest a document as a stream of batches.
+
+    The loader, splitter, embedding and upsert stages run as concurrent
+    tasks connected by queues holding at most ``queue_size`` batches, so
+    chunks are embedded and upserted while later pages are still being
+    parsed, and only a few batches are held in memory at any time. Up to
+    ``embedding_workers`` batches of ``batch_size`` chunks are embedded at
+    once. Upserted batches are added to ``keyword_index``, if given.
+    """
+
+    def __init__(
+        self,
+        loader: LoaderService,
+        splitter: TextSplitter,
+        vector_db_service: VectorDBService,
+        batch_size: int,
+        queue_size: int,
+        embedding_workers: int = 1,
+        on_progress: Optional[ProgressCallback] = None,
+        keyword_index: Optional[KeywordIndex] = None,
+    ):
+        self.loader = loader
+        self.splitter = splitter
+        self.vector_db_service = vector_db_service
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embedding_workers = embedding_workers
+        self.on_progress = on_progress
+        self.keyword_index = keyword_index
+
+        self.stage: IngestionStage = "queued"
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+
+    async def run(self, document_id: str, file_path: str) -> int:
+        """Ingest a document, returning the number of chunks upserted."""
+        pages: "asyncio.Queue[List[LangchainDocument]]" = asyncio.Queue(
+            self.queue_size
+        )
+        # Batches of chunks with the chunk number of their first chunk
+        chunks: "asyncio.Queue[Tuple[int, List[LangchainDocument]]]" = (
+            asyncio.Queue(self.queue_size)
+        )
+        vectors: "asyncio.Queue[List[Dict[str, Any]]]" = asyncio.Queue(
+            self.queue_size
+        )
+
+        self._report("loading")
+        tasks = [
+            asyncio.create_task(self._load(file_path, pages)),
+            asyncio.create_task(self._split(pages, chunks)),
+            asyncio.create_task(self._embed(document_id, chunks, vectors)),
+            asyncio.create_task(self._upsert(vectors)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        self._report("completed")
+        logger.info(
+            f"Ingested {self.chunks_upserted} chunks for {document_id}"
+        )
+        return self.chunks_upserted
+
+    async def _load(
+        self,
+        file_path: str,
+        pages: "asyncio.Queue[List[LangchainDocument]]",
+    ) -> None:
+        async for batch in self.loader.lazy_load(file_path):
+            await pages.put(batch)
+        await pages.put(_DONE)
+
+    async def _split(
+        self,
+        pages: "asyncio.Queue[List[LangchainDocument]]",
+        chunks: "asyncio.Queue[Tuple[int, List[LangchainDocument]]]",
+    ) -> None:
+        buffer: List[LangchainDocument] = []
+        async for batch in self._drain(pages):
+            buffer.extend(
+                await asyncio.to_thread(self.splitter.split_documents, batch)
+            )
+            while len(buffer) >= self.batch_size:
+                await self._put_chunks(chunks, buffer[: self.batch_size])
+                buffer = buffer[self.batch_size :]
+        if buffer:
+            await self._put_chunks(chunks, buffer)
+        for _ in range(self.embedding_workers):
+            await chunks.put(_DONE)
+
+    async def _put_chunks(
+        self,
+        chunks: "asyncio.Queue[Tuple[int, List[LangchainDocument]]]",
+        batch: List[LangchainDocument],
+    ) -> None:
+        await chunks.put((self.chunks_total, batch))
+        self.chunks_total += len(batch)
+        self._report("embedding", chunks_total=self.chunks_total)
+
+    async def _embed(
+        self,
+        document_id: str,
+        chunks: "asyncio.Queue[Tuple[int, List[LangchainDocument]]]",
+        vectors: "asyncio.Queue[List[Dict[str, Any]]]",
+    ) -> None:
+        async def worker() -> None:
+            async for start_index, batch in self._drain(chunks):
+                prepared = await self.vector_db_service.prepare_chunks(
+                    document_id, batch, start_index=start_index
+                )
+                await vectors.put(prepared)
+                self.chunks_embedded += len(prepared)
+                self._report("upserting", chunks_embedded=self.chunks_embedded)
+
+        await asyncio.gather(
+            *(worker() for _ in range(self.embedding_workers))
+        )
+        await vectors.put(_DONE)
+
+    async def _upsert(
+        self, vectors: "asyncio.Queue[List[Dict[str, Any]]]"
+    ) -> None:
+        async for batch in self._drain(vectors):
+            await self.vector_db_service.upsert_vectors(batch)
+            if self.keyword_index is not None:
+                await self.keyword_index.add_chunks(batch)
+            self.chunks_upserted += len(batch)
+            self._report("upserting", chunks_upserted=self.chunks_upserted)
+
+    @staticmethod
+    async def _drain(queue: "asyncio.Queue[T]") -> AsyncIterator[T]:
+        while (item := await queue.get()) is not _DONE:
+            yield item
+
+    def _report(self, stage: IngestionStage, **counts: int) -> None:
+        # Batches move through the stages at different times, report the
+        # furthest stage reached
+        if _STAGE_ORDER.index(stage) > _STAGE_ORDER.index(self.stage):
+            self.stage = stage
+        if self.on_progress is not None:
+            self.on_progress(self.stage, counts)
@@ -18,3 +18,7 @@ class CompletionService(ABC):
     async def decompose_query(self, query: str) -> dict[str, Any]:
         """Decompose the query into smaller sub-queries."""
         pass
+
+    async def aclose(self) -> None:
+        """Release any resources held by the service."""
+        pass
@@ -0,0 +1,102 @@
+"""Completion service caching the answers of another one."""
+
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator
+
+from pydantic import BaseModel, ValidationError
+
+from app.services.cache import CacheBackend
+from app.services.llm.base import CompletionService
+
+logger = logging.getLogger(__name__)
+
+_bypass: ContextVar[bool] = ContextVar("bypass_answer_cache", default=False)
+
+
+@contextmanager
+def bypass_answer_cache(bypass: bool = True) -> Iterator[None]:
+    """Ask the LLM again for the completions generated in this block.
+
+    The fresh answers still replace the cached ones.
+    """
+    token = _bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+class CachedCompletionService(CompletionService):
+    """Completion service answering repeated prompts from a cache.
+
+    Completions are keyed by a hash of the model, the rendered prompt and
+    the name of the response model, so asking the same question of the
+    same context again, e.g. when a column is re-run, does not call the
+    LLM. Only validated answers are cached.
+    """
+
+    def __init__(
+        self,
+        completion_service: CompletionService,
+        backend: CacheBackend,
+        model: str,
+    ) -> None:
+        self.completion_service = completion_service
+        self.backend = backend
+        self.model = model
+
+    def cache_key(self, prompt: str, response_model: Any) -> str:
+        """Get the cache key of a completion."""
+        name = getattr(response_model, "__name__", repr(response_model))
+        return hashlib.sha256(
+            json.dumps([self.model, prompt, name]).encode("utf-8")
+        ).hexdigest()
+
+    async def generate_completion(
+        self, prompt: str, response_model: Any
+    ) -> Any:
+        """Generate a completion, or return the cached one."""
+        cacheable = isinstance(response_model, type) and issubclass(
+            response_model, BaseModel
+        )
+        if not cacheable:
+            return await self.completion_service.generate_completion(
+                prompt, response_model
+            )
+
+        key = self.cache_key(prompt, response_model)
+        if not _bypass.get():
+            cached = await self.backend.get(key)
+            if cached is not None:
+                try:
+                    return response_model.model_validate_json(cached)
+                except ValidationError as e:
+                    # The response model changed since it was cached
+                    logger.warning(f"Ignoring invalid cached answer: {e}")
+
+        response = await self.completion_service.generate_completion(
+            prompt, response_model
+        )
+        if isinstance(response, BaseModel):
+            await self.backend.set(key, response.model_dump_json())
+        return response
+
+    async def decompose_query(self, query: str) -> dict[str, Any]:
+        """Decompose the query into smaller sub-queries."""
+        return await self.completion_service.decompose_query(query)
+
+    async def stats(self) -> Dict[str, float]:
+        """Get the hit rate and size of the cache."""
+        return await self.backend.stats()
+
+    async def aclose(self) -> None:
+        """Close the wrapped service and the cache."""
+        logger.info(f"Answer cache stats: {await self.stats()}")
+        try:
+            await self.completion_service.aclose()
+        finally:
+            await self.backend.aclose()
@@ -4,7 +4,15 @@ import logging
 from typing import Optional
 
 from app.core.config import Settings
+from app.services.cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+)
 from app.services.llm.base import CompletionService
+from app.services.llm.cached_completion_service import (
+    CachedCompletionService,
+)
 from app.services.llm.openai_llm_service import OpenAICompletionService
 
 logger = logging.getLogger(__name__)
@@ -19,7 +27,31 @@ class CompletionServiceFactory:
         logger.info(
             f"Creating completion service for provider: {settings.llm_provider}"
         )
+        service: Optional[CompletionService] = None
         if settings.llm_provider == "openai":
-            return OpenAICompletionService(settings)
+            service = OpenAICompletionService(settings)
         # Add more providers here when needed
+
+        if service is not None:
+            backend = CompletionServiceFactory.create_cache_backend(settings)
+            if backend is not None:
+                service = CachedCompletionService(
+                    service, backend, settings.llm_model
+                )
+        return service
+
+    @staticmethod
+    def create_cache_backend(settings: Settings) -> Optional[CacheBackend]:
+        """Create the cache of LLM answers, if enabled."""
+        ttl = settings.answer_cache_ttl or None
+        if settings.answer_cache == "memory":
+            return MemoryCacheBackend(settings.answer_cache_size, ttl)
+        if settings.answer_cache == "sqlite":
+            return SQLiteCacheBackend(
+                settings.answer_cache_path, settings.answer_cache_size, ttl
+            )
+        if settings.answer_cache != "none":
+            raise ValueError(
+                f"Unsupported answer cache: {settings.answer_cache}"
+            )
         return None
@@ -1,9 +1,11 @@
 """OpenAI completion service implementation."""
 
+import asyncio
 import logging
 from typing import Any, Optional, Type
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from pydantic import BaseModel
 
 from app.core.config import Settings
@@ -17,8 +19,20 @@ class OpenAICompletionService(CompletionService):
 
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
+        # Bounds the number of completions in flight at any one time
+        self.semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
         if settings.openai_api_key:
-            self.client = OpenAI(api_key=settings.openai_api_key)
+            self.client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.openai_max_connections,
+                        max_keepalive_connections=(
+                            settings.openai_max_keepalive_connections
+                        ),
+                    )
+                ),
+            )
         else:
             self.client = None  # type: ignore
             logger.warning(
@@ -35,11 +49,12 @@ class OpenAICompletionService(CompletionService):
             )
             return None
 
-        response = self.client.beta.chat.completions.parse(
-            model=self.settings.llm_model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format=response_model,
-        )
+        async with self.semaphore:
+            response = await self.client.beta.chat.completions.parse(
+                model=self.settings.llm_model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format=response_model,
+            )
 
         parsed_response = response.choices[0].message.parsed
         logger.info(f"Generated response: {parsed_response}")
@@ -71,3 +86,8 @@ class OpenAICompletionService(CompletionService):
 
         # TODO: Implement the actual decomposition logic here
         return {"sub_queries": [query]}
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        if self.client is not None:
+            await self.client.close()
@@ -1,7 +1,7 @@
 """Base loader service."""
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 
 from langchain.schema import Document as LangchainDocument
 
@@ -13,3 +13,12 @@ class LoaderService(ABC):
     async def load(self, file_path: str) -> List[LangchainDocument]:
         """Load document from file path."""
         pass
+
+    async def lazy_load(
+        self, file_path: str
+    ) -> AsyncIterator[List[LangchainDocument]]:
+        """Load document from file path in batches of pages.
+
+        Loaders that cannot stream a document yield it whole.
+        """
+        yield await self.load(file_path)
@@ -1,6 +1,7 @@
 """Loader factory."""
 
 import logging
+from concurrent.futures import Executor
 from typing import Optional
 
 from app.core.config import Settings
@@ -25,8 +26,14 @@ class LoaderFactory:
     """The factory for the loader services."""
 
     @staticmethod
-    def create_loader(settings: Settings) -> Optional[LoaderService]:
-        """Create a loader service."""
+    def create_loader(
+        settings: Settings, pdf_executor: Optional[Executor] = None
+    ) -> Optional[LoaderService]:
+        """Create a loader service.
+
+        ``pdf_executor`` is used by the pypdf loader to extract the pages of
+        a PDF in parallel.
+        """
         loader_type = settings.loader
         logger.info(f"Creating loader of type: {loader_type}")
 
@@ -45,7 +52,11 @@ class LoaderFactory:
             return UnstructuredLoader(settings=settings)
         elif loader_type == "pypdf":
             logger.info("Using PyPDFLoader")
-            return PDFLoader()
+            return PDFLoader(
+                executor=pdf_executor,
+                pages_per_task=settings.pdf_pages_per_task,
+                max_pending_tasks=max(1, 2 * settings.pdf_parse_workers),
+            )
         else:
             logger.warning(f"No loader found for type: {loader_type}")
             return None
@@ -0,0 +1,38 @@
+"""PDF page extraction run in worker processes.
+
+This module is imported by every worker of the PDF process pool, so it
+only depends on ``pypdf`` and returns plain, picklable values.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from pypdf import PdfReader
+
+
+def count_pages(file_path: str) -> int:
+    """Count the pages of a PDF."""
+    return len(PdfReader(file_path).pages)
+
+
+def extract_pages(
+    file_path: str, start: int, end: int
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Extract the text of pages ``start`` to ``end`` (exclusive) of a PDF.
+
+    Returns the text and metadata of each page, using the same ``page``
+    and ``page_label`` metadata as ``PyPDFLoader``.
+    """
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    return [
+        (
+            reader.pages[page].extract_text(extraction_mode="plain").strip(),
+            {
+                "source": file_path,
+                "total_pages": total_pages,
+                "page": page,
+                "page_label": reader.page_labels[page],
+            },
+        )
+        for page in range(start, min(end, total_pages))
+    ]
@@ -1,16 +1,49 @@
 """PyPDF loader service."""
 
+import asyncio
+import itertools
 import os
-from typing import List, Union
+from collections import deque
+from concurrent.futures import Executor
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from langchain.schema import Document as LangchainDocument
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 
+from app.services.loaders import pdf_worker
 from app.services.loaders.base import LoaderService
 
 
 class PDFLoader(LoaderService):
-    """PDF and Text loader service."""
+    """PDF and Text loader service.
+
+    Given an ``executor`` (usually a ``ProcessPoolExecutor``), PDFs are
+    split into ranges of ``pages_per_task`` pages which are extracted in
+    parallel, with at most ``max_pending_tasks`` ranges in flight.
+    Otherwise the whole PDF is parsed by ``PyPDFLoader`` in a worker
+    thread.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        pages_per_task: int = 20,
+        max_pending_tasks: int = 8,
+    ):
+        """Initialize the PDFLoader."""
+        self.executor = executor
+        self.pages_per_task = pages_per_task
+        self.max_pending_tasks = max_pending_tasks
 
     async def load(self, file_path: str) -> List[LangchainDocument]:
         """Load document from file path."""
@@ -19,10 +52,85 @@ class PDFLoader(LoaderService):
         loader: Union[PyPDFLoader, TextLoader]
 
         if file_extension == ".pdf":
+            if self.executor is not None:
+                return [
+                    page
+                    async for pages in self._load_pages_in_parallel(file_path)
+                    for page in pages
+                ]
             loader = PyPDFLoader(file_path)
         elif file_extension == ".txt":
             loader = TextLoader(file_path)
         else:
             raise ValueError(f"Unsupported file type: {file_path}")
 
-        return loader.load()
+        return await asyncio.to_thread(loader.load)
+
+    async def lazy_load(
+        self, file_path: str
+    ) -> AsyncIterator[List[LangchainDocument]]:
+        """Load document from file path in batches of pages."""
+        if os.path.splitext(file_path)[1].lower() != ".pdf":
+            yield await self.load(file_path)
+            return
+
+        if self.executor is not None:
+            async for pages in self._load_pages_in_parallel(file_path):
+                yield pages
+            return
+
+        page_iterator = PyPDFLoader(file_path).lazy_load()
+        while pages := await asyncio.to_thread(
+            _take, page_iterator, self.pages_per_task
+        ):
+            yield pages
+
+    async def _load_pages_in_parallel(
+        self, file_path: str
+    ) -> AsyncIterator[List[LangchainDocument]]:
+        """Extract the pages of a PDF in page ranges on the executor.
+
+        The ranges are yielded in page order.
+        """
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(
+            self.executor, pdf_worker.count_pages, file_path
+        )
+        starts = iter(range(0, page_count, self.pages_per_task))
+        pending: Deque["asyncio.Future[List[Tuple[str, Dict[str, Any]]]]"] = (
+            deque()
+        )
+
+        def submit_next() -> None:
+            start = next(starts, None)
+            if start is not None:
+                pending.append(
+                    loop.run_in_executor(
+                        self.executor,
+                        pdf_worker.extract_pages,
+                        file_path,
+                        start,
+                        start + self.pages_per_task,
+                    )
+                )
+
+        for _ in range(self.max_pending_tasks):
+            submit_next()
+        try:
+            while pending:
+                pages = await pending.popleft()
+                submit_next()
+                yield [
+                    LangchainDocument(page_content=text, metadata=metadata)
+                    for text, metadata in pages
+                ]
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _take(
+    iterator: Iterator[LangchainDocument], count: int
+) -> List[LangchainDocument]:
+    """Take up to ``count`` items from an iterator."""
+    return list(itertools.islice(iterator, count))
@@ -1,5 +1,6 @@
 """Unstructured loader service."""
 
+import asyncio
 from typing import TYPE_CHECKING, List
 
 from app.core.config import Settings
@@ -40,4 +41,4 @@ class UnstructuredLoader(LoaderService):
         loader = LangchainUnstructuredLoader(
             file_path, api_key=self.settings.unstructured_api_key
         )
-        return loader.load()
+        return await asyncio.to_thread(loader.load)
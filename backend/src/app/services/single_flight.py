@@ -0,0 +1,40 @@
+"""Share one computation between the callers waiting for it."""
+
+import asyncio
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """One run of a computation, shared by every caller of ``wait``.
+
+    The computation starts with the first caller. A cancelled caller does
+    not cancel the computation the others wait for, but once every caller
+    has gone the computation is cancelled, and the next caller starts it
+    again.
+    """
+
+    def __init__(self, compute: Callable[[], Awaitable[T]]) -> None:
+        self.compute = compute
+        self.waiters = 0
+        self._future: "Optional[asyncio.Future[T]]" = None
+
+    def start(self) -> "asyncio.Future[T]":
+        """Start the computation, unless it is already running."""
+        if self._future is None:
+            self._future = asyncio.ensure_future(self.compute())
+        return self._future
+
+    async def wait(self) -> T:
+        """Wait for the result of the computation."""
+        future = self.start()
+        self.waiters += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self.waiters -= 1
+            if not self.waiters and not future.done():
+                # Nobody wants the result anymore
+                future.cancel()
+                self._future = None
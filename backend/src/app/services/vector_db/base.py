@@ -1,19 +1,27 @@
 """The base class for the vector database services."""
 
+import asyncio
+import functools
+import json
 import logging
 import re
 import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from langchain.schema import Document
 from pydantic import BaseModel, Field
 
+from app.core.config import Settings
 from app.models.query_core import Rule
 from app.schemas.query_api import VectorResponseSchema
+from app.services.batch_memo import memoize, recall, schedule
+from app.services.cache import SQLiteCacheBackend, TieredCache, TTLCache
 from app.services.embedding.base import EmbeddingService
 from app.services.llm.base import CompletionService
 from app.services.llm_service import get_keywords
+from app.services.single_flight import SingleFlight
+from app.services.vector_db.keyword_index import KeywordIndex
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +40,21 @@ class VectorDBService(ABC):
     """The base class for the vector database services."""
 
     embedding_service: EmbeddingService
+    settings: Settings
+
+    # Whether the collection is known to exist, see ensure_collection_ready
+    _collection_ready: bool = False
+    # Whether the collection has BM25 sparse vectors for hybrid searches,
+    # set by ensure_collection_exists
+    _sparse_search: bool = False
+    _collection_lock: Optional[asyncio.Lock] = None
+
+    # Embeddings of recent queries, see get_embeddings
+    _query_embedding_cache: Optional[TTLCache[str, List[float]]] = None
+    # Keywords extracted from queries by the LLM, see extract_keywords
+    _keyword_cache: Optional[TieredCache] = None
+    # Words of the uploaded documents, see keyword_index
+    _keyword_index: Optional[KeywordIndex] = None
 
     @abstractmethod
     async def upsert_vectors(
@@ -48,6 +71,58 @@ class VectorDBService(ABC):
         pass
 
     # Update other methods if they also return VectorResponse
+    async def multi_document_search(
+        self, query: str, document_ids: List[str], limit: int = 40
+    ) -> Dict[str, VectorResponseSchema]:
+        """Run a vector search on several documents at once.
+
+        Returns the top ``limit`` chunks of each document, by document id.
+        Providers override this to search every document in a single
+        request; by default each document is searched separately.
+        """
+        responses = await asyncio.gather(
+            *(
+                self.vector_search([query], document_id)
+                for document_id in document_ids
+            )
+        )
+        return dict(zip(document_ids, responses))
+
+    def prefetch_vector_search(
+        self, query: str, document_ids: List[str]
+    ) -> None:
+        """Search several documents for a query at once within a batch.
+
+        Within a ``batch_memo`` block, the first ``vector_search`` of one
+        of these documents runs one ``multi_document_search``, whose
+        results ``vector_search`` then returns for all of them instead of
+        searching each of them.
+        """
+        search = SingleFlight(
+            functools.partial(self.multi_document_search, query, document_ids)
+        )
+
+        async def bucket(document_id: str) -> Optional[VectorResponseSchema]:
+            try:
+                return (await search.wait()).get(document_id)
+            except Exception as e:
+                # Each document is searched on its own instead
+                logger.warning(f"Multi-document search failed: {e}")
+                return None
+
+        for document_id in document_ids:
+            schedule(
+                ("vector_search", query, document_id),
+                functools.partial(bucket, document_id),
+            )
+
+    async def prefetched_vector_search(
+        self, query: str, document_id: str
+    ) -> Optional[VectorResponseSchema]:
+        """Get the result of a prefetched search, if there is one."""
+        response = await recall(("vector_search", query, document_id))
+        return response if isinstance(response, VectorResponseSchema) else None
+
     @abstractmethod
     async def keyword_search(
         self, query: str, document_id: str, keywords: List[str]
@@ -55,6 +130,34 @@ class VectorDBService(ABC):
         """Perform a keyword search."""
         pass
 
+    @abstractmethod
+    async def get_chunks(
+        self, document_id: str, chunk_numbers: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Get the text and page number of chunks of a document."""
+        pass
+
+    async def indexed_keyword_search(
+        self, document_id: str, keywords: List[str], limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Get the chunks that best match keywords from the keyword index.
+
+        Only the best chunks are fetched from the vector database. Returns
+        None if the document is not indexed, see ``keyword_index``.
+        """
+        chunk_numbers = await self.keyword_index.search(
+            document_id, keywords, limit
+        )
+        if chunk_numbers is None:
+            return None
+        if not chunk_numbers:
+            return []
+        chunks = {
+            chunk["chunk_number"]: chunk
+            for chunk in await self.get_chunks(document_id, chunk_numbers)
+        }
+        return [chunks[number] for number in chunk_numbers if number in chunks]
+
     @abstractmethod
     async def hybrid_search(
         self, query: str, document_id: str, rules: List[Rule]
@@ -79,23 +182,114 @@ class VectorDBService(ABC):
         """Ensure the collection exists in the vector database."""
         pass
 
+    async def ensure_collection_ready(self) -> None:
+        """Ensure the collection exists, checking only on first use.
+
+        The check runs once under a lock, so concurrent first uploads do not
+        race to create the collection. Call ``invalidate_collection_cache``
+        to check again, e.g. after the collection was dropped externally.
+        """
+        if self._collection_ready:
+            return
+        if self._collection_lock is None:
+            self._collection_lock = asyncio.Lock()
+        async with self._collection_lock:
+            if not self._collection_ready:
+                await self.ensure_collection_exists()
+                self._collection_ready = True
+
+    def invalidate_collection_cache(self) -> None:
+        """Forget that the collection exists."""
+        self._collection_ready = False
+
+    async def aclose(self) -> None:
+        """Release any resources held by the service."""
+        try:
+            if self._keyword_cache is not None:
+                await self._keyword_cache.aclose()
+                self._keyword_cache = None
+        finally:
+            if self._keyword_index is not None:
+                await self._keyword_index.aclose()
+                self._keyword_index = None
+
     async def get_embeddings(
         self, texts: Union[str, List[str]]
     ) -> List[List[float]]:
-        """Get embeddings for the given text(s) using the embedding service."""
+        """Get embeddings for the given text(s) using the embedding service.
+
+        A single text is treated as a query: its embedding is kept in a
+        process-local cache, and concurrent requests for the same text share
+        one embedding request. Lists of texts, e.g. the chunks of a document,
+        are always embedded.
+        """
         if isinstance(texts, str):
-            texts = [texts]
+            query = texts
+
+            async def embed() -> List[float]:
+                embeddings = await self.embedding_service.get_embeddings(
+                    [query]
+                )
+                return embeddings[0]
+
+            cache = self.query_embedding_cache
+            return [await cache.get_or_compute(query, embed)]
         return await self.embedding_service.get_embeddings(texts)
 
+    async def get_query_embeddings(
+        self, queries: List[str]
+    ) -> List[List[float]]:
+        """Get the embeddings of several queries.
+
+        Queries are looked up in the query embedding cache, and the ones
+        missing from it are embedded in one request and then cached.
+        """
+        cache = self.query_embedding_cache
+        embeddings: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for query in dict.fromkeys(queries):
+            cached = cache.get(query)
+            if cached is None:
+                missing.append(query)
+            else:
+                embeddings[query] = cached
+        if missing:
+            embedded = await self.embedding_service.get_embeddings(missing)
+            for query, embedding in zip(missing, embedded):
+                cache.set(query, embedding)
+                embeddings[query] = embedding
+        return [embeddings[query] for query in queries]
+
+    @property
+    def query_embedding_cache(self) -> TTLCache[str, List[float]]:
+        """The cache of query embeddings, created on first use."""
+        if self._query_embedding_cache is None:
+            self._query_embedding_cache = TTLCache(
+                max_size=self.settings.query_embedding_cache_size,
+                ttl=self.settings.query_embedding_cache_ttl or None,
+            )
+        return self._query_embedding_cache
+
     async def get_single_embedding(self, text: str) -> List[float]:
-        """Get a single embedding for the given text."""
-        embeddings = await self.get_embeddings(text)
-        return embeddings[0]
+        """Get a single embedding for the given text.
+
+        The embedding is computed once per query batch, see ``batch_memo``.
+        """
+
+        async def embed() -> List[float]:
+            embeddings = await self.get_embeddings(text)
+            return embeddings[0]
+
+        return await memoize(("embedding", text), embed)
 
     async def prepare_chunks(
-        self, document_id: str, chunks: List[Document]
+        self, document_id: str, chunks: List[Document], start_index: int = 0
     ) -> List[Dict[str, Any]]:
-        """Prepare chunks for insertion into the vector database."""
+        """Prepare chunks for insertion into the vector database.
+
+        ``start_index`` is the chunk number of the first chunk, for
+        documents prepared a batch of chunks at a time.
+        """
         logger.info(f"Preparing {len(chunks)} chunks")
 
         # Clean the chunks
@@ -119,14 +313,30 @@ class VectorDBService(ABC):
                 "document_id": document_id,
             }
             for i, (chunk, text, embedding) in enumerate(
-                zip(chunks, cleaned_texts, embedded_chunks)
+                zip(chunks, cleaned_texts, embedded_chunks), start=start_index
             )
         ]
 
     async def extract_keywords(
         self, query: str, rules: list[Rule], llm_service: CompletionService
     ) -> list[str]:
-        """Extract keywords from a user query."""
+        """Extract keywords from a user query.
+
+        The keywords are extracted once per query batch, see ``batch_memo``.
+        """
+        key = (
+            "keywords",
+            query,
+            tuple(rule.model_dump_json() for rule in rules or []),
+        )
+        keywords = await memoize(
+            key, lambda: self._extract_keywords(query, rules, llm_service)
+        )
+        return list(keywords)
+
+    async def _extract_keywords(
+        self, query: str, rules: list[Rule], llm_service: CompletionService
+    ) -> list[str]:
         keywords = []
         if rules:
             for rule in rules:
@@ -142,8 +352,62 @@ class VectorDBService(ABC):
                                     keywords.append(value)
 
         if not keywords:
-            extracted_keywords = await get_keywords(llm_service, query)
-            if extracted_keywords and isinstance(extracted_keywords, list):
-                keywords = extracted_keywords
+            keywords = await self._get_query_keywords(query, llm_service)
 
         return keywords
+
+    async def _get_query_keywords(
+        self, query: str, llm_service: CompletionService
+    ) -> list[str]:
+        """Get the keywords of a query from the LLM, once per query."""
+
+        async def extract() -> Optional[list[str]]:
+            extracted = await get_keywords(llm_service, query)
+            # Failed and empty extractions are not cached
+            return extracted.get("keywords") or None
+
+        key = json.dumps([self.settings.llm_model, query])
+        keywords = await self.keyword_cache.get_or_compute(key, extract)
+        return list(keywords or [])
+
+    @property
+    def keyword_cache(self) -> TieredCache:
+        """The cache of query keywords, created on first use."""
+        if self._keyword_cache is None:
+            path = self.settings.keyword_cache_path
+            self._keyword_cache = TieredCache(
+                TTLCache(max_size=self.settings.keyword_cache_size),
+                (
+                    SQLiteCacheBackend(
+                        path, max_size=self.settings.keyword_cache_size
+                    )
+                    if path
+                    else None
+                ),
+            )
+        return self._keyword_cache
+
+    @property
+    def keyword_index(self) -> KeywordIndex:
+        """The inverted index of the documents, created on first use.
+
+        Filled by ``DocumentService`` as documents are uploaded, see
+        ``upload_keyword_index``.
+        """
+        if self._keyword_index is None:
+            self._keyword_index = KeywordIndex(
+                self.settings.keyword_index_path,
+                self.settings.keyword_index_cache_size,
+            )
+        return self._keyword_index
+
+    async def upload_keyword_index(self) -> Optional[KeywordIndex]:
+        """Get the keyword index of uploaded documents, if searches use it.
+
+        Hybrid searches of collections with BM25 sparse vectors do not read
+        the index, so nothing is indexed for them.
+        """
+        await self.ensure_collection_ready()
+        if self._sparse_search:
+            return None
+        return self.keyword_index
@@ -0,0 +1,68 @@
+"""BM25 sparse vectors of chunk texts."""
+
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+# Sparse vectors as (indices, values)
+SparseVector = Tuple[List[int], List[float]]
+
+# Average characters per word token of English prose, spaces included
+CHARACTERS_PER_TOKEN = 6
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into lowercase word tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+def term_index(term: str) -> int:
+    """Get the stable sparse vector index of a term."""
+    return zlib.crc32(term.encode("utf-8")) & 0x7FFFFFFF
+
+
+class BM25Encoder:
+    """Encode texts as BM25 sparse vectors.
+
+    Document vectors hold the term frequency part of the BM25 score and
+    query vectors weigh each query term once, so their dot product is the
+    BM25 score of the document without the inverse document frequencies,
+    which the vector database applies (see Qdrant's IDF modifier).
+    ``avg_length`` is the expected number of tokens in a chunk, by default
+    that of the default 512-character chunks.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        avg_length: float = 512 / CHARACTERS_PER_TOKEN,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.avg_length = avg_length
+
+    @classmethod
+    def for_chunk_size(cls, chunk_size: int) -> "BM25Encoder":
+        """Create an encoder for chunks of ``chunk_size`` characters."""
+        return cls(avg_length=chunk_size / CHARACTERS_PER_TOKEN)
+
+    def encode_document(self, text: str) -> SparseVector:
+        """Encode a chunk text."""
+        tokens = tokenize(text)
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_length)
+        weights: Dict[int, float] = {}
+        for term, frequency in Counter(tokens).items():
+            index = term_index(term)
+            weights[index] = weights.get(index, 0.0) + (
+                frequency * (self.k1 + 1) / (frequency + norm)
+            )
+        return list(weights), list(weights.values())
+
+    def encode_query(self, text: str) -> SparseVector:
+        """Encode a query, or keywords joined by spaces."""
+        indices = sorted({term_index(term) for term in tokenize(text)})
+        return indices, [1.0] * len(indices)
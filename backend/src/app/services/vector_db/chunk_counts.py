@@ -0,0 +1,115 @@
+"""Registry of the number of chunks indexed per document."""
+
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+class ChunkCountRegistry:
+    """Number of chunks of each document in a collection.
+
+    Counts are kept in memory, so looking one up is free, and written
+    through to the SQLite database at ``path`` when one is given, so they
+    survive restarts. A document missing from the registry is unknown, not
+    empty: it may have been indexed before the registry existed or by
+    another process.
+    """
+
+    def __init__(self, collection: str, path: Optional[str] = None) -> None:
+        self.collection = collection
+        self.path = path
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if path:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS chunk_counts ("
+                    " collection TEXT NOT NULL,"
+                    " document_id TEXT NOT NULL,"
+                    " count INTEGER NOT NULL,"
+                    " PRIMARY KEY (collection, document_id))"
+                )
+                rows = self._connection.execute(
+                    "SELECT document_id, count FROM chunk_counts"
+                    " WHERE collection = ?",
+                    (collection,),
+                ).fetchall()
+            self._counts = {document_id: count for document_id, count in rows}
+
+    def __len__(self) -> int:
+        """Count the documents in the registry."""
+        return len(self._counts)
+
+    def get(self, document_id: str) -> Optional[int]:
+        """Get the number of chunks of a document, None if unknown."""
+        return self._counts.get(document_id)
+
+    async def add(self, counts: Mapping[str, int]) -> None:
+        """Add newly indexed chunks to the counts of their documents."""
+        rows = [
+            (self.collection, document_id, count)
+            for document_id, count in counts.items()
+            if count > 0
+        ]
+        for _, document_id, count in rows:
+            self._counts[document_id] = (
+                self._counts.get(document_id, 0) + count
+            )
+        # Increments, so concurrent writes can land in any order
+        await self._write(
+            "INSERT INTO chunk_counts (collection, document_id, count)"
+            " VALUES (?, ?, ?) ON CONFLICT (collection, document_id)"
+            " DO UPDATE SET count = count + excluded.count",
+            rows,
+        )
+
+    async def set(self, document_id: str, count: int) -> None:
+        """Record the number of chunks of a document."""
+        self._counts[document_id] = count
+        await self._write(
+            "INSERT OR REPLACE INTO chunk_counts"
+            " (collection, document_id, count) VALUES (?, ?, ?)",
+            [(self.collection, document_id, count)],
+        )
+
+    async def remove(self, document_id: str) -> None:
+        """Forget a deleted document."""
+        self._counts.pop(document_id, None)
+        await self._write(
+            "DELETE FROM chunk_counts WHERE collection = ? AND document_id = ?",
+            [(self.collection, document_id)],
+        )
+
+    async def clear(self) -> None:
+        """Forget every document of the collection."""
+        self._counts.clear()
+        await self._write(
+            "DELETE FROM chunk_counts WHERE collection = ?",
+            [(self.collection,)],
+        )
+
+    async def _write(self, sql: str, rows: List[Tuple[Any, ...]]) -> None:
+        if self._connection is not None and rows:
+            await asyncio.to_thread(self._execute, sql, rows)
+
+    def _execute(self, sql: str, rows: List[Tuple[Any, ...]]) -> None:
+        with self._lock:
+            if self._connection is None:
+                return
+            with self._connection:
+                self._connection.executemany(sql, rows)
+
+    async def aclose(self) -> None:
+        """Close the database."""
+        if self._connection is not None:
+            await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -8,7 +8,10 @@ from app.services.embedding.base import EmbeddingService
 from app.services.llm.base import CompletionService
 from app.services.vector_db.base import VectorDBService
 from app.services.vector_db.milvus_service import MilvusService
-from app.services.vector_db.qdrant_service import QdrantService
+from app.services.vector_db.qdrant_service import (
+    AsyncQdrantService,
+    QdrantService,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,10 @@ class VectorDBFactory:
         if provider == "milvus":
             return MilvusService(embedding_service, llm_service, settings)
         elif provider == "qdrant":
+            if settings.qdrant.asynchronous:
+                return AsyncQdrantService(
+                    embedding_service, llm_service, settings
+                )
             return QdrantService(embedding_service, llm_service, settings)
         # Add other vector database providers here
         logger.warning(
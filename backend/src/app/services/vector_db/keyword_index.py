@@ -0,0 +1,224 @@
+"""Local inverted index of the words in each document's chunks."""
+
+import asyncio
+import bisect
+import heapq
+import json
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.cache import TTLCache
+from app.services.vector_db.bm25 import tokenize
+
+# A chunk to index: document id, chunk number and the frequencies of its
+# words
+_Row = Tuple[str, int, Dict[str, int]]
+
+
+class DocumentKeywords:
+    """Inverted index of the chunks of one document.
+
+    Maps each word to the chunks containing it and how often they do. The
+    words are also kept sorted, so that the words starting with a keyword
+    are found by bisection.
+    """
+
+    def __init__(self) -> None:
+        # Word -> chunk number -> occurrences
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._vocabulary: Optional[List[str]] = None
+
+    def add(self, chunk_number: int, frequencies: Dict[str, int]) -> None:
+        """Index a chunk, given the occurrences of its words."""
+        for term, count in frequencies.items():
+            self.postings.setdefault(term, {})[chunk_number] = count
+        self._vocabulary = None
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """The indexed words, sorted."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def _occurrences(self, prefix: str) -> Dict[int, int]:
+        """Count the words starting with a prefix in each chunk."""
+        vocabulary = self.vocabulary
+        occurrences: Dict[int, int] = {}
+        for position in range(
+            bisect.bisect_left(vocabulary, prefix), len(vocabulary)
+        ):
+            term = vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            for number, count in self.postings[term].items():
+                occurrences[number] = occurrences.get(number, 0) + count
+        return occurrences
+
+    def _score(self, keyword: str) -> Dict[int, int]:
+        """Score the chunks containing every word of a keyword.
+
+        A keyword of several words is counted as often as its least
+        frequent word.
+        """
+        scores: Optional[Dict[int, int]] = None
+        for word in set(tokenize(keyword)):
+            occurrences = self._occurrences(word)
+            scores = (
+                occurrences
+                if scores is None
+                else {
+                    number: min(count, occurrences[number])
+                    for number, count in scores.items()
+                    if number in occurrences
+                }
+            )
+            if not scores:
+                break
+        return scores or {}
+
+    def search(self, keywords: List[str], limit: int) -> List[int]:
+        """Get the chunks with the most occurrences of the keywords.
+
+        Keywords match the words starting with them, ignoring case, e.g.
+        "pay" matches "Payments". Returns the chunk numbers, best first,
+        ties broken by chunk number.
+        """
+        scores: Dict[int, int] = {}
+        for keyword in keywords:
+            for number, score in self._score(keyword).items():
+                scores[number] = scores.get(number, 0) + score
+        return heapq.nsmallest(
+            limit, scores, key=lambda number: (-scores[number], number)
+        )
+
+
+class KeywordIndex:
+    """Inverted indexes of the documents, for keyword searches.
+
+    Chunks are indexed as they are uploaded, with the occurrences of their
+    words, and written to the SQLite database at ``path`` when one is
+    given. Their texts stay in the vector database only. The indexes of the
+    ``cache_size`` most recently searched documents are kept in memory.
+    Without a database, documents evicted from memory are no longer
+    indexed, and searches of them fall back to the vector database.
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_size: int = 64):
+        self.path = path
+        # None, for documents not indexed, is never cached
+        self.documents: TTLCache[str, Optional[DocumentKeywords]] = TTLCache(
+            cache_size
+        )
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if path:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS keyword_terms ("
+                    " document_id TEXT NOT NULL,"
+                    " chunk_number INTEGER NOT NULL,"
+                    " terms TEXT NOT NULL,"
+                    " PRIMARY KEY (document_id, chunk_number))"
+                )
+
+    async def add_chunks(self, chunks: List[Dict[str, Any]]) -> None:
+        """Index chunks prepared for the vector database."""
+        rows: List[_Row] = [
+            (
+                str(chunk["document_id"]),
+                int(chunk["chunk_number"]),
+                dict(Counter(tokenize(chunk["text"]))),
+            )
+            for chunk in chunks
+        ]
+        if self._connection is None:
+            for document_id, chunk_number, frequencies in rows:
+                document = self.documents.get(document_id)
+                if document is None:
+                    document = DocumentKeywords()
+                    self.documents.set(document_id, document)
+                document.add(chunk_number, frequencies)
+            return
+
+        await asyncio.to_thread(self._insert, rows)
+        # Loaded again with the new chunks on the next search
+        for document_id in {row[0] for row in rows}:
+            self.documents.delete(document_id)
+
+    def _insert(self, rows: List[_Row]) -> None:
+        with self._lock:
+            if self._connection is None:
+                return
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO keyword_terms (document_id,"
+                    " chunk_number, terms) VALUES (?, ?, ?)",
+                    [(*row[:2], json.dumps(row[2])) for row in rows],
+                )
+
+    async def search(
+        self, document_id: str, keywords: List[str], limit: int
+    ) -> Optional[List[int]]:
+        """Get the numbers of the chunks that best match the keywords.
+
+        See ``DocumentKeywords.search``. Returns None if the document is
+        not indexed, e.g. uploaded before the index existed.
+        """
+
+        async def load() -> Optional[DocumentKeywords]:
+            if self._connection is None:
+                return None
+            return await asyncio.to_thread(self._load, document_id)
+
+        document = await self.documents.get_or_compute(document_id, load)
+        if document is None:
+            return None
+        return document.search(keywords, limit)
+
+    def _load(self, document_id: str) -> Optional[DocumentKeywords]:
+        with self._lock:
+            if self._connection is None:
+                return None
+            rows = self._connection.execute(
+                "SELECT chunk_number, terms FROM keyword_terms"
+                " WHERE document_id = ?",
+                (document_id,),
+            ).fetchall()
+        if not rows:
+            return None
+        document = DocumentKeywords()
+        for chunk_number, terms in rows:
+            document.add(chunk_number, json.loads(terms))
+        return document
+
+    async def remove(self, document_id: str) -> None:
+        """Forget a deleted document."""
+        self.documents.delete(document_id)
+        if self._connection is not None:
+            await asyncio.to_thread(self._remove, document_id)
+
+    def _remove(self, document_id: str) -> None:
+        with self._lock:
+            if self._connection is None:
+                return
+            with self._connection:
+                self._connection.execute(
+                    "DELETE FROM keyword_terms WHERE document_id = ?",
+                    (document_id,),
+                )
+
+    async def aclose(self) -> None:
+        """Close the database."""
+        if self._connection is not None:
+            await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,37 @@
+"""Rank chunks by the occurrences of keywords in their text."""
+
+import heapq
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class KeywordScorer:
+    """Count the case-insensitive occurrences of keywords in texts.
+
+    The keywords are lowercased once, when the scorer is created, and each
+    text once per score, however many keywords there are; the occurrences
+    are then counted by ``str.count``. The score of a text is the total
+    number of occurrences of the keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords = [keyword.lower() for keyword in keywords if keyword]
+
+    def score(self, text: str) -> int:
+        """Count the occurrences of the keywords in a text."""
+        return sum(map(text.lower().count, self.keywords))
+
+    def rank(
+        self, chunks: Iterable[Dict[str, Any]], limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Sort chunks by the score of their text, highest first.
+
+        Chunks with the same score keep their order. With a ``limit``, only
+        that many of the best chunks are returned.
+        """
+
+        def key(chunk: Dict[str, Any]) -> int:
+            return self.score(chunk["text"])
+
+        if limit is None:
+            return sorted(chunks, key=key, reverse=True)
+        return heapq.nlargest(limit, chunks, key=key)
@@ -0,0 +1,148 @@
+"""Bounded thread pool for running blocking Milvus client calls."""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from pymilvus import MilvusClient
+
+logger = logging.getLogger(__name__)
+
+# Minimum number of seconds between two saturation warnings
+SATURATION_WARNING_INTERVAL = 10.0
+
+
+class MilvusExecutor:
+    """Run ``MilvusClient`` calls off the event loop.
+
+    Calls are executed on a dedicated thread pool with ``max_workers``
+    threads. Each call borrows a client from a pool of at most
+    ``pool_size`` clients, which are created on demand and reused across
+    calls. Calls waiting for a thread or a client are counted as queued,
+    and calls holding a client as active.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], MilvusClient],
+        max_workers: int,
+        pool_size: int,
+    ) -> None:
+        self.max_workers = max_workers
+        self.pool_size = pool_size
+        self._client_factory = client_factory
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="milvus"
+        )
+        self._clients: "queue.Queue[MilvusClient]" = queue.Queue()
+        self._all_clients: List[MilvusClient] = []
+        self._created = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._max_queued = 0
+        self._last_warning = 0.0
+
+    async def run(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Run a client method on the thread pool and await its result."""
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+            saturated = self._queued > self.max_workers
+        if saturated:
+            self._warn_saturated()
+
+        future = self._executor.submit(self._invoke, method, args, kwargs)
+        future.add_done_callback(self._count_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _count_cancelled(self, future: "Future[Any]") -> None:
+        # Calls cancelled before they started never reach _invoke
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _invoke(
+        self, method: str, args: tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Any:
+        try:
+            client = self._acquire_client()
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+                self._completed += 1
+            raise
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        finally:
+            self._clients.put(client)
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    def _acquire_client(self) -> MilvusClient:
+        try:
+            return self._clients.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.pool_size
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                client = self._client_factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._all_clients.append(client)
+            return client
+
+        # Every client is in use, wait for one to be returned
+        return self._clients.get()
+
+    def _warn_saturated(self) -> None:
+        now = time.monotonic()
+        if now - self._last_warning < SATURATION_WARNING_INTERVAL:
+            return
+        self._last_warning = now
+        logger.warning(f"Milvus executor saturated: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        """Get the queue depth and throughput of the executor."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "pool_size": self.pool_size,
+                "clients": len(self._all_clients),
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "max_queued": self._max_queued,
+            }
+
+    def close(self) -> None:
+        """Wait for pending calls and close every client."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            clients, self._all_clients = self._all_clients, []
+            self._created = 0
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                logger.error(f"Error closing Milvus client: {e}")
@@ -0,0 +1,117 @@
+"""Migrate a Milvus collection to the typed, partitioned schema.
+
+Collections created before ``document_id`` became the partition key keep
+it, ``chunk_number`` and ``page_number`` as dynamic fields, so every search
+filtered on a document scans the whole collection, and collections created
+before the BM25 sparse vectors fall back to keyword filters in hybrid
+searches. The migration copies the chunks into a new collection built with
+``build_collection_schema``, which derives the sparse vectors from the
+chunk texts, then replaces the old collection with it. Stop the application
+while it runs.
+
+Usage (from the ``backend`` directory)::
+
+    knowledge-table-migrate-milvus
+    knowledge-table-migrate-milvus --batch-size 500
+"""
+
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+from pymilvus import MilvusClient
+
+from app.core.config import Settings, get_settings
+from app.services.vector_db.milvus_service import (
+    build_collection_schema,
+    needs_migration,
+)
+
+logger = logging.getLogger(__name__)
+
+# The typed fields, the other fields are copied as they are
+_INT_FIELDS = ("chunk_number", "page_number")
+
+
+def migrate_collection(
+    client: MilvusClient, settings: Settings, batch_size: int = 1000
+) -> int:
+    """Migrate the chunk collection, returning the number of chunks copied.
+
+    Does nothing and returns 0 if the collection is missing or already up
+    to date.
+    """
+    name = settings.index_name
+    if not client.has_collection(collection_name=name):
+        logger.info(f"Collection {name} does not exist, nothing to migrate")
+        return 0
+    description = client.describe_collection(collection_name=name)
+    if not needs_migration(description, settings.sparse_vectors):
+        logger.info(f"Collection {name} is up to date")
+        return 0
+
+    target = f"{name}_migrating"
+    if client.has_collection(collection_name=target):
+        # Left over from an interrupted migration
+        client.drop_collection(collection_name=target)
+    schema, index_params = build_collection_schema(settings)
+    client.create_collection(
+        collection_name=target,
+        schema=schema,
+        index_params=index_params,
+        consistency_level=0,
+        num_partitions=settings.milvus_num_partitions,
+    )
+
+    copied = 0
+    iterator = client.query_iterator(
+        collection_name=name, batch_size=batch_size, output_fields=["*"]
+    )
+    try:
+        while batch := iterator.next():
+            rows = [_migrate_row(row) for row in batch]
+            client.insert(collection_name=target, data=rows)
+            copied += len(rows)
+            logger.info(f"Copied {copied} chunks")
+    finally:
+        iterator.close()
+
+    client.drop_collection(collection_name=name)
+    client.rename_collection(old_name=target, new_name=name)
+    # Searches need the collection loaded, as it was before
+    client.load_collection(collection_name=name)
+    logger.info(f"Migrated {copied} chunks of collection {name}")
+    return copied
+
+
+def _migrate_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a chunk to the typed schema."""
+    row = dict(row)
+    # Dynamic fields are nested under $meta when read back
+    row.update(row.pop("$meta", None) or {})
+    for field in _INT_FIELDS:
+        row[field] = int(row.get(field) or 0)
+    row["document_id"] = str(row.get("document_id", ""))
+    row["text"] = str(row.get("text", ""))
+    return row
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Migrate the collection configured in the environment."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    settings = get_settings()
+    client = MilvusClient(
+        uri=settings.milvus_db_uri, token=settings.milvus_db_token
+    )
+    try:
+        migrate_collection(client, settings, args.batch_size)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
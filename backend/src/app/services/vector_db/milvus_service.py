@@ -1,12 +1,23 @@
 """The Milvus service for the vector database."""
 
+import asyncio
 import json
 import logging
 import uuid
-from typing import Any, Dict, List
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import BaseModel, Field
-from pymilvus import DataType, MilvusClient
+from pymilvus import (
+    AnnSearchRequest,
+    CollectionSchema,
+    DataType,
+    Function,
+    FunctionType,
+    MilvusClient,
+    RRFRanker,
+)
+from pymilvus.milvus_client import IndexParams
 
 from app.core.config import Settings
 from app.models.query_core import Chunk, Rule
@@ -14,10 +25,16 @@ from app.schemas.query_api import VectorResponseSchema
 from app.services.embedding.base import EmbeddingService
 from app.services.llm_service import CompletionService
 from app.services.vector_db.base import VectorDBService
+from app.services.vector_db.chunk_counts import ChunkCountRegistry
+from app.services.vector_db.keyword_scoring import KeywordScorer
+from app.services.vector_db.milvus_executor import MilvusExecutor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The BM25 sparse vectors Milvus computes from the chunk texts
+SPARSE_FIELD = "sparse"
+
 
 class MilvusMetadata(BaseModel, extra="forbid"):
     """Metadata for Milvus documents."""
@@ -29,9 +46,107 @@ class MilvusMetadata(BaseModel, extra="forbid"):
     uuid: str = Field(default_factory=lambda: str(uuid.uuid4()))
 
 
+def build_collection_schema(
+    settings: Settings,
+) -> Tuple[CollectionSchema, IndexParams]:
+    """Build the schema and indexes of the chunk collection.
+
+    ``document_id`` is the partition key, so the chunks of a document are
+    stored together and a search filtered on one document only reads its
+    partition, and it has an inverted index for the filters and counts on
+    it. With ``sparse_vectors`` set, Milvus derives BM25 sparse vectors
+    from the chunk text for hybrid searches; otherwise the text stays a
+    dynamic field.
+    """
+    schema = MilvusClient.create_schema(
+        auto_id=False,
+        enable_dynamic_field=True,
+    )
+    schema.add_field(
+        field_name="id",
+        datatype=DataType.VARCHAR,
+        is_primary=True,
+        max_length=36,
+    )
+    schema.add_field(
+        field_name="vector",
+        datatype=DataType.FLOAT_VECTOR,
+        dim=settings.dimensions,
+    )
+    schema.add_field(
+        field_name="document_id",
+        datatype=DataType.VARCHAR,
+        max_length=256,
+        is_partition_key=True,
+    )
+    schema.add_field(field_name="chunk_number", datatype=DataType.INT64)
+    schema.add_field(field_name="page_number", datatype=DataType.INT64)
+
+    index_params = MilvusClient.prepare_index_params()
+    index_params.add_index(
+        index_type="AUTOINDEX",
+        field_name="vector",
+        metric_type="COSINE",
+    )
+    index_params.add_index(index_type="INVERTED", field_name="document_id")
+
+    if settings.sparse_vectors:
+        schema.add_field(
+            field_name="text",
+            datatype=DataType.VARCHAR,
+            max_length=65535,
+            enable_analyzer=True,
+        )
+        schema.add_field(
+            field_name=SPARSE_FIELD, datatype=DataType.SPARSE_FLOAT_VECTOR
+        )
+        schema.add_function(
+            Function(
+                name="bm25",
+                function_type=FunctionType.BM25,
+                input_field_names=["text"],
+                output_field_names=[SPARSE_FIELD],
+            )
+        )
+        index_params.add_index(
+            index_type="SPARSE_INVERTED_INDEX",
+            field_name=SPARSE_FIELD,
+            metric_type="BM25",
+        )
+    return schema, index_params
+
+
+def has_sparse_vectors(description: Dict[str, Any]) -> bool:
+    """Whether a described collection has the BM25 sparse vectors."""
+    return any(
+        field["name"] == SPARSE_FIELD
+        for field in description.get("fields", [])
+    )
+
+
+def needs_migration(
+    description: Dict[str, Any], sparse_vectors: bool = False
+) -> bool:
+    """Whether a described collection predates the current schema.
+
+    Collections without the BM25 sparse vectors only need migrating if
+    ``sparse_vectors`` are wanted.
+    """
+    partitioned = any(
+        field["name"] == "document_id" and field.get("is_partition_key")
+        for field in description.get("fields", [])
+    )
+    return not partitioned or (
+        sparse_vectors and not has_sparse_vectors(description)
+    )
+
+
 class MilvusService(VectorDBService):
     """The Milvus service for the vector database."""
 
+    # Chunks indexed per document, see chunk_counts
+    _chunk_counts: Optional[ChunkCountRegistry] = None
+
     def __init__(
         self,
         embedding_service: EmbeddingService,
@@ -42,59 +157,83 @@ class MilvusService(VectorDBService):
         self.embedding_service = embedding_service
         self.llm_service = llm_service
         self.settings = settings
-        self.client = MilvusClient(
+        self.executor = MilvusExecutor(
+            self._create_client,
+            max_workers=settings.milvus_max_workers,
+            pool_size=settings.milvus_client_pool_size,
+        )
+
+    def _create_client(self) -> MilvusClient:
+        """Create a Milvus client."""
+        return MilvusClient(
             uri=self.settings.milvus_db_uri,
             token=self.settings.milvus_db_token,
         )
 
+    async def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a client method on the Milvus executor."""
+        return await self.executor.run(method, *args, **kwargs)
+
+    @property
+    def chunk_counts(self) -> ChunkCountRegistry:
+        """The number of chunks of each document, created on first use."""
+        if self._chunk_counts is None:
+            self._chunk_counts = ChunkCountRegistry(
+                self.settings.index_name,
+                self.settings.milvus_chunk_counts_path,
+            )
+        return self._chunk_counts
+
+    async def count_chunks(self, document_id: str) -> int:
+        """Get the number of chunks of a document.
+
+        Answered from the registry filled at upsert time; only documents
+        it does not know yet, e.g. indexed by another process, are counted
+        in Milvus.
+        """
+        count = self.chunk_counts.get(document_id)
+        if count is not None:
+            return count
+
+        count_response = await self._call(
+            "query",
+            collection_name=self.settings.index_name,
+            filter=f'document_id == "{document_id}"',
+            output_fields=["count(*)"],
+        )
+        count = int(count_response[0]["count(*)"])
+        # An empty document may still be uploaded, so only counts found in
+        # Milvus are remembered
+        if count:
+            await self.chunk_counts.set(document_id, count)
+        return count
+
     async def ensure_collection_exists(self) -> None:
         """Ensure the collection exists in the Milvus database."""
         try:
             logger.info(
                 f"Checking if collection {self.settings.index_name} exists"
             )
-            if not self.client.has_collection(
-                collection_name=self.settings.index_name
+            if not await self._call(
+                "has_collection", collection_name=self.settings.index_name
             ):
                 logger.info(
                     f"Collection {self.settings.index_name} does not exist. Creating it now."
                 )
-                # Create the schema
-                schema = self.client.create_schema(
-                    auto_id=False,
-                    enable_dynamic_field=True,
-                )
-
-                # Add the id field
-                schema.add_field(
-                    field_name="id",
-                    datatype=DataType.VARCHAR,
-                    is_primary=True,
-                    max_length=36,
-                )
-
-                # Add the vector field
-                schema.add_field(
-                    field_name="vector",
-                    datatype=DataType.FLOAT_VECTOR,
-                    dim=self.settings.dimensions,
-                )
-
-                # Add the index
-                index_params = self.client.prepare_index_params()
-                index_params.add_index(
-                    index_type="AUTOINDEX",
-                    field_name="vector",
-                    metric_type="COSINE",
-                )
+                schema, index_params = build_collection_schema(self.settings)
 
                 # Create the collection
-                self.client.create_collection(
+                await self._call(
+                    "create_collection",
                     collection_name=self.settings.index_name,
                     schema=schema,
                     index_params=index_params,
                     consistency_level=0,
+                    num_partitions=self.settings.milvus_num_partitions,
                 )
+                self._sparse_search = self.settings.sparse_vectors
+                # Counts left from a dropped collection no longer hold
+                await self.chunk_counts.clear()
                 logger.info(
                     f"Collection {self.settings.index_name} created successfully."
                 )
@@ -102,6 +241,17 @@ class MilvusService(VectorDBService):
                 logger.info(
                     f"Collection {self.settings.index_name} already exists"
                 )
+                description = await self._call(
+                    "describe_collection",
+                    collection_name=self.settings.index_name,
+                )
+                if needs_migration(description, self.settings.sparse_vectors):
+                    logger.warning(
+                        f"Collection {self.settings.index_name} predates the "
+                        "current schema, searches are slower. Migrate it "
+                        "with knowledge-table-migrate-milvus."
+                    )
+                self._sparse_search = has_sparse_vectors(description)
         except Exception as e:
             logger.error(f"Error ensuring collection exists: {e}")
             raise
@@ -113,7 +263,7 @@ class MilvusService(VectorDBService):
         logger.info(f"Upserting {len(vectors)} chunks")
 
         # Ensure the collection exists
-        await self.ensure_collection_exists()
+        await self.ensure_collection_ready()
 
         batch_size = (
             1000  # Adjust this based on your Milvus instance's capabilities
@@ -123,10 +273,19 @@ class MilvusService(VectorDBService):
         try:
             for i in range(0, len(vectors), batch_size):
                 batch = vectors[i : i + batch_size]
-                upsert_response = self.client.insert(
-                    collection_name=self.settings.index_name, data=batch
+                upsert_response = await self._call(
+                    "insert",
+                    collection_name=self.settings.index_name,
+                    data=batch,
                 )
                 total_inserted += upsert_response["insert_count"]
+                await self.chunk_counts.add(
+                    Counter(
+                        str(vector["document_id"])
+                        for vector in batch
+                        if "document_id" in vector
+                    )
+                )
                 logger.info(
                     f"Inserted batch of {upsert_response['insert_count']} chunks."
                 )
@@ -139,6 +298,8 @@ class MilvusService(VectorDBService):
             }
         except Exception as e:
             logger.error(f"Error upserting vectors: {e}")
+            # The collection may have been dropped, check again next time
+            self.invalidate_collection_cache()
             if vectors:
                 logger.error(f"Sample vector data: {vectors[0]}")
             raise
@@ -147,37 +308,45 @@ class MilvusService(VectorDBService):
         self, queries: List[str], document_id: str
     ) -> VectorResponseSchema:
         """Perform a vector search on the Milvus database."""
+        if len(queries) == 1:
+            prefetched = await self.prefetched_vector_search(
+                queries[0], document_id
+            )
+            if prefetched is not None:
+                return prefetched
+
         logger.info(f"Retrieving vectors for {len(queries)} queries.")
 
         # Prepare the final chunks
         final_chunks: List[Dict[str, Any]] = []
 
-        # Search for each query
-        for query in queries:
-            logger.info("Generating embedding.")
-            # Use get_single_embedding but wrap result in list for Milvus
-            embedded_query = [await self.get_single_embedding(query)]
+        logger.info("Generating embeddings.")
+        if len(queries) == 1:
+            embedded_queries = [await self.get_single_embedding(queries[0])]
+        else:
+            embedded_queries = await self.get_query_embeddings(queries)
 
-            logger.info("Searching...")
+        logger.info("Searching...")
 
-            # Search the collection
-            query_response = self.client.search(
-                collection_name=self.settings.index_name,
-                data=embedded_query,
-                filter=f"document_id == '{document_id}'",
-                limit=40,
-                output_fields=[
-                    "text",
-                    "page_number",
-                    "document_id",
-                    "chunk_number",
-                ],
-            )
+        # Search the collection for all the queries at once
+        query_response = await self._call(
+            "search",
+            collection_name=self.settings.index_name,
+            data=embedded_queries,
+            filter=f"document_id == '{document_id}'",
+            limit=40,
+            output_fields=[
+                "text",
+                "page_number",
+                "document_id",
+                "chunk_number",
+            ],
+        )
 
-            # Add the chunks to the final chunks
-            final_chunks.extend(
-                item["entity"] for result in query_response for item in result
-            )
+        # Add the chunks to the final chunks, in query order
+        final_chunks.extend(
+            item["entity"] for result in query_response for item in result
+        )
 
         seen_chunks = set()
         formatted_output = []
@@ -197,6 +366,54 @@ class MilvusService(VectorDBService):
             chunks=formatted_output,
         )
 
+    async def multi_document_search(
+        self, query: str, document_ids: List[str], limit: int = 40
+    ) -> Dict[str, VectorResponseSchema]:
+        """Search several documents in one grouped Milvus search."""
+        logger.info(f"Searching {len(document_ids)} documents at once.")
+        embedded_query = [await self.get_single_embedding(query)]
+
+        query_response = await self._call(
+            "search",
+            collection_name=self.settings.index_name,
+            data=embedded_query,
+            filter=f"document_id in {json.dumps(document_ids)}",
+            limit=len(document_ids),
+            group_by_field="document_id",
+            group_size=limit,
+            output_fields=[
+                "text",
+                "page_number",
+                "document_id",
+                "chunk_number",
+            ],
+        )
+
+        chunks: Dict[str, List[Chunk]] = {
+            document_id: [] for document_id in document_ids
+        }
+        seen_chunks = set()
+        for result in query_response:
+            for item in result:
+                entity = item["entity"]
+                key = (entity["document_id"], entity["chunk_number"])
+                if entity["document_id"] in chunks and key not in seen_chunks:
+                    seen_chunks.add(key)
+                    chunks[entity["document_id"]].append(
+                        Chunk(
+                            content=entity["text"],
+                            page=entity["page_number"],
+                        )
+                    )
+
+        return {
+            document_id: VectorResponseSchema(
+                message="Query processed successfully.",
+                chunks=document_chunks,
+            )
+            for document_id, document_chunks in chunks.items()
+        }
+
     async def keyword_search(
         self, query: str, document_id: str, keywords: list[str]
     ) -> VectorResponseSchema:
@@ -217,7 +434,8 @@ class MilvusService(VectorDBService):
                 filter_string = f'(text like "%{clean_keyword}%") && document_id == "{document_id}"'
 
                 # Query the collection
-                keyword_response = self.client.query(
+                keyword_response = await self._call(
+                    "query",
                     collection_name=self.settings.index_name,
                     filter=filter_string,
                     output_fields=[
@@ -228,25 +446,13 @@ class MilvusService(VectorDBService):
                     ],
                 )
 
-                chunks = json.dumps(keyword_response, indent=2)
-                deserialized_chunks = json.loads(chunks)
-
                 # If there are chunks, add the keyword to the response
-                if deserialized_chunks:
+                if keyword_response:
                     response.append(keyword)
 
-                    def count_keyword_occurrences(
-                        text: str, keyword: str
-                    ) -> int:
-                        return text.lower().count(keyword.lower())
-
                     # Sort the chunks by the number of keyword occurrences
-                    sorted_keyword_chunks = sorted(
-                        deserialized_chunks,
-                        key=lambda chunk: count_keyword_occurrences(
-                            chunk["text"], keyword
-                        ),
-                        reverse=True,
+                    sorted_keyword_chunks = KeywordScorer([keyword]).rank(
+                        keyword_response, limit=5
                     )
 
                     chunks_added = 0
@@ -271,17 +477,54 @@ class MilvusService(VectorDBService):
             keywords=response,
         )
 
+    async def get_chunks(
+        self, document_id: str, chunk_numbers: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Get chunks of a document from the Milvus database."""
+        chunks: List[Dict[str, Any]] = await self._call(
+            "query",
+            collection_name=self.settings.index_name,
+            filter=(
+                f'document_id == "{document_id}"'
+                f" && chunk_number in {list(chunk_numbers)}"
+            ),
+            output_fields=["text", "page_number", "chunk_number"],
+        )
+        return chunks
+
     async def hybrid_search(
         self, query: str, document_id: str, rules: list[Rule]
     ) -> VectorResponseSchema:
-        """Perform a hybrid search on the Milvus database."""
+        """Perform a hybrid search on the Milvus database.
+
+        On collections with BM25 sparse vectors, a dense search of the query
+        and a BM25 search of its keywords are fused in a single request (see
+        ``fused_search``); otherwise the chunks containing the keywords are
+        added to the dense search results. Those are found in the local
+        index of the document (see ``KeywordIndex``), or by filtering the
+        chunks in the collection for documents missing from it, e.g.
+        uploaded before it existed or evicted from an index kept only in
+        memory.
+        """
         logger.info("Performing hybrid search.")
 
         sorted_keyword_chunks = []
         keywords = await self.extract_keywords(query, rules, self.llm_service)
 
+        await self.ensure_collection_ready()
+        if self._sparse_search:
+            return await self.fused_search(query, document_id, keywords)
+
+        indexed_chunks = (
+            await self.indexed_keyword_search(document_id, keywords, limit=20)
+            if keywords
+            else None
+        )
+
+        if indexed_chunks is not None:
+            sorted_keyword_chunks = indexed_chunks
         # Run the keyword search (if keywords exist)
-        if keywords:
+        elif keywords:
             like_conditions = " || ".join(
                 [f'text like "%{keyword}%"' for keyword in keywords]
             )
@@ -292,7 +535,8 @@ class MilvusService(VectorDBService):
             logger.info("Running query with keyword filters.")
 
             # Query the collection
-            keyword_response = self.client.query(
+            keyword_response = await self._call(
+                "query",
                 collection_name=self.settings.index_name,
                 filter=filter_string,
                 output_fields=[
@@ -303,35 +547,17 @@ class MilvusService(VectorDBService):
                 ],
             )
 
-            keyword_chunks = json.dumps(keyword_response, indent=2)
-            deserialized_keyword_chunks = json.loads(keyword_chunks)
-
-            # Count the keywords in the chunks
-            def count_keywords(text: str, keywords: List[str]) -> int:
-                return sum(
-                    text.lower().count(keyword.lower()) for keyword in keywords
-                )
-
             # Sort the chunks by the number of keywords
-            sorted_keyword_chunks = sorted(
-                deserialized_keyword_chunks,
-                key=lambda chunk: count_keywords(
-                    chunk["text"], keywords or []
-                ),
-                reverse=True,
+            sorted_keyword_chunks = KeywordScorer(keywords).rank(
+                keyword_response, limit=20
             )
 
         # Embed the query
         embedded_query = [await self.get_single_embedding(query)]
 
         try:
-            # First, let's check if there are any vectors for this document_id
-            count_response = self.client.query(
-                collection_name=self.settings.index_name,
-                filter=f'document_id == "{document_id}"',
-                output_fields=["count(*)"],
-            )
-            vector_count = count_response[0]["count(*)"]
+            # Skip documents without chunks, counted when they were upserted
+            vector_count = await self.count_chunks(document_id)
             logger.info(
                 f"Number of vectors for document_id {document_id}: {vector_count}"
             )
@@ -345,7 +571,8 @@ class MilvusService(VectorDBService):
                 )
 
             # Now let's perform the search
-            semantic_response = self.client.search(
+            semantic_response = await self._call(
+                "search",
                 collection_name=self.settings.index_name,
                 data=embedded_query,
                 filter=f'document_id == "{document_id}"',
@@ -412,6 +639,62 @@ class MilvusService(VectorDBService):
             )
             raise
 
+    async def fused_search(
+        self, query: str, document_id: str, keywords: List[str]
+    ) -> VectorResponseSchema:
+        """Fuse a dense and a BM25 search of a document.
+
+        Both searches run in one request and their results are merged with
+        reciprocal rank fusion, keeping the ``hybrid_search_limit`` best
+        chunks. The BM25 search looks for the keywords, or the query if
+        there are none.
+        """
+        if not await self.count_chunks(document_id):
+            logger.warning(f"No vectors found for document_id: {document_id}")
+            return VectorResponseSchema(
+                message="No data found for the given document.", chunks=[]
+            )
+
+        limit = self.settings.hybrid_search_limit
+        document_filter = f'document_id == "{document_id}"'
+        requests = [
+            AnnSearchRequest(
+                data=[await self.get_single_embedding(query)],
+                anns_field="vector",
+                param={},
+                limit=limit,
+                expr=document_filter,
+            ),
+            AnnSearchRequest(
+                data=[" ".join(keywords) or query],
+                anns_field=SPARSE_FIELD,
+                param={},
+                limit=limit,
+                expr=document_filter,
+            ),
+        ]
+        response = await self._call(
+            "hybrid_search",
+            collection_name=self.settings.index_name,
+            reqs=requests,
+            ranker=RRFRanker(self.settings.rrf_k),
+            limit=limit,
+            output_fields=["text", "page_number", "chunk_number"],
+        )
+
+        chunks = [
+            Chunk(
+                content=hit["entity"]["text"],
+                page=hit["entity"].get("page_number", 0),
+            )
+            for hits in response
+            for hit in hits
+        ]
+        logger.info(f"Retrieved {len(chunks)} fused chunks.")
+        return VectorResponseSchema(
+            message="Query processed successfully.", chunks=chunks
+        )
+
     async def decomposed_search(
         self, query: str, document_id: str, rules: List[Rule]
     ) -> Dict[str, Any]:
@@ -444,13 +727,16 @@ class MilvusService(VectorDBService):
 
     async def delete_document(self, document_id: str) -> Dict[str, str]:
         """Delete a document from the Milvus vector database."""
-        self.client.delete(
+        await self._call(
+            "delete",
             collection_name=self.settings.index_name,
             filter=f'document_id == "{document_id}"',
         )
+        await self.chunk_counts.remove(document_id)
 
         # Confirm the deletion
-        confirm_delete = self.client.query(
+        confirm_delete = await self._call(
+            "query",
             collection_name=self.settings.index_name,
             filter=f'document_id == "{document_id}"',
         )
@@ -465,3 +751,16 @@ class MilvusService(VectorDBService):
             }
         else:
             return {"status": "error", "message": "Document deletion failed."}
+
+    async def aclose(self) -> None:
+        """Close the Milvus executor and its clients."""
+        try:
+            await asyncio.to_thread(self.executor.close)
+            if self._chunk_counts is not None:
+                await self._chunk_counts.aclose()
+        finally:
+            await super().aclose()
+
+    def executor_stats(self) -> Dict[str, int]:
+        """Get the queue depth and throughput of the Milvus executor."""
+        return self.executor.stats()
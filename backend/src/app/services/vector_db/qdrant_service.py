@@ -2,13 +2,14 @@
 
 # mypy: disable-error-code="index"
 
+import inspect
 import logging
 import uuid
-from typing import Any, Dict, List, Sequence
+from typing import Any, Dict, List, Sequence, Union
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 
 from app.core.config import Settings
 from app.models.query_core import Chunk, Rule
@@ -16,12 +17,19 @@ from app.schemas.query_api import VectorResponseSchema
 from app.services.embedding.base import EmbeddingService
 from app.services.llm_service import CompletionService
 from app.services.vector_db.base import VectorDBService
+from app.services.vector_db.bm25 import BM25Encoder
+from app.services.vector_db.keyword_scoring import KeywordScorer
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The named vector holding the BM25 sparse vectors of the chunk texts
+SPARSE_VECTOR = "bm25"
+# The payload fields that searches return
+CHUNK_FIELDS = ["text", "page_number", "chunk_number"]
+
 
 class QdrantMetadata(BaseModel, extra="forbid"):
     """Metadata for Qdrant documents."""
@@ -47,54 +55,119 @@ class QdrantService(VectorDBService):
         self.embedding_service = embedding_service
         self.collection_name = settings.index_name
         self.dimensions = settings.dimensions
-        qdrant_config = settings.qdrant.model_dump(exclude_none=True)
-        self.client = QdrantClient(**qdrant_config)
+        self.bm25 = BM25Encoder.for_chunk_size(settings.chunk_size)
+        self.client = self._create_client()
+
+    def _create_client(self) -> Union[QdrantClient, AsyncQdrantClient]:
+        """Create the Qdrant client."""
+        return QdrantClient(**self.settings.qdrant.client_config())
+
+    async def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a client method, awaiting the result for async clients."""
+        result = getattr(self.client, method)(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
 
     async def upsert_vectors(
         self, vectors: List[Dict[str, Any]]
     ) -> Dict[str, str]:
         """Add vectors to a Qdrant collection."""
         logger.info(f"Upserting {len(vectors)} chunks")
-        await self.ensure_collection_exists()
+        await self.ensure_collection_ready()
         points = [
             models.PointStruct(
-                id=entry.pop("id"), vector=entry.pop("vector"), payload=entry
+                id=entry.pop("id"),
+                vector=self._point_vector(
+                    entry.pop("vector"), entry.get("text", "")
+                ),
+                payload=entry,
             )
             for entry in vectors
         ]
-        self.client.upsert(self.collection_name, points=points, wait=True)
+        try:
+            await self._call(
+                "upsert", self.collection_name, points=points, wait=True
+            )
+        except Exception:
+            # The collection may have been dropped, check again next time
+            self.invalidate_collection_cache()
+            raise
         return {"message": f"Successfully upserted {len(vectors)} chunks."}
 
+    def _point_vector(
+        self, vector: List[float], text: str
+    ) -> Union[List[float], Dict[str, Any]]:
+        """Get the vectors of a point, adding its BM25 vector if indexed."""
+        if not self._sparse_search:
+            return vector
+        indices, values = self.bm25.encode_document(text)
+        return {
+            "": vector,
+            SPARSE_VECTOR: models.SparseVector(indices=indices, values=values),
+        }
+
     async def vector_search(
         self, queries: List[str], document_id: str
     ) -> VectorResponseSchema:
         """Perform a vector search on the Qdrant collection."""
+        if len(queries) == 1:
+            prefetched = await self.prefetched_vector_search(
+                queries[0], document_id
+            )
+            if prefetched is not None:
+                return prefetched
+
         logger.info(f"Retrieving vectors for {len(queries)} queries.")
 
         final_chunks: List[Dict[str, Any]] = []
+        query_filter = models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="document_id",
+                    match=models.MatchValue(value=document_id),
+                )
+            ]
+        )
 
-        for query in queries:
+        if len(queries) == 1:
             logger.info("Generating embedding.")
-            embedded_query = await self.get_single_embedding(query)
+            embedded_query = await self.get_single_embedding(queries[0])
             logger.info("Searching...")
 
-            query_response = self.client.query_points(
+            responses = [
+                await self._call(
+                    "query_points",
+                    self.collection_name,
+                    query=embedded_query,
+                    limit=40,
+                    with_payload=True,
+                    query_filter=query_filter,
+                )
+            ]
+        else:
+            logger.info("Generating embeddings.")
+            embedded_queries = await self.get_query_embeddings(queries)
+            logger.info("Searching...")
+
+            # All the queries in a single round-trip
+            responses = await self._call(
+                "query_batch_points",
                 self.collection_name,
-                query=embedded_query,
-                limit=40,
-                with_payload=True,
-                query_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="document_id",
-                            match=models.MatchValue(value=document_id),
-                        )
-                    ]
-                ),
-            ).points
+                requests=[
+                    models.QueryRequest(
+                        query=embedded_query,
+                        filter=query_filter,
+                        limit=40,
+                        with_payload=True,
+                    )
+                    for embedded_query in embedded_queries
+                ],
+            )
 
+        for response in responses:
             final_chunks.extend(
-                [point.payload for point in query_response if point.payload]
+                [point.payload for point in response.points if point.payload]
             )
 
         seen_chunks, formatted_output = set(), []
@@ -112,19 +185,112 @@ class QdrantService(VectorDBService):
             chunks=[Chunk(**chunk) for chunk in formatted_output],
         )
 
+    async def multi_document_search(
+        self, query: str, document_ids: List[str], limit: int = 40
+    ) -> Dict[str, VectorResponseSchema]:
+        """Search several documents in one grouped Qdrant query."""
+        logger.info(f"Searching {len(document_ids)} documents at once.")
+        embedded_query = await self.get_single_embedding(query)
+
+        response = await self._call(
+            "query_points_groups",
+            self.collection_name,
+            query=embedded_query,
+            group_by="document_id",
+            limit=len(document_ids),
+            group_size=limit,
+            with_payload=True,
+            query_filter=models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="document_id",
+                        match=models.MatchAny(any=document_ids),
+                    )
+                ]
+            ),
+        )
+
+        chunks: Dict[str, List[Chunk]] = {
+            document_id: [] for document_id in document_ids
+        }
+        for group in response.groups:
+            document_chunks = chunks.get(str(group.id))
+            if document_chunks is None:
+                continue
+            seen_chunks = set()
+            for point in group.hits:
+                payload = point.payload
+                if payload and payload["chunk_number"] not in seen_chunks:
+                    seen_chunks.add(payload["chunk_number"])
+                    document_chunks.append(
+                        Chunk(
+                            content=payload["text"],
+                            page=payload["page_number"],
+                        )
+                    )
+
+        return {
+            document_id: VectorResponseSchema(
+                message="Query processed successfully.",
+                chunks=document_chunks,
+            )
+            for document_id, document_chunks in chunks.items()
+        }
+
+    async def get_chunks(
+        self, document_id: str, chunk_numbers: List[int]
+    ) -> List[Dict[str, Any]]:
+        """Get chunks of a document from a Qdrant collection."""
+        return await self.scroll_payloads(
+            models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="document_id",
+                        match=models.MatchValue(value=document_id),
+                    ),
+                    models.FieldCondition(
+                        key="chunk_number",
+                        match=models.MatchAny(any=chunk_numbers),
+                    ),
+                ]
+            )
+        )
+
     async def hybrid_search(
         self,
         query: str,
         document_id: str,
         rules: list[Rule],
     ) -> VectorResponseSchema:
-        """Perform a hybrid search on the Qdrant collection."""
+        """Perform a hybrid search on the Qdrant collection.
+
+        On collections with BM25 sparse vectors, a dense search of the query
+        and a BM25 search of its keywords are fused in a single request (see
+        ``fused_search``); otherwise the chunks containing the keywords are
+        added to the dense search results. Those are found in the local
+        index of the document (see ``KeywordIndex``), or by filtering the
+        chunks in the collection for documents missing from it, e.g.
+        uploaded before it existed or evicted from an index kept only in
+        memory.
+        """
         logger.info("Performing hybrid search.")
 
         sorted_keyword_chunks = []
         keywords = await self.extract_keywords(query, rules, self.llm_service)
 
-        if keywords:
+        await self.ensure_collection_ready()
+        if self._sparse_search:
+            return await self.fused_search(query, document_id, keywords)
+
+        indexed_chunks = (
+            await self.indexed_keyword_search(document_id, keywords, limit=20)
+            if keywords
+            else None
+        )
+
+        if indexed_chunks is not None:
+            sorted_keyword_chunks = indexed_chunks
+        elif keywords:
             like_conditions: Sequence[models.FieldCondition] = [
                 models.FieldCondition(
                     key="text", match=models.MatchText(text=keyword)
@@ -140,48 +306,35 @@ class QdrantService(VectorDBService):
             )
 
             logger.info("Running query with keyword filters.")
-            keyword_response = self.client.query_points(
-                collection_name=self.collection_name,
-                query_filter=_filter,
-                with_payload=True,
-            ).points
-            keyword_response = [
-                point.payload for point in keyword_response if point.payload  # type: ignore
-            ]
-
-            def count_keywords(text: str, keywords: List[str]) -> int:
-                return sum(
-                    text.lower().count(keyword.lower()) for keyword in keywords
-                )
+            keyword_response = await self.scroll_payloads(_filter)
 
-            sorted_keyword_chunks = sorted(
-                keyword_response,
-                key=lambda chunk: count_keywords(
-                    chunk["text"], keywords or []
-                ),
-                reverse=True,
+            sorted_keyword_chunks = KeywordScorer(keywords).rank(
+                keyword_response, limit=20
             )
 
         embedded_query = await self.get_single_embedding(query)
         logger.info("Running semantic similarity search.")
 
-        semantic_response = self.client.query_points(
-            collection_name=self.collection_name,
-            query=embedded_query,
-            query_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="document_id",
-                        match=models.MatchValue(value=document_id),
-                    )
-                ]
-            ),
-            limit=40,
-            with_payload=True,
+        semantic_response = (
+            await self._call(
+                "query_points",
+                collection_name=self.collection_name,
+                query=embedded_query,
+                query_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="document_id",
+                            match=models.MatchValue(value=document_id),
+                        )
+                    ]
+                ),
+                limit=40,
+                with_payload=True,
+            )
         ).points
 
         semantic_response = [
-            point.payload for point in semantic_response if point.payload  # type: ignore
+            point.payload for point in semantic_response if point.payload
         ]
 
         print(f"Found {len(semantic_response)} semantic chunks.")
@@ -212,6 +365,92 @@ class QdrantService(VectorDBService):
             chunks=[Chunk(**chunk) for chunk in formatted_output],
         )
 
+    async def fused_search(
+        self, query: str, document_id: str, keywords: List[str]
+    ) -> VectorResponseSchema:
+        """Fuse a dense and a BM25 search of a document.
+
+        Both searches are prefetched in one query and their results merged
+        with reciprocal rank fusion, keeping the ``hybrid_search_limit``
+        best chunks. The BM25 search looks for the keywords, or the query
+        if there are none.
+        """
+        limit = self.settings.hybrid_search_limit
+        query_filter = models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="document_id",
+                    match=models.MatchValue(value=document_id),
+                )
+            ]
+        )
+        prefetch = [
+            models.Prefetch(
+                query=await self.get_single_embedding(query),
+                filter=query_filter,
+                limit=limit,
+            )
+        ]
+        indices, values = self.bm25.encode_query(" ".join(keywords) or query)
+        if indices:
+            prefetch.append(
+                models.Prefetch(
+                    query=models.SparseVector(indices=indices, values=values),
+                    using=SPARSE_VECTOR,
+                    filter=query_filter,
+                    limit=limit,
+                )
+            )
+
+        response = await self._call(
+            "query_points",
+            self.collection_name,
+            prefetch=prefetch,
+            query=models.RrfQuery(rrf=models.Rrf(k=self.settings.rrf_k)),
+            limit=limit,
+            with_payload=CHUNK_FIELDS,
+        )
+
+        chunks = [
+            Chunk(
+                content=point.payload["text"],
+                page=point.payload["page_number"],
+            )
+            for point in response.points
+            if point.payload
+        ]
+        logger.info(f"Retrieved {len(chunks)} fused chunks.")
+        return VectorResponseSchema(
+            message="Query processed successfully.", chunks=chunks
+        )
+
+    async def scroll_payloads(
+        self, scroll_filter: models.Filter
+    ) -> List[Dict[str, Any]]:
+        """Get the chunks matching a filter, a page at a time.
+
+        Stops after ``keyword_candidate_limit`` chunks, in point id order,
+        and fetches only the payload fields that searches return.
+        """
+        limit = self.settings.keyword_candidate_limit
+        page_size = self.settings.keyword_page_size
+        payloads: List[Dict[str, Any]] = []
+        offset = None
+        while len(payloads) < limit:
+            points, offset = await self._call(
+                "scroll",
+                self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=min(page_size, limit - len(payloads)),
+                offset=offset,
+                with_payload=CHUNK_FIELDS,
+                with_vectors=False,
+            )
+            payloads.extend(point.payload for point in points if point.payload)
+            if offset is None:
+                break
+        return payloads
+
     # Decomposition query
     async def decomposed_search(
         self,
@@ -238,18 +477,82 @@ class QdrantService(VectorDBService):
         raise NotImplementedError("Keyword search is not implemented yet.")
 
     async def ensure_collection_exists(self) -> None:
-        """Ensure the Qdrant collection exists."""
-        if not self.client.collection_exists(self.collection_name):
-            self.client.create_collection(
+        """Ensure the Qdrant collection and its payload indexes exist.
+
+        New collections get a BM25 sparse vector for hybrid searches if
+        ``sparse_vectors`` is set; Qdrant weighs its terms by their inverse
+        document frequency.
+        """
+        if not await self._call("collection_exists", self.collection_name):
+            sparse_vectors = self.settings.sparse_vectors
+            await self._call(
+                "create_collection",
                 collection_name=self.collection_name,
                 vectors_config=models.VectorParams(
                     size=self.dimensions, distance=models.Distance.COSINE
                 ),
+                sparse_vectors_config=(
+                    {
+                        SPARSE_VECTOR: models.SparseVectorParams(
+                            modifier=models.Modifier.IDF
+                        )
+                    }
+                    if sparse_vectors
+                    else None
+                ),
+            )
+        else:
+            collection = await self._call(
+                "get_collection", self.collection_name
+            )
+            sparse_vectors = SPARSE_VECTOR in (
+                collection.config.params.sparse_vectors or {}
+            )
+        self._sparse_search = sparse_vectors
+        await self.ensure_payload_indexes()
+
+    async def ensure_payload_indexes(self) -> None:
+        """Index the payload fields searches filter on.
+
+        Creates a keyword index on ``document_id``, which every search
+        filters on, and a full-text index on ``text`` for the keyword
+        conditions of hybrid searches. Indexes missing from an existing
+        collection are added in place.
+        """
+        config = self.settings.qdrant
+        if config.location == ":memory:" or config.path is not None:
+            # Local mode has no payload indexes
+            return
+
+        collection = await self._call("get_collection", self.collection_name)
+        indexed = collection.payload_schema or {}
+        indexes: Dict[str, models.PayloadSchemaParams] = {
+            "document_id": models.KeywordIndexParams(
+                type=models.KeywordIndexType.KEYWORD,
+                is_tenant=config.tenant,
+            ),
+            "text": models.TextIndexParams(
+                type=models.TextIndexType.TEXT,
+                tokenizer=models.TokenizerType(config.tokenizer),
+                lowercase=True,
+            ),
+        }
+        for field_name, field_schema in indexes.items():
+            if field_name in indexed:
+                continue
+            logger.info(f"Creating payload index on {field_name}")
+            await self._call(
+                "create_payload_index",
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True,
             )
 
     async def delete_document(self, document_id: str) -> Dict[str, str]:
         """Delete a document from a Qdrant collection."""
-        self.client.delete(
+        await self._call(
+            "delete",
             collection_name=self.collection_name,
             points_selector=models.Filter(
                 must=[
@@ -265,3 +568,18 @@ class QdrantService(VectorDBService):
             "status": "success",
             "message": "Document deleted successfully.",
         }
+
+    async def aclose(self) -> None:
+        """Close the Qdrant client."""
+        try:
+            await self._call("close")
+        finally:
+            await super().aclose()
+
+
+class AsyncQdrantService(QdrantService):
+    """Vector service implementation using the non-blocking Qdrant client."""
+
+    def _create_client(self) -> AsyncQdrantClient:
+        """Create the async Qdrant client."""
+        return AsyncQdrantClient(**self.settings.qdrant.client_config())
@@ -11,6 +11,7 @@ from app.services.document_service import DocumentService
 from app.services.embedding.base import EmbeddingService
 from app.services.llm.base import CompletionService
 from app.services.vector_db.base import VectorDBService
+from app.services.vector_db.keyword_index import KeywordIndex
 
 
 def get_settings_override():
@@ -27,6 +28,9 @@ def get_settings_override():
         embedding_model="test_embedding_model",
         dimensions=1536,
         llm_model="test_llm_model",
+        keyword_cache_path=None,
+        milvus_chunk_counts_path=None,
+        keyword_index_path=None,
     )
 
 
@@ -101,6 +105,10 @@ def mock_vector_db_service(
     service.embedding_service = mock_embeddings_service
     service.llm_service = mock_llm_service
     service.settings = test_settings
+    service.keyword_index = KeywordIndex()
+    service.upload_keyword_index = AsyncMock(
+        return_value=service.keyword_index
+    )
 
     # Mock hybrid_search to return a proper response
     service.hybrid_search = AsyncMock(
@@ -0,0 +1,115 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.dependencies import (
+    get_document_service,
+    get_llm_service,
+    get_vector_db_service,
+)
+from app.main import lifespan
+from app.services.document_service import DocumentService
+
+
+def _make_app(test_settings):
+    app = FastAPI(lifespan=lifespan)
+    app.dependency_overrides[get_settings] = lambda: test_settings
+
+    @app.get("/services")
+    def services(
+        vector_db_service=Depends(get_vector_db_service),
+        document_service=Depends(get_document_service),
+    ):
+        return {
+            "vector_db_service": id(vector_db_service),
+            "document_service": id(document_service),
+            "document_vector_db_service": id(
+                document_service.vector_db_service
+            ),
+            "pdf_executor_owner": id(document_service._pdf_executor_owner),
+        }
+
+    return app
+
+
+def test_services_are_created_once_at_startup(
+    test_settings, mock_llm_service, mock_vector_db_service
+):
+    app = _make_app(test_settings)
+
+    with TestClient(app) as test_client:
+        assert app.state.llm_service is mock_llm_service
+        assert app.state.vector_db_service is mock_vector_db_service
+        assert isinstance(app.state.document_service, DocumentService)
+        document_service = app.state.document_service
+
+        first = test_client.get("/services").json()
+        second = test_client.get("/services").json()
+
+    assert first == second
+    assert first["vector_db_service"] == id(mock_vector_db_service)
+    assert first["document_service"] == id(document_service)
+
+
+def test_collection_is_prepared_at_startup(
+    test_settings, mock_vector_db_service
+):
+    app = _make_app(test_settings)
+    mock_vector_db_service.ensure_collection_ready.reset_mock()
+
+    with TestClient(app):
+        mock_vector_db_service.ensure_collection_ready.assert_awaited_once()
+
+
+def test_services_are_closed_on_shutdown(
+    test_settings,
+    mock_llm_service,
+    mock_embeddings_service,
+    mock_vector_db_service,
+):
+    app = _make_app(test_settings)
+    mock_llm_service.aclose.reset_mock()
+    mock_embeddings_service.aclose.reset_mock()
+    mock_vector_db_service.aclose.reset_mock()
+
+    with TestClient(app):
+        pass
+
+    mock_llm_service.aclose.assert_awaited_once()
+    mock_embeddings_service.aclose.assert_awaited_once()
+    mock_vector_db_service.aclose.assert_awaited_once()
+    assert app.state.vector_db_service is None
+
+
+def test_overridden_services_take_precedence(
+    test_settings, mock_vector_db_service
+):
+    app = _make_app(test_settings)
+    override = object()
+    app.dependency_overrides[get_vector_db_service] = lambda: override
+
+    with TestClient(app) as test_client:
+        document_service = app.state.document_service
+        response = test_client.get("/services").json()
+
+    assert response["vector_db_service"] == id(override)
+    assert response["document_vector_db_service"] == id(override)
+    # Parses PDFs on the shared service's process pool
+    assert response["pdf_executor_owner"] == id(document_service)
+
+
+def test_document_service_is_closed_without_lifespan(
+    test_settings, mock_llm_service, mock_vector_db_service, mocker
+):
+    app = _make_app(test_settings)
+    app.dependency_overrides[get_llm_service] = lambda: mock_llm_service
+    app.dependency_overrides[get_vector_db_service] = (
+        lambda: mock_vector_db_service
+    )
+    aclose = mocker.patch.object(DocumentService, "aclose")
+
+    # Not entered, so the lifespan does not run
+    response = TestClient(app).get("/services")
+
+    assert response.status_code == 200
+    aclose.assert_awaited_once()
@@ -1,9 +1,16 @@
+import os
+import tempfile
+import time
 from unittest.mock import AsyncMock
 
 import pytest
-from fastapi import status
+from fastapi import HTTPException, Request, status
 
-from app.api.v1.endpoints.document import get_document_service
+from app.api.v1.endpoints.document import (
+    _receive_upload,
+    get_document_service,
+)
+from app.core.config import get_settings
 from app.main import app
 from app.services.document_service import DocumentService
 
@@ -19,7 +26,17 @@ def test_upload_document_endpoint(client, mock_document_service):
     file_content = b"Test file content"
     document_id = "test_document_id"
 
-    mock_document_service.upload_document.return_value = document_id
+    uploaded = {}
+
+    async def upload_document_from_path(filename, file_path):
+        with open(file_path, "rb") as f:
+            uploaded[filename] = f.read()
+        uploaded["path"] = file_path
+        return document_id
+
+    mock_document_service.upload_document_from_path.side_effect = (
+        upload_document_from_path
+    )
 
     # Override the get_document_service dependency
     app.dependency_overrides[get_document_service] = (
@@ -41,11 +58,150 @@ def test_upload_document_endpoint(client, mock_document_service):
         "tag": "document_tag",
         "page_count": 10,
     }
+    assert uploaded[file_name] == file_content
+    assert not os.path.exists(uploaded["path"])
 
     # Clean up dependency overrides
     app.dependency_overrides.clear()
 
 
+def test_upload_document_endpoint_rejects_large_files(
+    client, mock_document_service, test_settings
+):
+    app.dependency_overrides[get_document_service] = (
+        lambda: mock_document_service
+    )
+    app.dependency_overrides[get_settings] = lambda: test_settings.model_copy(
+        update={"max_upload_size": 16, "upload_chunk_size": 4}
+    )
+
+    response = client.post(
+        "/api/v1/document",
+        files={"file": ("large.txt", b"x" * 17)},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    mock_document_service.upload_document_from_path.assert_not_called()
+
+    app.dependency_overrides.clear()
+
+
+def _request(body_chunks, headers):
+    chunks = iter(body_chunks)
+    received = []
+
+    async def receive():
+        chunk = next(chunks, None)
+        received.append(chunk)
+        return {
+            "type": "http.request",
+            "body": chunk or b"",
+            "more_body": chunk is not None,
+        }
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+    }
+    return Request(scope, receive), received
+
+
+MULTIPART_HEADERS = {"content-type": "multipart/form-data; boundary=b"}
+FILE_PART = (
+    b"--b\r\n"
+    b'Content-Disposition: form-data; name="file"; filename="a.pdf"\r\n'
+    b"\r\n"
+)
+
+
+@pytest.mark.asyncio
+async def test_receive_upload_checks_content_length_first():
+    request, received = _request(
+        [b"x"], {**MULTIPART_HEADERS, "content-length": str(10**9)}
+    )
+
+    with pytest.raises(HTTPException) as error:
+        await _receive_upload(request, max_size=1024, chunk_size=4)
+
+    assert error.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert received == []
+
+
+@pytest.mark.asyncio
+async def test_receive_upload_stops_reading_past_the_limit():
+    head = (
+        b"--b\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="a.txt"\r\n'
+        b"\r\n"
+    )
+    request, received = _request([head] + [b"x" * 8] * 1000, MULTIPART_HEADERS)
+
+    with pytest.raises(HTTPException) as error:
+        await _receive_upload(request, max_size=16, chunk_size=4)
+
+    assert error.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert len(received) == 4
+
+
+@pytest.mark.asyncio
+async def test_receive_upload_writes_the_file_once():
+    body = (
+        b"--b\r\n"
+        b'Content-Disposition: form-data; name="note"\r\n\r\n'
+        b"ignored\r\n"
+        b"--b\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="a.pdf"\r\n'
+        b"Content-Type: application/pdf\r\n\r\n"
+        b"%PDF-1.4 content\r\n"
+        b"--b--\r\n"
+    )
+    request, _ = _request(
+        [body[i : i + 7] for i in range(0, len(body), 7)], MULTIPART_HEADERS
+    )
+
+    filename, path = await _receive_upload(request, max_size=64, chunk_size=4)
+    with open(path, "rb") as f:
+        content = f.read()
+    os.remove(path)
+
+    assert filename == "a.pdf"
+    assert path.endswith(".pdf")
+    assert content == b"%PDF-1.4 content"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    [
+        # Ends before the closing boundary
+        FILE_PART + b"%PDF-1.4 trunc",
+        # The file part is closed but not the body
+        FILE_PART + b"%PDF-1.4 content\r\n--b",
+        # Not a multipart body
+        b"garbage",
+    ],
+)
+async def test_receive_upload_rejects_incomplete_bodies(body, mocker):
+    temp_files = []
+    named_temporary_file = tempfile.NamedTemporaryFile
+
+    def record(**kwargs):
+        temp_files.append(named_temporary_file(**kwargs))
+        return temp_files[-1]
+
+    mocker.patch(
+        "app.api.v1.endpoints.document.tempfile.NamedTemporaryFile", record
+    )
+    request, _ = _request([body], MULTIPART_HEADERS)
+
+    with pytest.raises(HTTPException) as error:
+        await _receive_upload(request, max_size=64, chunk_size=4)
+
+    assert error.value.status_code == status.HTTP_400_BAD_REQUEST
+    assert not any(os.path.exists(f.name) for f in temp_files)
+
+
 def test_delete_document_endpoint(client, mock_document_service):
     # Given
     document_id = "test_document_id"
@@ -69,3 +225,39 @@ def test_delete_document_endpoint(client, mock_document_service):
 
     # Clean up dependency overrides
     app.dependency_overrides.clear()
+
+
+def test_ingestion_job_endpoints(client, mock_document_service):
+    async def ingest_document(file_path, on_progress):
+        on_progress("embedding", {"chunks_total": 2})
+        on_progress("upserting", {"chunks_embedded": 2})
+        on_progress("completed", {"chunks_upserted": 2})
+        return "test_document_id"
+
+    mock_document_service.ingest_document.side_effect = ingest_document
+    app.dependency_overrides[get_document_service] = (
+        lambda: mock_document_service
+    )
+
+    response = client.post(
+        "/api/v1/document/jobs",
+        files={"file": ("test_document.txt", b"Test file content")},
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.json()["id"]
+
+    for _ in range(100):
+        job = client.get(f"/api/v1/document/jobs/{job_id}").json()
+        if job["stage"] == "completed":
+            break
+        time.sleep(0.01)
+
+    assert job["stage"] == "completed"
+    assert job["document_id"] == "test_document_id"
+    assert job["chunks_upserted"] == 2
+
+    missing = client.get("/api/v1/document/jobs/missing")
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+    app.dependency_overrides.clear()
@@ -1,9 +1,18 @@
+import asyncio
+import json
+import time
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
 
+from app.api.v1.endpoints.query import _stream_batch, run_query_batch
+from app.core.dependencies import get_llm_service, get_vector_db_service
+from app.main import app
 from app.models.query_core import Chunk
-from app.schemas.query_api import QueryResult
+from app.schemas.query_api import QueryBatchRequestSchema, QueryResult
+from app.services.llm import cached_completion_service
+from app.services.llm.openai_llm_service import OpenAICompletionService
 
 
 @pytest.fixture(scope="session")
@@ -211,3 +220,349 @@ def test_run_query_with_entity_resolution(
         response.json()["answer"]["answer"]
         == "The disease is Multiple Sclerosis and another disease is Amyotrophic Lateral Sclerosis."
     )
+
+
+class SlowOpenAIHandler:
+    """OpenAI API stub that injects a fixed latency into every completion."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": json.loads(request.content)["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {
+                            "role": "assistant",
+                            "content": json.dumps({"answer": "Paris"}),
+                        },
+                    }
+                ],
+            },
+        )
+
+
+@pytest.mark.asyncio
+async def test_run_query_concurrent_requests_overlap(
+    test_settings, mock_vector_db_service
+):
+    delay, n_requests = 0.2, 10
+    handler = SlowOpenAIHandler(delay)
+
+    def http_client(limits):
+        return httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), limits=limits
+        )
+
+    with patch(
+        "app.services.llm.openai_llm_service.DefaultAsyncHttpxClient",
+        http_client,
+    ):
+        llm_service = OpenAICompletionService(
+            test_settings.model_copy(update={"openai_api_key": "test-key"})
+        )
+
+    app.dependency_overrides[get_llm_service] = lambda: llm_service
+    app.dependency_overrides[get_vector_db_service] = (
+        lambda: mock_vector_db_service
+    )
+
+    request_data = {
+        "document_id": "doc123",
+        "prompt": {
+            "id": "prompt123",
+            "query": "What is the capital of France?",
+            "type": "str",
+            "entity_type": "text",
+            "rules": [],
+        },
+    }
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as async_client:
+            # The OpenAI client's first request also sets it up
+            await async_client.post("/api/v1/query", json=request_data)
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(
+                    async_client.post("/api/v1/query", json=request_data)
+                    for _ in range(n_requests)
+                )
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        app.dependency_overrides.pop(get_llm_service, None)
+        app.dependency_overrides.pop(get_vector_db_service, None)
+        await llm_service.aclose()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(
+        response.json()["answer"]["answer"] == "Paris"
+        for response in responses
+    )
+    # Serial execution would take n_requests * delay
+    assert handler.max_in_flight > 1
+    assert elapsed < n_requests * delay / 2
+
+
+def _batch_cell(document_id, prompt_id, query="What is the capital?"):
+    return {
+        "document_id": document_id,
+        "prompt": {
+            "id": prompt_id,
+            "query": query,
+            "type": "str",
+            "entity_type": "text",
+            "rules": [],
+        },
+    }
+
+
+def test_run_query_batch_deduplicates_cells(
+    client, mock_vector_db_service, mock_query_response
+):
+    mock_vector_db_service.prefetch_vector_search.reset_mock()
+    request_data = {
+        "queries": [
+            _batch_cell("doc1", "prompt1"),
+            _batch_cell("doc2", "prompt1"),
+            _batch_cell("doc1", "prompt2"),
+            _batch_cell("doc1", "prompt3", query="Another question?"),
+        ]
+    }
+    async_mock = AsyncMock(return_value=mock_query_response)
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=async_mock,
+    ):
+        response = client.post("/api/v1/query/batch", json=request_data)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    # doc1/prompt1 and doc1/prompt2 ask the same question
+    assert async_mock.await_count == 3
+    assert [r["answer"]["document_id"] for r in results] == [
+        "doc1",
+        "doc2",
+        "doc1",
+        "doc1",
+    ]
+    assert [r["answer"]["prompt_id"] for r in results] == [
+        "prompt1",
+        "prompt1",
+        "prompt2",
+        "prompt3",
+    ]
+    assert len({r["answer"]["id"] for r in results}) == 4
+    assert all(r["error"] is None for r in results)
+    # The column asked of two documents is searched once
+    mock_vector_db_service.prefetch_vector_search.assert_called_once_with(
+        "What is the capital?", ["doc1", "doc2"]
+    )
+
+
+def test_run_query_batch_reports_failed_cells(client, mock_query_response):
+    async def query(query, document_id, *args):
+        if document_id == "bad":
+            raise RuntimeError("search failed")
+        return mock_query_response
+
+    request_data = {
+        "queries": [_batch_cell("bad", "prompt1"), _batch_cell("ok", "p1")]
+    }
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=AsyncMock(side_effect=query),
+    ):
+        response = client.post("/api/v1/query/batch", json=request_data)
+
+    assert response.status_code == 200
+    failed, answered = response.json()["results"]
+    assert failed["answer"]["answer"] is None
+    assert failed["chunks"] == []
+    assert failed["error"] == "Internal server error"
+    assert answered["answer"]["answer"] == mock_query_response.answer
+    assert answered["error"] is None
+
+
+def _delayed_query(mock_query_response, delays, started=None):
+    async def query(query, document_id, *args):
+        if started is not None:
+            started.append(document_id)
+        await asyncio.sleep(delays[document_id])
+        return mock_query_response
+
+    return AsyncMock(side_effect=query)
+
+
+def test_run_query_batch_stream_sends_cells_as_completed(
+    client, mock_query_response
+):
+    request_data = {
+        "queries": [
+            _batch_cell("slow", "prompt1"),
+            _batch_cell("fast", "prompt2"),
+        ]
+    }
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=_delayed_query(mock_query_response, {"slow": 0.1, "fast": 0}),
+    ):
+        response = client.post("/api/v1/query/batch/stream", json=request_data)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [
+        (e["index"], e["document_id"], e["prompt_id"]) for e in events
+    ] == [
+        (1, "fast", "prompt2"),
+        (0, "slow", "prompt1"),
+    ]
+    assert events[0]["answer"]["answer"] == mock_query_response.answer
+
+
+def test_run_query_batch_stream_server_sent_events(
+    client, mock_query_response
+):
+    request_data = {"queries": [_batch_cell("doc1", "prompt1")]}
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=AsyncMock(return_value=mock_query_response),
+    ):
+        response = client.post(
+            "/api/v1/query/batch/stream",
+            json=request_data,
+            headers={"Accept": "text/event-stream"},
+        )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("data: {")
+    assert response.text.endswith("\n\n")
+    event = json.loads(response.text[len("data: ") :])
+    assert event["prompt_id"] == "prompt1"
+
+
+@pytest.mark.asyncio
+async def test_run_query_batch_stream_cancels_on_disconnect(
+    mock_llm_service, mock_vector_db_service, mock_query_response
+):
+    started = []
+    queries = QueryBatchRequestSchema(
+        queries=[
+            _batch_cell("fast", "prompt1"),
+            _batch_cell("slow", "prompt2"),
+        ]
+    ).queries
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=_delayed_query(
+            mock_query_response, {"fast": 0, "slow": 10}, started
+        ),
+    ):
+        stream = _stream_batch(
+            queries,
+            mock_llm_service,
+            mock_vector_db_service,
+            asyncio.Semaphore(4),
+            event_stream=False,
+        )
+        first = await stream.__anext__()
+        # What the server does when the client disconnects
+        await stream.aclose()
+        await asyncio.sleep(0)
+
+    assert json.loads(first)["document_id"] == "fast"
+    assert started == ["fast", "slow"]
+    running = [
+        task
+        for task in asyncio.all_tasks()
+        if task is not asyncio.current_task() and not task.done()
+    ]
+    assert running == []
+
+
+@pytest.mark.asyncio
+async def test_run_query_batch_cancels_when_cancelled(
+    mock_llm_service, mock_vector_db_service, mock_query_response
+):
+    started = []
+    request = QueryBatchRequestSchema(
+        queries=[
+            _batch_cell("fast", "prompt1"),
+            _batch_cell("slow", "prompt2"),
+        ]
+    )
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=_delayed_query(
+            mock_query_response, {"fast": 0, "slow": 10}, started
+        ),
+    ):
+        batch = asyncio.create_task(
+            run_query_batch(
+                request,
+                mock_llm_service,
+                mock_vector_db_service,
+                asyncio.Semaphore(4),
+            )
+        )
+        while len(started) < 2:
+            await asyncio.sleep(0)
+        # What the server does when the client disconnects
+        batch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batch
+        await asyncio.sleep(0)
+
+    running = [
+        task
+        for task in asyncio.all_tasks()
+        if task is not asyncio.current_task() and not task.done()
+    ]
+    assert running == []
+
+
+def test_run_query_bypass_cache(client, mock_query_response):
+    bypassed = []
+
+    async def query(*args):
+        bypassed.append(cached_completion_service._bypass.get())
+        return mock_query_response
+
+    with patch(
+        "app.api.v1.endpoints.query.simple_vector_query",
+        new=AsyncMock(side_effect=query),
+    ):
+        for bypass_cache in (False, True):
+            request_data = _batch_cell("doc1", "prompt1")
+            request_data["bypass_cache"] = bypass_cache
+            response = client.post("/api/v1/query", json=request_data)
+            assert response.status_code == 200
+
+    assert bypassed == [False, True]
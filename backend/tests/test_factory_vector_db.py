@@ -27,6 +27,9 @@ class MockVectorDBService(VectorDBService):
     async def keyword_search(self, query, document_id, keywords):
         return VectorResponseSchema(message="success", chunks=[])
 
+    async def get_chunks(self, document_id, chunk_numbers):
+        return []
+
     async def hybrid_search(self, query, document_id, rules):
         return VectorResponseSchema(message="success", chunks=[])
 
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services.batch_memo import batch_memo, memoize
+
+
+@pytest.mark.asyncio
+async def test_memoize_shares_work_within_a_batch():
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    with batch_memo():
+        results = await asyncio.gather(
+            *(memoize("key", compute) for _ in range(3))
+        )
+
+    assert results == [1, 1, 1]
+    assert await memoize("key", compute) == 2
+
+
+@pytest.mark.asyncio
+async def test_memoize_cancels_work_once_every_query_is_cancelled():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def compute():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with batch_memo():
+        queries = [
+            asyncio.create_task(memoize("key", compute)) for _ in range(2)
+        ]
+    await started.wait()
+
+    queries[0].cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+
+    queries[1].cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    await asyncio.gather(*queries, return_exceptions=True)
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.services.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl=60, clock=clock)
+    cache.set("query", [0.1])
+
+    clock.now = 59
+    assert cache.get("query") == [0.1]
+    clock.now = 60
+    assert cache.get("query") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_computes_concurrent_lookups_once():
+    cache = TTLCache(max_size=10, ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("key", compute) for _ in range(5))
+    )
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert await cache.get_or_compute("key", compute) == "value"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_does_not_cache_failures():
+    cache = TTLCache(max_size=10)
+
+    async def fail():
+        raise RuntimeError("embedding failed")
+
+    async def compute():
+        return "value"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("key", fail)
+    assert await cache.get_or_compute("key", compute) == "value"
+
+
+@pytest.mark.asyncio
+async def test_ttl_cache_cancels_computation_without_waiters():
+    cache = TTLCache(max_size=10)
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def compute():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "value"
+
+    first = asyncio.create_task(cache.get_or_compute("key", compute))
+    second = asyncio.create_task(cache.get_or_compute("key", compute))
+    await started.wait()
+
+    # The other caller still waits for the value
+    first.cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+
+    second.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    async def value():
+        return "value"
+
+    # A later lookup computes the value again
+    assert await cache.get_or_compute("key", value) == "value"
@@ -2,6 +2,8 @@ from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from app.services.document_service import DocumentService
+
 
 @pytest.mark.asyncio
 async def test_upload_document(document_service, mocker):
@@ -24,6 +26,28 @@ async def test_upload_document(document_service, mocker):
     document_service.vector_db_service.upsert_vectors.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_upload_document_from_path(document_service, mocker, tmp_path):
+    file_path = tmp_path / "test.pdf"
+    file_path.write_bytes(b"test content")
+    mocker.patch.object(
+        document_service, "_generate_document_id", return_value="test_id"
+    )
+    mocker.patch.object(document_service, "_process_document", return_value=[])
+    document_service.vector_db_service.prepare_chunks = AsyncMock(
+        return_value=[]
+    )
+    document_service.vector_db_service.upsert_vectors = AsyncMock()
+
+    result = await document_service.upload_document_from_path(
+        "test.pdf", str(file_path)
+    )
+
+    assert result == "test_id"
+    document_service._process_document.assert_called_once_with(str(file_path))
+    assert file_path.exists()
+
+
 @pytest.mark.asyncio
 async def test_delete_document(document_service):
     document_service.vector_db_service.delete_document = AsyncMock(
@@ -96,3 +120,95 @@ async def test_process_document_unstructured_not_available(
         match="No loader available for configured loader type: test_loader",
     ):
         await document_service._process_document("test_file_path")
+
+
+@pytest.mark.asyncio
+async def test_pdf_executor_is_created_when_configured(
+    mock_vector_db_service, mock_llm_service, test_settings
+):
+    service = DocumentService(
+        mock_vector_db_service, mock_llm_service, test_settings
+    )
+    assert service._get_pdf_executor() is None
+
+    service = DocumentService(
+        mock_vector_db_service,
+        mock_llm_service,
+        test_settings.model_copy(update={"pdf_parse_workers": 2}),
+    )
+    executor = service._get_pdf_executor()
+
+    assert executor is not None
+    assert service._get_pdf_executor() is executor
+
+    await service.aclose()
+    assert service._pdf_executor is None
+
+
+@pytest.mark.asyncio
+async def test_ingest_document_pipeline(
+    mock_vector_db_service, mock_llm_service, test_settings, mocker, tmp_path
+):
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("word " * 400)
+    service = DocumentService(
+        mock_vector_db_service,
+        mock_llm_service,
+        test_settings.model_copy(
+            update={
+                "loader": "pypdf",
+                "chunk_size": 100,
+                "chunk_overlap": 0,
+                "ingestion_pipeline": True,
+                "ingestion_batch_size": 5,
+            }
+        ),
+    )
+    mocker.patch.object(service, "_generate_document_id", return_value="id")
+    prepare_chunks = AsyncMock(
+        side_effect=lambda document_id, chunks, start_index: [
+            {
+                "chunk_number": start_index + i,
+                "document_id": document_id,
+                "page_number": 1,
+                "text": chunk.page_content,
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+    )
+    upsert_vectors = AsyncMock()
+    mocker.patch.object(
+        mock_vector_db_service, "prepare_chunks", prepare_chunks
+    )
+    mocker.patch.object(
+        mock_vector_db_service, "upsert_vectors", upsert_vectors
+    )
+    progress = []
+
+    result = await service.ingest_document(
+        str(file_path), lambda stage, counts: progress.append(stage)
+    )
+
+    assert result == "id"
+    upserted = [
+        vector["chunk_number"]
+        for call in upsert_vectors.call_args_list
+        for vector in call.args[0]
+    ]
+    assert upserted == list(range(len(upserted)))
+    assert len(upsert_vectors.call_args_list) > 1
+    assert progress[0] == "loading"
+    assert progress[-1] == "completed"
+
+    # Every upserted chunk is in the keyword index
+    indexed = await mock_vector_db_service.keyword_index.search(
+        "id", ["word"], limit=len(upserted) + 1
+    )
+    await service.delete_document("id")
+    assert len(indexed) == len(upserted)
+    assert (
+        await mock_vector_db_service.keyword_index.search(
+            "id", ["word"], limit=1
+        )
+        is None
+    )
@@ -0,0 +1,114 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.embedding.base import EmbeddingService
+from app.services.embedding.cached_embedding_service import (
+    CachedEmbeddingService,
+    EmbeddingStore,
+)
+
+
+def _embedding_service():
+    service = AsyncMock(spec=EmbeddingService)
+
+    async def get_embeddings(texts):
+        return [[float(len(text)), 0.5] for text in texts]
+
+    service.get_embeddings.side_effect = get_embeddings
+    return service
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "embeddings.db"))
+    yield store
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_only_embed_new_texts(test_settings, store):
+    inner = _embedding_service()
+    service = CachedEmbeddingService(inner, test_settings, store=store)
+
+    first = await service.get_embeddings(["a", "bb", "a"])
+    second = await service.get_embeddings(["bb", "ccc"])
+
+    assert first == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert second == [[2.0, 0.5], [3.0, 0.5]]
+    assert [call.args[0] for call in inner.get_embeddings.await_args_list] == [
+        ["a", "bb"],
+        ["ccc"],
+    ]
+    stats = await service.stats()
+    assert stats["misses"] == 3
+    assert stats["hits"] == 2
+    assert stats["disk_entries"] == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_persist_on_disk(test_settings, store):
+    await CachedEmbeddingService(
+        _embedding_service(), test_settings, store=store
+    ).get_embeddings(["text"])
+
+    inner = _embedding_service()
+    service = CachedEmbeddingService(inner, test_settings, store=store)
+    assert await service.get_embeddings(["text"]) == [[4.0, 0.5]]
+
+    inner.get_embeddings.assert_not_awaited()
+    assert (await service.stats())["disk_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_are_keyed_by_model(test_settings, store):
+    await CachedEmbeddingService(
+        _embedding_service(), test_settings, store=store
+    ).get_embeddings(["text"])
+
+    inner = _embedding_service()
+    other_model = test_settings.model_copy(
+        update={"embedding_model": "other_model"}
+    )
+    await CachedEmbeddingService(
+        inner, other_model, store=store
+    ).get_embeddings(["text"])
+
+    inner.get_embeddings.assert_awaited_once_with(["text"])
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_evict_least_recently_used(test_settings):
+    inner = _embedding_service()
+    service = CachedEmbeddingService(inner, test_settings, memory_size=2)
+
+    await service.get_embeddings(["a", "bb"])
+    await service.get_embeddings(["a"])
+    await service.get_embeddings(["ccc"])
+    await service.get_embeddings(["a"])
+
+    stats = await service.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_entries"] == 2
+    assert inner.get_embeddings.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_stats_are_served(test_settings):
+    service = CachedEmbeddingService(_embedding_service(), test_settings)
+    await service.get_embeddings(["a", "bb"])
+    await service.get_embeddings(["a"])
+
+    app.state.embedding_service = service
+    try:
+        response = TestClient(app).get("/stats")
+    finally:
+        app.state.embedding_service = None
+
+    assert response.status_code == 200
+    stats = response.json()["embedding_cache"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["memory_entries"] == 2
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.embedding.batching import pack_batches
+from app.services.embedding.openai_embedding_service import (
+    OpenAIEmbeddingService,
+)
+
+
+@pytest.fixture
+def embedding_service(test_settings):
+    settings = test_settings.model_copy(
+        update={
+            "openai_api_key": "test-key",
+            "embedding_batch_size": 3,
+            "embedding_batch_max_tokens": 100,
+            "embedding_max_concurrency": 2,
+        }
+    )
+    return OpenAIEmbeddingService(settings)
+
+
+def test_pack_batches_respects_item_limit():
+    texts = [f"text {i}" for i in range(7)]
+
+    batches = pack_batches(
+        texts, max_tokens=1000, max_items=3, count_tokens=lambda _: 1
+    )
+
+    assert batches == [(0, 3), (3, 6), (6, 7)]
+
+
+def test_pack_batches_respects_token_limit():
+    texts = ["a", "b", "c", "d"]
+    tokens = {"a": 6, "b": 5, "c": 20, "d": 1}
+
+    batches = pack_batches(
+        texts, max_tokens=10, max_items=100, count_tokens=tokens.__getitem__
+    )
+
+    # An oversized text is placed in a batch on its own
+    assert batches == [(0, 1), (1, 2), (2, 3), (3, 4)]
+
+
+def test_pack_batches_empty():
+    assert pack_batches([], max_tokens=10, max_items=10) == []
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_batches_concurrently_in_order(
+    embedding_service,
+):
+    texts = [f"text {i}" for i in range(10)]
+    state = {"calls": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def mock_create(input, model):
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(
+            state["max_in_flight"], state["in_flight"]
+        )
+        # Finish later batches first to check that order is restored
+        await asyncio.sleep(0.01 * (10 - int(input[0].split()[1])) / 10)
+        state["in_flight"] -= 1
+
+        response = MagicMock()
+        response.data = [
+            MagicMock(index=i, embedding=[float(text.split()[1])])
+            for i, text in reversed(list(enumerate(input)))
+        ]
+        return response
+
+    embedding_service.client.embeddings.create = mock_create
+
+    result = await embedding_service.get_embeddings(texts)
+    await embedding_service.aclose()
+
+    assert result == [[float(i)] for i in range(10)]
+    assert state["calls"] == 4
+    assert state["max_in_flight"] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_empty(embedding_service):
+    assert await embedding_service.get_embeddings([]) == []
+    await embedding_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_counts_tokens_off_the_event_loop(
+    embedding_service,
+):
+    threads = set()
+
+    def count_tokens(text):
+        threads.add(threading.current_thread())
+        return 1
+
+    async def mock_create(input, model):
+        return MagicMock(
+            data=[
+                MagicMock(index=i, embedding=[0.0]) for i in range(len(input))
+            ]
+        )
+
+    embedding_service._count_tokens = count_tokens
+    embedding_service.client.embeddings.create = mock_create
+
+    await embedding_service.get_embeddings(["a", "b"])
+    await embedding_service.aclose()
+
+    assert threads and threading.main_thread() not in threads
+
+
+def test_count_tokens_falls_back_without_tokenizer(embedding_service):
+    # "test_embedding_model" is unknown to tiktoken
+    assert embedding_service.count_tokens("abcdef") == 2
@@ -157,15 +157,12 @@ def test_generate_chunks_for_triple(sample_table_data):
 
 
 @pytest.mark.asyncio
-@patch("app.services.graph_service.get_llm_service")
 @patch("app.services.graph_service.generate_schema")
 async def test_process_table_and_generate_triples(
     mock_generate_schema,
-    mock_get_llm_service,
     sample_table_data,
     mock_llm_service,
 ):
-    mock_get_llm_service.return_value = mock_llm_service
     mock_generate_schema.return_value = {
         "schema": {
             "relationships": [
@@ -178,19 +175,20 @@ async def test_process_table_and_generate_triples(
         }
     }
 
-    result = await process_table_and_generate_triples(sample_table_data)
+    result = await process_table_and_generate_triples(
+        sample_table_data, mock_llm_service
+    )
+    mock_generate_schema.assert_called_once_with(
+        mock_llm_service, sample_table_data
+    )
     assert isinstance(result, ExportTriplesResponseSchema)
     assert len(result.triples) == 1
     assert len(result.chunks) == 2
 
 
 @pytest.mark.asyncio
-@patch("app.services.graph_service.get_llm_service")
-async def test_process_table_and_generate_triples_error(
-    mock_get_llm_service, sample_table_data
-):
-    mock_get_llm_service.return_value = None
-    result = await process_table_and_generate_triples(sample_table_data)
+async def test_process_table_and_generate_triples_error(sample_table_data):
+    result = await process_table_and_generate_triples(sample_table_data, None)
     assert isinstance(result, ExportTriplesResponseSchema)
     assert len(result.triples) == 0
     assert len(result.chunks) == 0
@@ -0,0 +1,132 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.document_service import DocumentService
+from app.services.ingestion_job_service import IngestionJobService
+
+
+def _document_service(ingest_document):
+    service = AsyncMock(spec=DocumentService)
+    service.ingest_document.side_effect = ingest_document
+    return service
+
+
+async def _wait_for(service, job_id, stage):
+    for _ in range(200):
+        if service.get_job(job_id).stage == stage:
+            return service.get_job(job_id)
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"Job {job_id} did not reach {stage}")
+
+
+@pytest.fixture
+def job_settings(test_settings):
+    return test_settings.model_copy(
+        update={"ingestion_max_workers": 2, "ingestion_max_pending_jobs": 3}
+    )
+
+
+@pytest.mark.asyncio
+async def test_ingestion_job_reports_progress(job_settings, tmp_path):
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("test")
+
+    async def ingest_document(path, on_progress):
+        on_progress("loading", {})
+        on_progress("embedding", {"chunks_total": 3})
+        on_progress("upserting", {"chunks_embedded": 3})
+        on_progress("completed", {"chunks_upserted": 3})
+        return "test_id"
+
+    service = IngestionJobService(job_settings)
+    job = service.submit(
+        "test.txt", str(file_path), _document_service(ingest_document)
+    )
+    job = await _wait_for(service, job.id, "completed")
+    await service.aclose()
+
+    assert job.document_id == "test_id"
+    assert job.chunks_total == 3
+    assert job.chunks_embedded == 3
+    assert job.chunks_upserted == 3
+    assert not file_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_ingestion_job_records_failure(job_settings, tmp_path):
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("test")
+
+    async def ingest_document(path, on_progress):
+        on_progress("loading", {})
+        raise ValueError("Unsupported file type")
+
+    service = IngestionJobService(job_settings)
+    job = service.submit(
+        "test.txt", str(file_path), _document_service(ingest_document)
+    )
+    job = await _wait_for(service, job.id, "failed")
+    await service.aclose()
+
+    assert job.error == "Unsupported file type"
+    assert not file_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_ingestion_jobs_are_bounded(job_settings, tmp_path):
+    running = 0
+    max_running = 0
+    release = asyncio.Event()
+
+    async def ingest_document(path, on_progress):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await release.wait()
+        running -= 1
+        return "test_id"
+
+    service = IngestionJobService(job_settings)
+    document_service = _document_service(ingest_document)
+    jobs = []
+    for i in range(5):
+        file_path = tmp_path / f"test_{i}.txt"
+        file_path.write_text("test")
+        jobs.append(
+            service.submit(file_path.name, str(file_path), document_service)
+        )
+        await asyncio.sleep(0)
+
+    # Two jobs are running and three are waiting, the queue is full
+    with pytest.raises(asyncio.QueueFull):
+        service.submit(
+            "extra.txt", str(tmp_path / "extra.txt"), document_service
+        )
+
+    release.set()
+    for job in jobs:
+        await _wait_for(service, job.id, "completed")
+    await service.aclose()
+
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_ingestion_jobs_fail_on_shutdown(job_settings, tmp_path):
+    file_path = tmp_path / "test.txt"
+    file_path.write_text("test")
+
+    async def ingest_document(path, on_progress):
+        await asyncio.Event().wait()
+
+    service = IngestionJobService(job_settings)
+    job = service.submit(
+        "test.txt", str(file_path), _document_service(ingest_document)
+    )
+    await asyncio.sleep(0.01)
+    await service.aclose()
+
+    assert service.get_job(job.id).stage == "failed"
+    assert not file_path.exists()
@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.services.ingestion_pipeline import IngestionPipeline
+from app.services.loaders.base import LoaderService
+from app.services.vector_db.base import VectorDBService
+
+
+class PagedLoader(LoaderService):
+    """Loader yielding batches of pages, recording when it is done."""
+
+    def __init__(self, batches, events):
+        self.batches = batches
+        self.events = events
+
+    async def load(self, file_path):
+        return [page for batch in self.batches for page in batch]
+
+    async def lazy_load(self, file_path):
+        for i, batch in enumerate(self.batches):
+            await asyncio.sleep(0.001)
+            self.events.append(f"load {i}")
+            yield batch
+        self.events.append("load done")
+
+
+def _vector_db_service(events, upserted):
+    service = AsyncMock(spec=VectorDBService)
+
+    async def prepare_chunks(document_id, chunks, start_index=0):
+        events.append("embed")
+        return [
+            {"chunk_number": start_index + i, "text": chunk.page_content}
+            for i, chunk in enumerate(chunks)
+        ]
+
+    async def upsert_vectors(vectors):
+        upserted.append(vectors)
+        return {"message": "ok"}
+
+    service.prepare_chunks.side_effect = prepare_chunks
+    service.upsert_vectors.side_effect = upsert_vectors
+    return service
+
+
+def _pages(count, start=0):
+    return [
+        Document(page_content=f"page {i} " * 10, metadata={"page": i})
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_loading_and_embedding():
+    events, upserted, progress = [], [], []
+    batches = [_pages(2, start) for start in range(0, 10, 2)]
+    pipeline = IngestionPipeline(
+        PagedLoader(batches, events),
+        RecursiveCharacterTextSplitter(chunk_size=50, chunk_overlap=0),
+        _vector_db_service(events, upserted),
+        batch_size=3,
+        queue_size=1,
+        on_progress=lambda stage, counts: progress.append((stage, counts)),
+    )
+
+    total = await pipeline.run("doc", "test.pdf")
+
+    chunk_numbers = [v["chunk_number"] for batch in upserted for v in batch]
+    assert chunk_numbers == list(range(total))
+    assert all(len(batch) <= 3 for batch in upserted)
+    assert events.index("embed") < events.index("load done")
+    assert progress[-1] == ("completed", {})
+    assert pipeline.chunks_total == pipeline.chunks_embedded == total
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stops_on_failure():
+    events, upserted = [], []
+    service = _vector_db_service(events, upserted)
+    service.upsert_vectors.side_effect = RuntimeError("upsert failed")
+    batches = [_pages(1, start) for start in range(50)]
+    pipeline = IngestionPipeline(
+        PagedLoader(batches, events),
+        RecursiveCharacterTextSplitter(chunk_size=50, chunk_overlap=0),
+        service,
+        batch_size=2,
+        queue_size=1,
+    )
+
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        await pipeline.run("doc", "test.pdf")
+
+    assert "load done" not in events
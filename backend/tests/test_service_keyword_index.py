@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.vector_db.keyword_index import KeywordIndex
+
+
+def _chunk(document_id, chunk_number, text, page_number=1):
+    return {
+        "id": str(chunk_number),
+        "vector": [0.1],
+        "document_id": document_id,
+        "chunk_number": chunk_number,
+        "page_number": page_number,
+        "text": text,
+    }
+
+
+CHUNKS = [
+    _chunk("doc", 0, "Paris is the capital of France."),
+    _chunk("doc", 1, "The capital city of France is Paris, paris!", 2),
+    _chunk("doc", 2, "Berlin is a city in Germany."),
+    _chunk("other", 0, "Paris, Texas"),
+]
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_chunks_by_keyword_occurrences():
+    index = KeywordIndex()
+    await index.add_chunks(CHUNKS)
+
+    results = await index.search("doc", ["paris", "Germany"], limit=10)
+
+    assert results == [1, 0, 2]
+    assert await index.search("doc", ["paris"], limit=1) == [1]
+    assert await index.search("doc", ["London"], limit=10) == []
+    assert await index.search("missing", ["paris"], limit=10) is None
+
+
+@pytest.mark.asyncio
+async def test_search_matches_words_starting_with_the_keywords():
+    index = KeywordIndex()
+    await index.add_chunks(
+        CHUNKS + [_chunk("doc", 3, "Payment is due. PAYMENTS are late.")]
+    )
+
+    async def matches(keyword):
+        return await index.search("doc", [keyword], limit=10)
+
+    # Ignoring case, words starting with the keyword
+    assert await matches("pay") == [3]
+    assert await matches("CAPITAL") == [0, 1]
+    assert await matches("ment") == []
+    # Keywords of several words need all of them, in any order
+    assert await matches("capital city") == [1]
+    assert await matches("city capital") == [1]
+    assert await matches("capital germany") == []
+    # Counted as often as their least frequent word: chunk 1 has "paris"
+    # twice but "is" once, so it ties with chunk 0
+    assert await matches("is paris") == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_index_is_persisted(tmp_path):
+    path = str(tmp_path / "keyword_index.db")
+    index = KeywordIndex(path)
+    await index.add_chunks(CHUNKS[:2])
+    # Loads the index, which the next chunks invalidate
+    assert len(await index.search("doc", ["paris"], limit=10)) == 2
+    await index.add_chunks(CHUNKS[2:])
+    await index.remove("other")
+    await index.aclose()
+
+    index = KeywordIndex(path, cache_size=1)
+    results = await index.search("doc", ["paris", "berlin"], limit=10)
+    removed = await index.search("other", ["paris"], limit=10)
+    await index.aclose()
+
+    assert results == [1, 0, 2]
+    assert removed is None
@@ -0,0 +1,26 @@
+from app.services.vector_db.keyword_scoring import KeywordScorer
+
+
+def test_score_counts_keywords_case_insensitively():
+    scorer = KeywordScorer(["Paris", "capital city", ""])
+
+    assert scorer.score("PARIS, paris and the Capital City") == 3
+    assert scorer.score("Berlin") == 0
+
+
+def test_rank_sorts_chunks_by_score():
+    chunks = [
+        {"text": "Berlin", "chunk_number": 0},
+        {"text": "Paris paris", "chunk_number": 1},
+        {"text": "Paris", "chunk_number": 2},
+        {"text": "Lyon", "chunk_number": 3},
+        {"text": "paris", "chunk_number": 4},
+    ]
+    scorer = KeywordScorer(["paris"])
+
+    ranked = [chunk["chunk_number"] for chunk in scorer.rank(chunks)]
+    top = [chunk["chunk_number"] for chunk in scorer.rank(chunks, limit=2)]
+
+    # Ties keep their order, as with sorted
+    assert ranked == [1, 2, 4, 0, 3]
+    assert top == [1, 2]
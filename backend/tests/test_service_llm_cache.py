@@ -0,0 +1,107 @@
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from app.models.llm_responses import BoolResponseModel, StrResponseModel
+from app.services.cache import MemoryCacheBackend, SQLiteCacheBackend
+from app.services.llm.base import CompletionService
+from app.services.llm.cached_completion_service import (
+    CachedCompletionService,
+    bypass_answer_cache,
+)
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite"])
+async def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryCacheBackend(max_size=10, ttl=60)
+    else:
+        backend = SQLiteCacheBackend(
+            str(tmp_path / "answers.db"), max_size=10, ttl=60
+        )
+    yield backend
+    await backend.aclose()
+
+
+def _completion_service(answer="Paris"):
+    service = AsyncMock(spec=CompletionService)
+    service.generate_completion.return_value = StrResponseModel(answer=answer)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_cached_completion_reuses_answers(backend):
+    inner = _completion_service()
+    service = CachedCompletionService(inner, backend, "gpt-4o")
+
+    first = await service.generate_completion("prompt", StrResponseModel)
+    second = await service.generate_completion("prompt", StrResponseModel)
+
+    assert first == second == StrResponseModel(answer="Paris")
+    inner.generate_completion.assert_awaited_once()
+    assert (await backend.stats())["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_completion_keys_on_prompt_and_format(backend):
+    inner = _completion_service()
+    inner.generate_completion.side_effect = [
+        StrResponseModel(answer="Paris"),
+        StrResponseModel(answer="Berlin"),
+        BoolResponseModel(answer=True),
+    ]
+    service = CachedCompletionService(inner, backend, "gpt-4o")
+
+    await service.generate_completion("prompt", StrResponseModel)
+    await service.generate_completion("other prompt", StrResponseModel)
+    await service.generate_completion("prompt", BoolResponseModel)
+
+    assert inner.generate_completion.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_completion_bypass_refreshes_answer(backend):
+    inner = _completion_service()
+    service = CachedCompletionService(inner, backend, "gpt-4o")
+    await service.generate_completion("prompt", StrResponseModel)
+
+    inner.generate_completion.return_value = StrResponseModel(answer="Lyon")
+    with bypass_answer_cache():
+        refreshed = await service.generate_completion(
+            "prompt", StrResponseModel
+        )
+    cached = await service.generate_completion("prompt", StrResponseModel)
+
+    assert refreshed == cached == StrResponseModel(answer="Lyon")
+    assert inner.generate_completion.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_completion_skips_missing_answers(backend):
+    inner = _completion_service()
+    inner.generate_completion.return_value = None
+    service = CachedCompletionService(inner, backend, "gpt-4o")
+
+    await service.generate_completion("prompt", StrResponseModel)
+    await service.generate_completion("prompt", StrResponseModel)
+
+    assert inner.generate_completion.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_backend_limits_size_and_age(tmp_path):
+    path = str(tmp_path / "answers.db")
+    backend = SQLiteCacheBackend(path, max_size=2, ttl=None)
+    for key in ("a", "b", "c"):
+        await backend.set(key, key)
+
+    assert await backend.get("a") is None
+    assert await backend.get("c") == "c"
+    assert (await backend.stats())["entries"] == 2
+    await backend.aclose()
+
+    expired = SQLiteCacheBackend(path, max_size=2, ttl=-1)
+    await expired.set("d", "d")
+    assert await expired.get("d") is None
+    await expired.aclose()
@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -69,3 +70,41 @@ async def test_decompose_query(openai_service):
     result = await openai_service.decompose_query(test_query)
 
     assert result == {"sub_queries": [test_query]}
+
+
+@pytest.mark.asyncio
+async def test_generate_completion_respects_concurrency_limit(test_settings):
+    class DummyResponseModel(BaseModel):
+        content: str
+
+    settings = test_settings.model_copy(
+        update={"openai_api_key": "test-key", "llm_max_concurrency": 2}
+    )
+    service = OpenAICompletionService(settings)
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    async def mock_parse(*args, **kwargs):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(
+            state["max_in_flight"], state["in_flight"]
+        )
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        mock_response = MagicMock()
+        mock_response.choices[0].message.parsed = DummyResponseModel(
+            content="Test response"
+        )
+        return mock_response
+
+    service.client.beta.chat.completions.parse = mock_parse
+
+    results = await asyncio.gather(
+        *(
+            service.generate_completion("prompt", DummyResponseModel)
+            for _ in range(6)
+        )
+    )
+    await service.aclose()
+
+    assert all(result.content == "Test response" for result in results)
+    assert state["max_in_flight"] == 2
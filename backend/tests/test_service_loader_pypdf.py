@@ -0,0 +1,96 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.services.loaders.pypdf_service import PDFLoader
+
+
+def _write_pdf(path, texts):
+    """Write a PDF with one line of text on each page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # The page tree, written once the pages are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects),)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(kids),
+        len(kids),
+    )
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    path.write_bytes(pdf)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "test.pdf"
+    _write_pdf(path, [f"Page number {i}" for i in range(7)])
+    return path
+
+
+@pytest.mark.asyncio
+async def test_pdf_loader_extracts_pages_in_parallel(pdf_path):
+    sequential = await PDFLoader().load(str(pdf_path))
+
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        parallel = await PDFLoader(executor, pages_per_task=3).load(
+            str(pdf_path)
+        )
+
+    assert [doc.page_content for doc in parallel] == [
+        f"Page number {i}" for i in range(7)
+    ]
+    assert [doc.page_content for doc in parallel] == [
+        doc.page_content for doc in sequential
+    ]
+    for parallel_doc, sequential_doc in zip(parallel, sequential):
+        assert parallel_doc.metadata["page"] == sequential_doc.metadata["page"]
+        assert (
+            parallel_doc.metadata["page_label"]
+            == sequential_doc.metadata["page_label"]
+        )
+
+
+@pytest.mark.asyncio
+async def test_pdf_loader_rejects_unsupported_files(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        await PDFLoader().load(str(tmp_path / "test.docx"))
+
+
+@pytest.mark.asyncio
+async def test_pdf_loader_streams_page_batches(pdf_path):
+    batches = [
+        batch
+        async for batch in PDFLoader(pages_per_task=3).lazy_load(str(pdf_path))
+    ]
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [doc.metadata["page"] for batch in batches for doc in batch] == (
+        list(range(7))
+    )
@@ -1,9 +1,21 @@
-from unittest.mock import Mock
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from pymilvus import DataType
 
 from app.schemas.query_api import VectorResponseSchema
 from app.services.vector_db.base import VectorDBService
+from app.services.vector_db.chunk_counts import ChunkCountRegistry
+from app.services.vector_db.milvus_executor import MilvusExecutor
+from app.services.vector_db.milvus_migration import migrate_collection
+from app.services.vector_db.milvus_service import (
+    MilvusService,
+    build_collection_schema,
+    needs_migration,
+)
 
 
 class MockVectorDBService(VectorDBService):
@@ -44,6 +56,9 @@ class MockVectorDBService(VectorDBService):
     async def keyword_search(self, query, document_id, keywords):
         return VectorResponseSchema(message="success", chunks=[])
 
+    async def get_chunks(self, document_id, chunk_numbers):
+        return []
+
     async def hybrid_search(self, query, document_id, rules):
         # Mock using get_single_embedding
         _ = await self.get_single_embedding(query)
@@ -79,6 +94,23 @@ async def test_ensure_collection_exists(vector_db_service):
     assert vector_db_service.client.has_collection.called
 
 
+@pytest.mark.asyncio
+async def test_ensure_collection_ready_checks_once(vector_db_service):
+    vector_db_service.client.has_collection.reset_mock()
+
+    await asyncio.gather(
+        *(vector_db_service.ensure_collection_ready() for _ in range(5))
+    )
+    await vector_db_service.ensure_collection_ready()
+
+    assert vector_db_service.client.has_collection.call_count == 1
+
+    vector_db_service.invalidate_collection_cache()
+    await vector_db_service.ensure_collection_ready()
+
+    assert vector_db_service.client.has_collection.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_upsert_vectors(vector_db_service):
     vectors = [
@@ -136,3 +168,487 @@ async def test_get_single_embedding(vector_db_service):
     vector_db_service.embedding_service.get_embeddings.assert_called_once_with(
         ["test text"]
     )
+
+
+class SlowMilvusClient:
+    """Blocking client recording how many calls run at the same time."""
+
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.closed = False
+
+    def search(self, **kwargs):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.active -= 1
+        return [[{"entity": kwargs}]]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_milvus_executor_bounds_concurrency_and_pools_clients():
+    SlowMilvusClient.active = SlowMilvusClient.max_active = 0
+    clients = []
+
+    def factory():
+        clients.append(SlowMilvusClient())
+        return clients[-1]
+
+    executor = MilvusExecutor(factory, max_workers=4, pool_size=2)
+
+    results = await asyncio.gather(
+        *(executor.run("search", data=i) for i in range(10))
+    )
+
+    assert [result[0][0]["entity"]["data"] for result in results] == list(
+        range(10)
+    )
+    assert SlowMilvusClient.max_active <= 2
+    assert len(clients) == 2
+
+    stats = executor.stats()
+    assert stats["completed"] == 10
+    assert stats["queued"] == 0
+    assert stats["active"] == 0
+    assert 0 < stats["max_queued"] <= 10
+
+    executor.close()
+    assert all(client.closed for client in clients)
+
+
+@pytest.mark.asyncio
+async def test_milvus_executor_does_not_block_event_loop():
+    executor = MilvusExecutor(SlowMilvusClient, max_workers=2, pool_size=2)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        for _ in range(5):
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    await asyncio.gather(executor.run("search"), tick())
+
+    assert ticks == 5
+    executor.close()
+
+
+@pytest.mark.asyncio
+async def test_milvus_executor_releases_client_on_error():
+    client = Mock()
+    client.search.side_effect = RuntimeError("boom")
+    executor = MilvusExecutor(lambda: client, max_workers=1, pool_size=1)
+
+    with pytest.raises(RuntimeError):
+        await executor.run("search")
+
+    client.search.side_effect = None
+    client.search.return_value = []
+    assert await executor.run("search") == []
+    assert executor.stats()["clients"] == 1
+    executor.close()
+
+
+class BlockingMilvusClient:
+    """Client whose searches wait for a release."""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def search(self, **kwargs):
+        self.started.release()
+        self.release.wait(5)
+        return []
+
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_milvus_executor_counts_calls_waiting_for_a_client():
+    client = BlockingMilvusClient()
+    executor = MilvusExecutor(lambda: client, max_workers=4, pool_size=1)
+
+    calls = [asyncio.create_task(executor.run("search")) for _ in range(3)]
+    await asyncio.to_thread(client.started.acquire)
+    stats = executor.stats()
+    client.release.set()
+    await asyncio.gather(*calls)
+    executor.close()
+
+    assert stats["active"] == 1
+    assert stats["queued"] == 2
+
+
+@pytest.mark.asyncio
+async def test_milvus_executor_forgets_cancelled_queued_calls():
+    client = BlockingMilvusClient()
+    executor = MilvusExecutor(lambda: client, max_workers=1, pool_size=1)
+
+    running = asyncio.create_task(executor.run("search"))
+    await asyncio.to_thread(client.started.acquire)
+    queued = [asyncio.create_task(executor.run("search")) for _ in range(4)]
+    await asyncio.sleep(0)
+    assert executor.stats()["queued"] == 4
+
+    for call in queued:
+        call.cancel()
+    await asyncio.gather(*queued, return_exceptions=True)
+    client.release.set()
+    await running
+    executor.close()
+
+    assert executor.stats()["queued"] == 0
+    assert executor.stats()["active"] == 0
+
+
+@pytest.fixture
+def milvus_service(mock_embeddings_service, mock_llm_service, test_settings):
+    client = Mock()
+    client.has_collection.return_value = True
+    client.describe_collection.return_value = {
+        "fields": [{"name": "document_id", "is_partition_key": True}]
+    }
+    with patch.object(MilvusService, "_create_client", return_value=client):
+        service = MilvusService(
+            mock_embeddings_service, mock_llm_service, test_settings
+        )
+    yield service
+    service.executor.close()
+
+
+@pytest.mark.asyncio
+async def test_multi_document_search_groups_by_document(milvus_service):
+    client = milvus_service.executor._client_factory()
+    client.search.return_value = [
+        [
+            {
+                "entity": {
+                    "text": f"{document_id} chunk {chunk_number}",
+                    "page_number": 1,
+                    "chunk_number": chunk_number,
+                    "document_id": document_id,
+                }
+            }
+            for document_id in ("doc1", "doc2")
+            for chunk_number in (0, 1)
+        ]
+    ]
+
+    results = await milvus_service.multi_document_search(
+        "query", ["doc1", "doc2", "doc3"], limit=2
+    )
+
+    client.search.assert_called_once()
+    kwargs = client.search.call_args.kwargs
+    assert kwargs["filter"] == 'document_id in ["doc1", "doc2", "doc3"]'
+    assert kwargs["group_by_field"] == "document_id"
+    assert kwargs["group_size"] == 2
+    assert [chunk.content for chunk in results["doc2"].chunks] == [
+        "doc2 chunk 0",
+        "doc2 chunk 1",
+    ]
+    assert results["doc3"].chunks == []
+
+
+@pytest.mark.asyncio
+async def test_vector_search_sends_all_queries_at_once(milvus_service):
+    client = milvus_service.executor._client_factory()
+    entity = {
+        "text": "chunk",
+        "page_number": 1,
+        "chunk_number": 0,
+        "document_id": "doc",
+    }
+    client.search.return_value = [[{"entity": entity}], [{"entity": entity}]]
+    get_embeddings = milvus_service.embedding_service.get_embeddings
+    get_embeddings.side_effect = lambda texts: [[0.1, 0.2, 0.3] for _ in texts]
+
+    try:
+        result = await milvus_service.vector_search(["q1", "q2"], "doc")
+    finally:
+        get_embeddings.side_effect = None
+
+    client.search.assert_called_once()
+    assert len(client.search.call_args.kwargs["data"]) == 2
+    assert [chunk.content for chunk in result.chunks] == ["chunk"]
+
+
+def test_collection_schema_partitions_by_document(test_settings):
+    schema, _ = build_collection_schema(test_settings)
+
+    fields = {field.name: field for field in schema.fields}
+    assert fields["document_id"].is_partition_key
+    assert fields["chunk_number"].dtype == DataType.INT64
+    assert fields["page_number"].dtype == DataType.INT64
+    assert fields["sparse"].dtype == DataType.SPARSE_FLOAT_VECTOR
+    assert fields["text"].params["enable_analyzer"]
+    assert schema.functions[0].output_field_names == ["sparse"]
+
+    dense_only = test_settings.model_copy(update={"sparse_vectors": False})
+    schema, _ = build_collection_schema(dense_only)
+
+    assert {field.name for field in schema.fields} == {
+        "id",
+        "vector",
+        "document_id",
+        "chunk_number",
+        "page_number",
+    }
+
+
+def test_needs_migration():
+    partitioned = {"name": "document_id", "is_partition_key": True}
+    sparse = {"name": "sparse"}
+
+    assert needs_migration({"fields": [{"name": "document_id"}, sparse]})
+    assert not needs_migration({"fields": [partitioned]})
+    assert needs_migration({"fields": [partitioned]}, sparse_vectors=True)
+    assert not needs_migration(
+        {"fields": [partitioned, sparse]}, sparse_vectors=True
+    )
+
+
+def test_migrate_collection_copies_chunks(test_settings):
+    client = Mock()
+    client.has_collection.side_effect = lambda collection_name: (
+        collection_name == test_settings.index_name
+    )
+    client.describe_collection.return_value = {
+        "fields": [{"name": "id"}, {"name": "vector"}]
+    }
+    rows = [
+        {
+            "id": str(i),
+            "vector": [0.1],
+            "$meta": {
+                "text": "text",
+                "document_id": "doc",
+                "chunk_number": i,
+                "page_number": 1,
+            },
+        }
+        for i in range(3)
+    ]
+    client.query_iterator.return_value.next.side_effect = [
+        rows[:2],
+        rows[2:],
+        [],
+    ]
+
+    copied = migrate_collection(client, test_settings, batch_size=2)
+
+    assert copied == 3
+    target = f"{test_settings.index_name}_migrating"
+    inserted = [
+        row
+        for call in client.insert.call_args_list
+        for row in call.kwargs["data"]
+    ]
+    assert all(
+        call.kwargs["collection_name"] == target
+        for call in client.insert.call_args_list
+    )
+    assert [row["chunk_number"] for row in inserted] == [0, 1, 2]
+    assert inserted[0]["document_id"] == "doc"
+    client.drop_collection.assert_called_once_with(
+        collection_name=test_settings.index_name
+    )
+    client.rename_collection.assert_called_once_with(
+        old_name=target, new_name=test_settings.index_name
+    )
+    client.load_collection.assert_called_once_with(
+        collection_name=test_settings.index_name
+    )
+
+
+def test_migrate_collection_skips_migrated_collections(test_settings):
+    client = Mock()
+    client.has_collection.return_value = True
+    client.describe_collection.return_value = {
+        "fields": [
+            {"name": "document_id", "is_partition_key": True},
+            {"name": "sparse"},
+        ]
+    }
+
+    assert migrate_collection(client, test_settings) == 0
+    client.create_collection.assert_not_called()
+
+
+def _count_queries(client):
+    return [
+        call
+        for call in client.query.call_args_list
+        if call.kwargs.get("output_fields") == ["count(*)"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_uses_chunk_counts(milvus_service):
+    client = milvus_service.executor._client_factory()
+    client.insert.return_value = {"insert_count": 2}
+    client.search.return_value = [
+        [{"entity": {"text": "chunk", "page_number": 1, "chunk_number": 0}}]
+    ]
+    milvus_service.extract_keywords = AsyncMock(return_value=[])
+
+    await milvus_service.upsert_vectors(
+        [{"document_id": "doc", "text": "a"}, {"document_id": "doc"}]
+    )
+    result = await milvus_service.hybrid_search("query", "doc", [])
+
+    assert milvus_service.chunk_counts.get("doc") == 2
+    assert [chunk.content for chunk in result.chunks] == ["chunk"]
+    assert _count_queries(client) == []
+
+    client.query.return_value = []
+    await milvus_service.delete_document("doc")
+
+    assert milvus_service.chunk_counts.get("doc") is None
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_counts_unknown_documents_once(milvus_service):
+    client = milvus_service.executor._client_factory()
+    client.query.return_value = [{"count(*)": 3}]
+    client.search.return_value = [[]]
+    milvus_service.extract_keywords = AsyncMock(return_value=[])
+
+    await milvus_service.hybrid_search("query", "doc", [])
+    await milvus_service.hybrid_search("query", "doc", [])
+
+    assert len(_count_queries(client)) == 1
+    assert milvus_service.chunk_counts.get("doc") == 3
+
+    client.query.return_value = [{"count(*)": 0}]
+    result = await milvus_service.hybrid_search("query", "empty", [])
+
+    assert result.message == "No data found for the given document."
+    assert milvus_service.chunk_counts.get("empty") is None
+
+
+@pytest.mark.asyncio
+async def test_chunk_count_registry_persists(tmp_path):
+    path = str(tmp_path / "chunk_counts.db")
+    registry = ChunkCountRegistry("milvus", path)
+    await registry.add({"doc1": 2, "doc2": 1})
+    await registry.add({"doc1": 3})
+    await registry.remove("doc2")
+    other = ChunkCountRegistry("other", path)
+    await other.set("doc1", 9)
+    await other.aclose()
+    await registry.aclose()
+
+    registry = ChunkCountRegistry("milvus", path)
+
+    assert registry.get("doc1") == 5
+    assert registry.get("doc2") is None
+    assert len(registry) == 1
+
+    await registry.clear()
+    await registry.aclose()
+    registry = ChunkCountRegistry("milvus", path)
+    other = ChunkCountRegistry("other", path)
+
+    assert len(registry) == 0
+    assert other.get("doc1") == 9
+
+    await registry.aclose()
+    await other.aclose()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_dense_and_bm25_searches(milvus_service):
+    client = milvus_service.executor._client_factory()
+    client.describe_collection.return_value = {
+        "fields": [
+            {"name": "document_id", "is_partition_key": True},
+            {"name": "sparse"},
+        ]
+    }
+    client.hybrid_search.return_value = [
+        [
+            {"entity": {"text": "second", "page_number": 2}},
+            {"entity": {"text": "first", "page_number": 1}},
+        ]
+    ]
+    milvus_service.extract_keywords = AsyncMock(return_value=["a", "b"])
+    await milvus_service.chunk_counts.add({"doc": 2})
+
+    result = await milvus_service.hybrid_search("query", "doc", [])
+
+    assert [chunk.content for chunk in result.chunks] == ["second", "first"]
+    client.query.assert_not_called()
+    client.search.assert_not_called()
+    kwargs = client.hybrid_search.call_args.kwargs
+    dense, sparse = kwargs["reqs"]
+    assert sparse.anns_field == "sparse"
+    assert sparse.data == ["a b"]
+    assert dense.expr == sparse.expr == 'document_id == "doc"'
+    assert kwargs["limit"] == milvus_service.settings.hybrid_search_limit
+
+
+@pytest.mark.asyncio
+async def test_only_collections_without_sparse_vectors_are_keyword_indexed(
+    milvus_service,
+):
+    client = milvus_service.executor._client_factory()
+
+    assert await milvus_service.upload_keyword_index() is not None
+
+    client.describe_collection.return_value = {
+        "fields": [
+            {"name": "document_id", "is_partition_key": True},
+            {"name": "sparse"},
+        ]
+    }
+    milvus_service.invalidate_collection_cache()
+    assert await milvus_service.upload_keyword_index() is None
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_scores_keywords_on_the_local_index(
+    milvus_service,
+):
+    client = milvus_service.executor._client_factory()
+    indexed = {"text": "Paris", "page_number": 1, "chunk_number": 0}
+
+    def query(**kwargs):
+        if kwargs.get("output_fields") == ["count(*)"]:
+            return [{"count(*)": 2}]
+        return [indexed]
+
+    client.query.side_effect = query
+    client.search.return_value = [
+        [{"entity": {"text": "semantic", "page_number": 1, "chunk_number": 5}}]
+    ]
+    milvus_service.extract_keywords = AsyncMock(return_value=["paris"])
+    await milvus_service.keyword_index.add_chunks(
+        [{"document_id": "doc", "chunk_number": 0, "text": "Paris"}]
+    )
+
+    try:
+        result = await milvus_service.hybrid_search("query", "doc", [])
+    finally:
+        client.query.side_effect = None
+
+    assert [chunk.content for chunk in result.chunks] == ["Paris", "semantic"]
+    # Only the chunk count and the best indexed chunks are queried, not
+    # the chunks containing "paris"
+    chunk_queries = [
+        call.kwargs["filter"]
+        for call in client.query.call_args_list
+        if call not in _count_queries(client)
+    ]
+    assert chunk_queries == ['document_id == "doc" && chunk_number in [0]']
@@ -1,9 +1,29 @@
-from unittest.mock import Mock, patch
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from langchain.schema import Document
+from qdrant_client import AsyncQdrantClient, models
 
+from app.core.config import Qdrant
+from app.models.llm_responses import KeywordsResponseModel
 from app.schemas.query_api import VectorResponseSchema
-from app.services.vector_db.qdrant_service import QdrantService
+from app.services.batch_memo import batch_memo
+from app.services.llm.base import CompletionService
+from app.services.vector_db.bm25 import CHARACTERS_PER_TOKEN
+from app.services.vector_db.qdrant_service import (
+    AsyncQdrantService,
+    QdrantService,
+)
+
+
+def _collection(payload_schema=None, sparse_vectors=None):
+    """A collection as described by get_collection."""
+    return Mock(
+        payload_schema=payload_schema or {},
+        config=Mock(params=Mock(sparse_vectors=sparse_vectors)),
+    )
 
 
 @pytest.fixture
@@ -12,6 +32,7 @@ def mock_qdrant_client():
         client = Mock()
         # Set up mock responses
         client.collection_exists.return_value = True
+        client.get_collection.return_value = _collection()
         client.upsert.return_value = None
 
         # Use a simple Mock instead of Qdrant models
@@ -27,6 +48,10 @@ def mock_qdrant_client():
             )
         ]
         client.query_points.return_value = response_mock
+        client.scroll.return_value = (response_mock.points, None)
+        client.query_batch_points.side_effect = lambda name, requests: [
+            response_mock for _ in requests
+        ]
 
         client.delete.return_value = None
         mock.return_value = client
@@ -56,6 +81,34 @@ async def test_ensure_collection_exists(qdrant_service):
     assert qdrant_service.client.collection_exists.called
 
 
+@pytest.mark.asyncio
+async def test_ensure_collection_exists_adds_payload_indexes(qdrant_service):
+    client = qdrant_service.client
+    client.create_payload_index.reset_mock()
+    client.get_collection.return_value = _collection(
+        payload_schema={"document_id": Mock()}
+    )
+
+    await qdrant_service.ensure_collection_exists()
+
+    # Only the missing index is created on an existing collection
+    client.create_payload_index.assert_called_once()
+    kwargs = client.create_payload_index.call_args.kwargs
+    assert kwargs["field_name"] == "text"
+    assert kwargs["field_schema"].tokenizer == "word"
+
+    client.create_payload_index.reset_mock()
+    client.get_collection.return_value = _collection()
+    await qdrant_service.ensure_collection_exists()
+
+    schemas = {
+        call.kwargs["field_name"]: call.kwargs["field_schema"]
+        for call in client.create_payload_index.call_args_list
+    }
+    assert schemas["document_id"].is_tenant is True
+    assert set(schemas) == {"document_id", "text"}
+
+
 @pytest.mark.asyncio
 async def test_upsert_vectors(qdrant_service):
     vectors = [
@@ -75,6 +128,42 @@ async def test_upsert_vectors(qdrant_service):
     assert qdrant_service.client.upsert.called
 
 
+@pytest.mark.asyncio
+async def test_upsert_vectors_checks_collection_once(qdrant_service):
+    vector = {
+        "vector": [0.1, 0.2],
+        "text": "test",
+        "page_number": 1,
+        "chunk_number": 1,
+        "document_id": "doc1",
+    }
+
+    await qdrant_service.upsert_vectors([{"id": "1", **vector}])
+    await qdrant_service.upsert_vectors([{"id": "2", **vector}])
+
+    assert qdrant_service.client.collection_exists.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_vectors_failure_invalidates_collection(qdrant_service):
+    vector = {
+        "vector": [0.1, 0.2],
+        "text": "test",
+        "page_number": 1,
+        "chunk_number": 1,
+        "document_id": "doc1",
+    }
+    qdrant_service.client.upsert.side_effect = RuntimeError("Not found")
+
+    with pytest.raises(RuntimeError):
+        await qdrant_service.upsert_vectors([{"id": "1", **vector}])
+
+    qdrant_service.client.upsert.side_effect = None
+    await qdrant_service.upsert_vectors([{"id": "2", **vector}])
+
+    assert qdrant_service.client.collection_exists.call_count == 2
+
+
 @pytest.mark.asyncio
 async def test_vector_search(qdrant_service, mock_embeddings_service):
     mock_embeddings_service.get_embeddings.return_value = [[0.1, 0.2]]
@@ -102,6 +191,37 @@ async def test_hybrid_search(qdrant_service, mock_embeddings_service):
         assert isinstance(result, VectorResponseSchema)
         assert result.message == "Query processed successfully."
         assert qdrant_service.client.query_points.called
+        assert qdrant_service.client.scroll.called
+
+
+@pytest.mark.asyncio
+async def test_scroll_payloads_stops_at_candidate_limit(
+    qdrant_service, test_settings
+):
+    qdrant_service.settings = test_settings.model_copy(
+        update={"keyword_candidate_limit": 5, "keyword_page_size": 2}
+    )
+    pages = [
+        ([Mock(payload={"text": "a"}), Mock(payload={"text": "b"})], "p1"),
+        ([Mock(payload={"text": "c"}), Mock(payload={"text": "d"})], "p2"),
+        ([Mock(payload={"text": "e"})], "p3"),
+    ]
+    qdrant_service.client.scroll.side_effect = pages
+    _filter = Mock()
+
+    payloads = await qdrant_service.scroll_payloads(_filter)
+
+    assert [payload["text"] for payload in payloads] == list("abcde")
+    calls = qdrant_service.client.scroll.call_args_list
+    assert [call.kwargs["offset"] for call in calls] == [None, "p1", "p2"]
+    assert [call.kwargs["limit"] for call in calls] == [2, 2, 1]
+    assert calls[0].kwargs["scroll_filter"] is _filter
+    assert calls[0].kwargs["with_payload"] == [
+        "text",
+        "page_number",
+        "chunk_number",
+    ]
+    assert calls[0].kwargs["with_vectors"] is False
 
 
 @pytest.mark.asyncio
@@ -110,9 +230,15 @@ async def test_decomposed_search(qdrant_service, mock_llm_service):
         "sub-queries": ["query1", "query2"]
     }
 
-    result = await qdrant_service.decomposed_search(
-        "test query", "test_doc", []
-    )
+    get_embeddings = qdrant_service.embedding_service.get_embeddings
+    get_embeddings.side_effect = lambda texts: [[0.1, 0.2, 0.3] for _ in texts]
+
+    try:
+        result = await qdrant_service.decomposed_search(
+            "test query", "test_doc", []
+        )
+    finally:
+        get_embeddings.side_effect = None
 
     assert "sub_queries" in result
     assert "chunks" in result
@@ -155,3 +281,420 @@ async def test_get_single_embedding(qdrant_service):
     qdrant_service.embedding_service.get_embeddings.assert_called_once_with(
         ["test text"]
     )
+
+
+@pytest.fixture
+def in_memory_settings(test_settings):
+    return test_settings.model_copy(
+        update={
+            "dimensions": 3,
+            "index_name": "test_collection",
+            "qdrant": Qdrant(location=":memory:", asynchronous=True),
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_async_qdrant_service_round_trip(
+    mock_embeddings_service, mock_llm_service, in_memory_settings
+):
+    service = AsyncQdrantService(
+        embedding_service=mock_embeddings_service,
+        llm_service=mock_llm_service,
+        settings=in_memory_settings,
+    )
+    assert isinstance(service.client, AsyncQdrantClient)
+
+    await service.upsert_vectors(
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "vector": [0.1, 0.2, 0.3],
+                "text": "test text",
+                "page_number": 1,
+                "chunk_number": 0,
+                "document_id": "test_doc",
+            }
+        ]
+    )
+    mock_embeddings_service.get_embeddings.return_value = [[0.1, 0.2, 0.3]]
+
+    result = await service.vector_search(["test query"], "test_doc")
+    await service.delete_document("test_doc")
+    empty = await service.vector_search(["test query"], "test_doc")
+    await service.aclose()
+
+    assert [chunk.content for chunk in result.chunks] == ["test text"]
+    assert empty.chunks == []
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_dense_and_bm25_searches(
+    mock_embeddings_service, mock_llm_service, in_memory_settings
+):
+    service = AsyncQdrantService(
+        embedding_service=mock_embeddings_service,
+        llm_service=mock_llm_service,
+        settings=in_memory_settings,
+    )
+    texts = {
+        "Berlin is the capital of Germany": [0.1, 0.2, 0.3],
+        "Paris is the capital of France": [0.3, 0.2, 0.1],
+        "Nothing to see here": [0.3, 0.1, 0.2],
+    }
+    await service.upsert_vectors(
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "vector": vector,
+                "text": text,
+                "page_number": 1,
+                "chunk_number": i,
+                "document_id": "test_doc",
+            }
+            for i, (text, vector) in enumerate(texts.items())
+        ]
+    )
+    mock_embeddings_service.get_embeddings.return_value = [[0.1, 0.2, 0.3]]
+
+    with patch.object(service, "extract_keywords", return_value=["paris"]):
+        result = await service.hybrid_search("capital", "test_doc", [])
+    await service.aclose()
+
+    # Last in the dense search but the only BM25 match
+    assert [chunk.content for chunk in result.chunks] == [
+        "Paris is the capital of France",
+        "Berlin is the capital of Germany",
+        "Nothing to see here",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scroll_payloads_pages_through_matching_chunks(
+    mock_embeddings_service, mock_llm_service, in_memory_settings
+):
+    service = AsyncQdrantService(
+        embedding_service=mock_embeddings_service,
+        llm_service=mock_llm_service,
+        settings=in_memory_settings.model_copy(
+            update={"sparse_vectors": False, "keyword_page_size": 2}
+        ),
+    )
+    await service.upsert_vectors(
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "vector": [0.1, 0.2, 0.3],
+                "text": f"Chunk {i} about {'Paris' if i % 2 else 'Berlin'}",
+                "page_number": 1,
+                "chunk_number": i,
+                "document_id": "test_doc",
+            }
+            for i in range(7)
+        ]
+    )
+    _filter = models.Filter(
+        must=models.FieldCondition(
+            key="text", match=models.MatchText(text="Paris")
+        )
+    )
+
+    payloads = await service.scroll_payloads(_filter)
+    service.settings.keyword_candidate_limit = 2
+    capped = await service.scroll_payloads(_filter)
+    await service.aclose()
+
+    assert sorted(payload["chunk_number"] for payload in payloads) == [
+        1,
+        3,
+        5,
+    ]
+    assert set(payloads[0]) == {"text", "page_number", "chunk_number"}
+    assert capped == payloads[:2]
+
+
+@pytest.mark.asyncio
+async def test_new_collections_have_sparse_vectors(qdrant_service):
+    client = qdrant_service.client
+    client.collection_exists.return_value = False
+
+    await qdrant_service.upsert_vectors(
+        [
+            {
+                "id": "1",
+                "vector": [0.1, 0.2],
+                "text": "Paris paris",
+                "page_number": 1,
+                "chunk_number": 0,
+                "document_id": "doc1",
+            }
+        ]
+    )
+
+    kwargs = client.create_collection.call_args.kwargs
+    assert kwargs["sparse_vectors_config"]["bm25"].modifier == "idf"
+    (point,) = client.upsert.call_args.kwargs["points"]
+    assert point.vector[""] == [0.1, 0.2]
+    assert len(point.vector["bm25"].indices) == 1
+
+
+def test_bm25_length_normalization_follows_chunk_size(
+    mock_embeddings_service,
+    mock_llm_service,
+    test_settings,
+    mock_qdrant_client,
+):
+    service = QdrantService(
+        embedding_service=mock_embeddings_service,
+        llm_service=mock_llm_service,
+        settings=test_settings.model_copy(update={"chunk_size": 1200}),
+    )
+
+    assert service.bm25.avg_length == 1200 / CHARACTERS_PER_TOKEN
+
+
+def test_qdrant_client_config_excludes_service_options():
+    config = Qdrant(url="http://localhost", asynchronous=True).client_config()
+
+    assert "asynchronous" not in config
+    assert "tokenizer" not in config
+    assert "tenant" not in config
+    assert config["url"] == "http://localhost"
+
+
+@pytest.mark.asyncio
+async def test_get_single_embedding_once_per_batch(qdrant_service):
+    qdrant_service.embedding_service.get_embeddings.reset_mock()
+    qdrant_service.embedding_service.get_embeddings.return_value = [
+        [0.1, 0.2, 0.3]
+    ]
+
+    with batch_memo():
+        results = await asyncio.gather(
+            *(qdrant_service.get_single_embedding("text") for _ in range(5))
+        )
+
+    assert results == [[0.1, 0.2, 0.3]] * 5
+    qdrant_service.embedding_service.get_embeddings.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_query_embeddings_are_cached(qdrant_service):
+    qdrant_service.embedding_service.get_embeddings.reset_mock()
+    qdrant_service.embedding_service.get_embeddings.return_value = [
+        [0.1, 0.2, 0.3]
+    ]
+
+    await qdrant_service.vector_search(["query"], "doc1")
+    await qdrant_service.vector_search(["query"], "doc2")
+    await qdrant_service.prepare_chunks("doc1", [Document("chunk")])
+    await qdrant_service.prepare_chunks("doc1", [Document("chunk")])
+
+    calls = qdrant_service.embedding_service.get_embeddings.await_args_list
+    assert [call.args[0] for call in calls] == [
+        ["query"],
+        ["chunk"],
+        ["chunk"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_extract_keywords_once_per_query(qdrant_service, tmp_path):
+    qdrant_service.settings = qdrant_service.settings.model_copy(
+        update={"keyword_cache_path": str(tmp_path / "keywords.db")}
+    )
+    llm_service = AsyncMock(spec=CompletionService)
+
+    async def generate_completion(prompt, response_model):
+        await asyncio.sleep(0.01)
+        return KeywordsResponseModel(keywords=["capital", "France"])
+
+    llm_service.generate_completion.side_effect = generate_completion
+
+    results = await asyncio.gather(
+        *(
+            qdrant_service.extract_keywords("capital?", [], llm_service)
+            for _ in range(3)
+        )
+    )
+    await qdrant_service.aclose()
+    # A restarted service reads the keywords from disk
+    restarted = await qdrant_service.extract_keywords(
+        "capital?", [], llm_service
+    )
+
+    assert results == [["capital", "France"]] * 3
+    assert restarted == ["capital", "France"]
+    llm_service.generate_completion.assert_awaited_once()
+    await qdrant_service.aclose()
+
+
+def _group(document_id, chunk_numbers):
+    return Mock(
+        id=document_id,
+        hits=[
+            Mock(
+                payload={
+                    "text": f"{document_id} chunk {chunk_number}",
+                    "page_number": 1,
+                    "chunk_number": chunk_number,
+                    "document_id": document_id,
+                }
+            )
+            for chunk_number in chunk_numbers
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_multi_document_search_groups_by_document(qdrant_service):
+    qdrant_service.client.query_points_groups.return_value = Mock(
+        groups=[_group("doc1", [0, 1]), _group("doc2", [3])]
+    )
+
+    results = await qdrant_service.multi_document_search(
+        "query", ["doc1", "doc2", "doc3"], limit=5
+    )
+
+    qdrant_service.client.query_points_groups.assert_called_once()
+    kwargs = qdrant_service.client.query_points_groups.call_args.kwargs
+    assert kwargs["group_by"] == "document_id"
+    assert kwargs["group_size"] == 5
+    assert kwargs["query_filter"].must[0].match.any == [
+        "doc1",
+        "doc2",
+        "doc3",
+    ]
+    assert [chunk.content for chunk in results["doc1"].chunks] == [
+        "doc1 chunk 0",
+        "doc1 chunk 1",
+    ]
+    assert results["doc3"].chunks == []
+
+
+@pytest.mark.asyncio
+async def test_prefetched_vector_search_uses_one_request(qdrant_service):
+    qdrant_service.client.query_points.reset_mock()
+    qdrant_service.client.query_points_groups.return_value = Mock(
+        groups=[_group("doc1", [0]), _group("doc2", [1])]
+    )
+
+    with batch_memo():
+        qdrant_service.prefetch_vector_search("query", ["doc1", "doc2"])
+        await asyncio.sleep(0.01)
+        # The search runs for the first query asking for it
+        qdrant_service.client.query_points_groups.assert_not_called()
+        doc1, doc2 = await asyncio.gather(
+            qdrant_service.vector_search(["query"], "doc1"),
+            qdrant_service.vector_search(["query"], "doc2"),
+        )
+
+    assert doc1.chunks[0].content == "doc1 chunk 0"
+    assert doc2.chunks[0].content == "doc2 chunk 1"
+    qdrant_service.client.query_points_groups.assert_called_once()
+    qdrant_service.client.query_points.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_prefetched_vector_search_falls_back_on_failure(qdrant_service):
+    qdrant_service.client.query_points.reset_mock()
+    qdrant_service.client.query_points_groups.side_effect = RuntimeError
+
+    with batch_memo():
+        qdrant_service.prefetch_vector_search("query", ["doc1", "doc2"])
+        result = await qdrant_service.vector_search(["query"], "doc1")
+
+    assert result.chunks[0].content == "test text"
+    qdrant_service.client.query_points.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_vector_search_batches_queries(qdrant_service):
+    qdrant_service.client.query_points.reset_mock()
+    qdrant_service.client.query_batch_points.reset_mock()
+    get_embeddings = qdrant_service.embedding_service.get_embeddings
+    get_embeddings.reset_mock()
+    get_embeddings.side_effect = lambda texts: [
+        [float(i)] * 3 for i, _ in enumerate(texts)
+    ]
+
+    try:
+        result = await qdrant_service.vector_search(["q1", "q2", "q3"], "doc")
+    finally:
+        get_embeddings.side_effect = None
+
+    get_embeddings.assert_awaited_once_with(["q1", "q2", "q3"])
+    qdrant_service.client.query_points.assert_not_called()
+    requests = qdrant_service.client.query_batch_points.call_args.kwargs[
+        "requests"
+    ]
+    assert [request.query for request in requests] == [
+        [0.0] * 3,
+        [1.0] * 3,
+        [2.0] * 3,
+    ]
+    # The chunk found by every query is returned once
+    assert len(result.chunks) == 1
+
+
+@pytest.mark.asyncio
+async def test_query_embeddings_embed_cache_misses_at_once(qdrant_service):
+    get_embeddings = qdrant_service.embedding_service.get_embeddings
+    get_embeddings.side_effect = lambda texts: [
+        [float(len(text))] * 3 for text in texts
+    ]
+
+    try:
+        await qdrant_service.get_query_embeddings(["cached"])
+        get_embeddings.reset_mock()
+        embeddings = await qdrant_service.get_query_embeddings(
+            ["a", "cached", "bb", "a"]
+        )
+    finally:
+        get_embeddings.side_effect = None
+
+    get_embeddings.assert_awaited_once_with(["a", "bb"])
+    assert embeddings == [[1.0] * 3, [6.0] * 3, [2.0] * 3, [1.0] * 3]
+
+
+@pytest.mark.asyncio
+async def test_indexed_keyword_search_fetches_the_best_chunks(qdrant_service):
+    await qdrant_service.keyword_index.add_chunks(
+        [
+            {"document_id": "test_doc", "chunk_number": 0, "text": "Paris"},
+            {
+                "document_id": "test_doc",
+                "chunk_number": 1,
+                "text": "Parisian Paris",
+            },
+            {"document_id": "test_doc", "chunk_number": 2, "text": "Berlin"},
+        ]
+    )
+
+    chunks = await qdrant_service.indexed_keyword_search(
+        "test_doc", ["paris"], limit=1
+    )
+
+    assert chunks == [
+        {
+            "text": "test text",
+            "page_number": 1,
+            "chunk_number": 1,
+            "document_id": "test_doc",
+        }
+    ]
+    scroll_filter = qdrant_service.client.scroll.call_args.kwargs[
+        "scroll_filter"
+    ]
+    assert scroll_filter.must[1].key == "chunk_number"
+    assert scroll_filter.must[1].match.any == [1]
+    assert (
+        await qdrant_service.indexed_keyword_search(
+            "test_doc", ["london"], limit=1
+        )
+        == []
+    )
+    assert (
+        await qdrant_service.indexed_keyword_search("other", ["paris"], 1)
+        is None
+    )